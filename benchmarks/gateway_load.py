@@ -0,0 +1,390 @@
+"""End-to-end load benchmark for the gateway.
+
+By default this starts the gateway and one stub_services.py process per service
+on local ports, then drives a weighted mix of gateway operations from
+--concurrency client threads. It reports per operation the p50/p95/p99 latency,
+throughput, error count and downstream service calls per request (read from the
+X-Debug-Queries response extensions, see gateway/querystats.py). With
+--gateway-url it drives an already running gateway instead, e.g. the
+docker-compose stack with the real services.
+
+createPayment pays for a booking made earlier in the run by createBooking; until
+one exists it runs createBooking in its place.
+
+    python gateway_load.py --duration 30 --concurrency 16 --latency-ms 5
+    python gateway_load.py --mix showtimes=1,myBookings=1 --save-baseline baseline.json
+    python gateway_load.py --baseline baseline.json --tolerance 0.15
+
+Compared with a baseline it prints the change per metric and exits with status 1
+when any operation regressed by more than --tolerance. Needs the gateway's
+requirements.
+"""
+from collections import defaultdict, deque
+import subprocess
+import threading
+import argparse
+import tempfile
+import platform
+import requests
+import random
+import json
+import time
+import sys
+import os
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+GATEWAY_DIR = os.path.join(os.path.dirname(BENCH_DIR), 'gateway')
+SERVICES = ('user', 'movie', 'cinema', 'booking', 'payment', 'coupon')
+DEFAULT_MIX = 'showtimes=40,myBookings=25,allPayments=5,createBooking=20,createPayment=10'
+SEATS = [f"{row}{number}" for row in 'ABCDEFGH' for number in range(1, 13)]
+
+# (document, needs admin token)
+OPERATIONS = {
+    'showtimes': ('''query Showtimes {
+        showtimes { id movieId auditoriumId startTime price auditorium { id name } }
+    }''', False),
+    'myBookings': ('''query MyBookings {
+        myBookings { id status totalPrice bookingDate tickets { seatNumber } }
+    }''', False),
+    'allPayments': ('''query AllPayments {
+        allPayments { id amount status booking { id status showtime { startTime } tickets { seatNumber } } }
+    }''', True),
+    'createBooking': ('''mutation CreateBooking($showtimeId: Int!, $seatNumbers: [String]!) {
+        createBooking(showtimeId: $showtimeId, seatNumbers: $seatNumbers) { success message booking { id } }
+    }''', False),
+    'createPayment': ('''mutation CreatePayment($bookingId: Int!) {
+        createPayment(bookingId: $bookingId, paymentMethod: "CREDIT_CARD") { success message payment { id status } }
+    }''', False),
+}
+
+# Metrics compared against the baseline, and whether a higher value is better
+COMPARED_METRICS = (('p50_ms', False), ('p95_ms', False), ('p99_ms', False),
+                    ('throughput_rps', True), ('downstream_calls', False))
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(','):
+        name, _, weight = item.partition('=')
+        if name.strip() not in OPERATIONS:
+            raise SystemExit(f"Unknown operation '{name.strip()}', expected one of {', '.join(OPERATIONS)}")
+        mix[name.strip()] = float(weight or 1)
+    return mix
+
+def parse_latencies(items, default):
+    latencies = {service: default for service in SERVICES}
+    for item in items or []:
+        service, _, value = item.partition('=')
+        if service not in latencies:
+            raise SystemExit(f"Unknown service '{service}', expected one of {', '.join(SERVICES)}")
+        latencies[service] = float(value)
+    return latencies
+
+def percentile(sorted_values, fraction):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+class Stack:
+    """Stub services and a gateway pointed at them, as child processes on local ports"""
+
+    def __init__(self, port_base, latencies, jitter_ms, list_size):
+        self.port_base = port_base
+        self.latencies = latencies
+        self.jitter_ms = jitter_ms
+        self.list_size = list_size
+        self.log_dir = tempfile.mkdtemp(prefix='gateway-bench-')
+        self.processes = []
+        self.gateway_url = f"http://127.0.0.1:{port_base}"
+
+    def _spawn(self, name, command, cwd, env=None):
+        log = open(os.path.join(self.log_dir, f"{name}.log"), 'w')
+        self.processes.append(subprocess.Popen(command, cwd=cwd, env=env, stdout=log, stderr=subprocess.STDOUT))
+
+    def start(self):
+        service_urls = {}
+        for offset, service in enumerate(SERVICES, start=1):
+            port = self.port_base + offset
+            service_urls[service] = f"http://127.0.0.1:{port}"
+            self._spawn(service, [sys.executable, 'stub_services.py', service, '--port', str(port),
+                                  '--latency-ms', str(self.latencies[service]), '--jitter-ms', str(self.jitter_ms),
+                                  '--list-size', str(self.list_size)], BENCH_DIR)
+
+        env = dict(os.environ)
+        env.update({f"{service.upper()}_SERVICE_URL": url for service, url in service_urls.items()})
+        env['JWKS_URL'] = f"{service_urls['user']}/.well-known/jwks.json"
+        env['BLOB_STORE_DIR'] = os.path.join(self.log_dir, 'blobs')
+        env.setdefault('TRACE_DIR', '')  # Spans in memory only
+        env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.dirname(BENCH_DIR), env.get('PYTHONPATH')]))  # shared/
+        self._spawn('gateway', [sys.executable, '-c',
+                                f"from app import app; app.run(host='127.0.0.1', port={self.port_base}, threaded=True)"],
+                    GATEWAY_DIR, env)
+
+        for url in [f"{url}/.well-known/jwks.json" for url in service_urls.values()] + [f"{self.gateway_url}/metrics"]:
+            self.wait_until_up(url)
+        print(f"Stub services and gateway started, logs in {self.log_dir}")
+
+    def wait_until_up(self, url, timeout=30):
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if any(process.poll() is not None for process in self.processes):
+                raise SystemExit(f"A benchmark process exited during startup, see the logs in {self.log_dir}")
+            try:
+                if requests.get(url, timeout=1).ok:
+                    return
+            except requests.exceptions.RequestException:
+                pass
+            time.sleep(0.2)
+        raise SystemExit(f"{url} did not come up within {timeout}s, see the logs in {self.log_dir}")
+
+    def stop(self):
+        for process in self.processes:
+            process.terminate()
+        for process in self.processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+def graphql(session, url, document, variables=None, token=None, timeout=60):
+    headers = {'Content-Type': 'application/json', 'X-Debug-Queries': '1'}
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    response = session.post(f"{url}/graphql", json={'query': document, 'variables': variables or {}},
+                            headers=headers, timeout=timeout)
+    try:
+        return response.status_code, response.json()
+    except ValueError:
+        return response.status_code, None
+
+def login(url, email, password):
+    _, body = graphql(requests.Session(), url, '''mutation Login($email: String!, $password: String!) {
+        login(email: $email, password: $password) { token }
+    }''', {'email': email, 'password': password})
+    token = (((body or {}).get('data') or {}).get('login') or {}).get('token')
+    if not token:
+        raise SystemExit(f"Login as {email} failed: {body}")
+    return token
+
+class LoadRun:
+    """Client threads running the mix; results are kept per operation"""
+
+    def __init__(self, url, mix, tokens, showtime_ids):
+        self.url = url
+        self.operations = list(mix)
+        self.weights = [mix[name] for name in self.operations]
+        self.tokens = tokens
+        self.showtime_ids = showtime_ids
+        self.unpaid_bookings = deque()  # Made by createBooking, paid by createPayment
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+        self.downstream_calls = defaultdict(list)
+        self.downstream_by_service = defaultdict(lambda: defaultdict(int))
+        self.recording = False
+        self._lock = threading.Lock()
+
+    def _request(self, name):
+        if name == 'createPayment':
+            try:
+                return name, {'bookingId': self.unpaid_bookings.popleft()}
+            except IndexError:
+                name = 'createBooking'
+        if name == 'createBooking':
+            return name, {'showtimeId': random.choice(self.showtime_ids), 'seatNumbers': random.sample(SEATS[2:], 2)}
+        return name, None
+
+    def run_one(self, session, record):
+        name, variables = self._request(random.choices(self.operations, self.weights)[0])
+        document, admin = OPERATIONS[name]
+        started = time.perf_counter()
+        try:
+            status, body = graphql(session, self.url, document, variables, self.tokens['admin' if admin else 'user'])
+        except requests.exceptions.RequestException:
+            status, body = None, None
+        elapsed_ms = (time.perf_counter() - started) * 1000
+
+        data = ((body or {}).get('data') or {}).get(name)
+        failed = status != 200 or not body or bool(body.get('errors')) or \
+            (isinstance(data, dict) and data.get('success') is False)
+        if name == 'createBooking' and not failed and (data.get('booking') or {}).get('id'):
+            self.unpaid_bookings.append(data['booking']['id'])
+        services = (((body or {}).get('extensions') or {}).get('sql') or {}).get('services') or {}
+
+        if not record:
+            return
+        with self._lock:
+            self.latencies[name].append(elapsed_ms)
+            if failed:
+                self.errors[name] += 1
+            self.downstream_calls[name].append(sum(stats.get('calls', 0) for stats in services.values()))
+            for service, stats in services.items():
+                self.downstream_by_service[name][service] += stats.get('calls', 0)
+
+    def run(self, concurrency, warmup, duration, total_requests):
+        stop = threading.Event()
+        budget = {'left': total_requests}
+
+        def worker():
+            session = requests.Session()
+            while not stop.is_set():
+                # Only requests started while recording count, so warmup stragglers don't skew results
+                record = self.recording
+                if record and total_requests:
+                    with self._lock:
+                        if budget['left'] <= 0:
+                            return
+                        budget['left'] -= 1
+                self.run_one(session, record)
+
+        threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        time.sleep(warmup)
+        self.recording = True
+        started = time.perf_counter()
+        if total_requests:
+            for thread in threads:
+                thread.join()
+        else:
+            time.sleep(duration)
+            self.recording = False
+        elapsed = time.perf_counter() - started
+        stop.set()
+        for thread in threads:
+            thread.join(timeout=60)
+        return elapsed
+
+    def summary(self, elapsed):
+        operations = {}
+        for name, values in sorted(self.latencies.items()):
+            values = sorted(values)
+            count = len(values)
+            operations[name] = {
+                'requests': count,
+                'errors': self.errors[name],
+                'p50_ms': round(percentile(values, 0.50), 2),
+                'p95_ms': round(percentile(values, 0.95), 2),
+                'p99_ms': round(percentile(values, 0.99), 2),
+                'mean_ms': round(sum(values) / count, 2),
+                'throughput_rps': round(count / elapsed, 2),
+                'downstream_calls': round(sum(self.downstream_calls[name]) / count, 2),
+                'downstream_calls_by_service': {service: round(calls / count, 2)
+                                                for service, calls in sorted(self.downstream_by_service[name].items())}
+            }
+        all_values = sorted(value for values in self.latencies.values() for value in values)
+        total = {
+            'requests': len(all_values),
+            'errors': sum(self.errors.values()),
+            'p50_ms': round(percentile(all_values, 0.50), 2) if all_values else None,
+            'p95_ms': round(percentile(all_values, 0.95), 2) if all_values else None,
+            'p99_ms': round(percentile(all_values, 0.99), 2) if all_values else None,
+            'throughput_rps': round(len(all_values) / elapsed, 2)
+        }
+        return {'operations': operations, 'total': total, 'elapsed_seconds': round(elapsed, 2)}
+
+def print_report(results):
+    print(f"\n{'operation':<15} {'requests':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'req/s':>9} {'calls/req':>10}")
+    for name, stats in results['operations'].items():
+        print(f"{name:<15} {stats['requests']:>9} {stats['errors']:>7} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+              f"{stats['p99_ms']:>9.1f} {stats['throughput_rps']:>9.1f} {stats['downstream_calls']:>10.1f}")
+    total = results['total']
+    if total['requests']:
+        print(f"{'total':<15} {total['requests']:>9} {total['errors']:>7} {total['p50_ms']:>9.1f} {total['p95_ms']:>9.1f} "
+              f"{total['p99_ms']:>9.1f} {total['throughput_rps']:>9.1f}")
+    for name, stats in results['operations'].items():
+        calls = ', '.join(f"{service} {count}" for service, count in stats['downstream_calls_by_service'].items())
+        print(f"  {name} downstream calls per request: {calls or 'none reported'}")
+
+def compare(results, baseline, tolerance):
+    """Print the change from the baseline per metric; returns the regressions beyond tolerance"""
+    regressions = []
+    print(f"\nCompared with baseline from {baseline.get('recorded_at', 'unknown time')} (tolerance {tolerance:.0%}):")
+    for setting in ('mix', 'concurrency', 'target', 'latency_ms', 'list_size'):
+        old, new = baseline.get('config', {}).get(setting), results['config'].get(setting)
+        if old != new:
+            print(f"  Note: {setting} differs from the baseline ({old} -> {new}), results may not be comparable")
+    for name, stats in results['operations'].items():
+        before = baseline.get('operations', {}).get(name)
+        if before is None:
+            print(f"  {name}: not in baseline")
+            continue
+        changes = []
+        for metric, higher_is_better in COMPARED_METRICS:
+            old, new = before.get(metric), stats.get(metric)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            flag = ' REGRESSION' if worse > tolerance else ''
+            if flag:
+                regressions.append(f"{name} {metric} {old} -> {new}")
+            changes.append(f"{metric} {old} -> {new} ({change:+.0%}){flag}")
+        print(f"  {name}: " + '; '.join(changes))
+    return regressions
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark the gateway against stub or running services')
+    parser.add_argument('--gateway-url', help='Drive this running gateway instead of starting stubs and a gateway')
+    parser.add_argument('--mix', default=DEFAULT_MIX, help='Operation weights, e.g. showtimes=3,createBooking=1')
+    parser.add_argument('--concurrency', type=int, default=16, help='Client threads')
+    parser.add_argument('--duration', type=float, default=30, help='Measured seconds (ignored with --requests)')
+    parser.add_argument('--requests', type=int, default=0, help='Stop after this many measured requests')
+    parser.add_argument('--warmup', type=float, default=3, help='Seconds of unmeasured load first')
+    parser.add_argument('--latency-ms', type=float, default=5, help='Stub response delay for every service')
+    parser.add_argument('--service-latency', action='append', metavar='SERVICE=MS',
+                        help='Stub delay for one service, e.g. booking=20 (repeatable)')
+    parser.add_argument('--jitter-ms', type=float, default=2, help='Extra random stub delay, up to this much')
+    parser.add_argument('--list-size', type=int, default=20, help='Rows in stub list results')
+    parser.add_argument('--port-base', type=int, default=15000, help='Gateway port; stubs use the next six')
+    parser.add_argument('--showtime-ids', default='1,2,3,4,5', help='Showtimes createBooking picks from')
+    parser.add_argument('--user-email', default='bench@example.com')
+    parser.add_argument('--user-password', default='bench')
+    parser.add_argument('--admin-email', default='admin@example.com')
+    parser.add_argument('--admin-password', default='admin')
+    parser.add_argument('--baseline', help='Baseline JSON to compare with')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='Allowed relative regression per metric')
+    parser.add_argument('--save-baseline', help='Write these results to this file as the new baseline')
+    args = parser.parse_args()
+
+    mix = parse_mix(args.mix)
+    latencies = parse_latencies(args.service_latency, args.latency_ms)
+    stack = None
+    if args.gateway_url:
+        url = args.gateway_url.rstrip('/')
+    else:
+        stack = Stack(args.port_base, latencies, args.jitter_ms, args.list_size)
+        url = stack.gateway_url
+    try:
+        if stack:
+            stack.start()
+        tokens = {'user': login(url, args.user_email, args.user_password)}
+        if any(OPERATIONS[name][1] for name in mix):
+            tokens['admin'] = login(url, args.admin_email, args.admin_password)
+        run = LoadRun(url, mix, tokens, [int(showtime_id) for showtime_id in args.showtime_ids.split(',')])
+        print(f"Running {args.mix} with {args.concurrency} clients against {url}")
+        elapsed = run.run(args.concurrency, args.warmup, args.duration, args.requests)
+    finally:
+        if stack:
+            stack.stop()
+
+    results = run.summary(elapsed)
+    results['recorded_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    results['config'] = {
+        'mix': mix, 'concurrency': args.concurrency, 'target': 'running gateway' if args.gateway_url else 'stubs',
+        'latency_ms': latencies, 'jitter_ms': args.jitter_ms, 'list_size': args.list_size,
+        'python': platform.python_version(), 'machine': platform.node()
+    }
+    print_report(results)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), args.tolerance)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as baseline_file:
+            json.dump(results, baseline_file, indent=2)
+        print(f"\nSaved baseline to {args.save_baseline}")
+    if regressions:
+        print(f"\n{len(regressions)} metrics regressed beyond {args.tolerance:.0%}")
+        raise SystemExit(1)
\ No newline at end of file
@@ -0,0 +1,162 @@
+"""Pin the SQL statement counts of the resolvers that were optimized against
+per-row queries, so an N+1 regression fails here instead of in production.
+
+Each check runs one GraphQL query against a service's own schema on a fresh
+SQLite database holding enough rows that a per-row query would show up, inside
+shared/querystats.py's assert_max_queries. Checks marked warm run the query once
+first, so they measure the in-process caches. A failing check prints the
+statements that ran; the exit status is 1 if any check failed.
+
+    python query_counts.py
+    python query_counts.py --service booking
+
+Needs the services' requirements.
+"""
+from datetime import datetime, timedelta
+from flask import Flask
+import importlib
+import argparse
+import tempfile
+import shutil
+import sys
+import os
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVICES_DIR = os.path.join(ROOT_DIR, 'services')
+sys.path.insert(0, ROOT_DIR)  # shared/
+
+from shared.querystats import assert_max_queries, instrument_queries
+
+ROWS = 20
+
+def seed_booking(models):
+    for index in range(ROWS):
+        booking = models.Booking(user_id=1, showtime_id=1, status='PAID')
+        models.db.session.add(booking)
+        models.db.session.flush()
+        for seat in ('A1', 'A2', 'A3'):
+            models.db.session.add(models.Ticket(booking_id=booking.id, seat_number=f"{seat}-{index}"))
+
+def seed_payment(models):
+    for index in range(ROWS):
+        models.db.session.add(models.Payment(user_id=1, booking_id=index + 1, amount=50000, status='pending',
+                                             payment_proof_image='aGVsbG8='))
+
+def seed_user(models):
+    for index in range(ROWS):
+        models.db.session.add(models.User(username=f"user{index}", email=f"user{index}@example.com",
+                                          hashed_password='x'))
+
+def seed_cinema(models):
+    cinema = models.Cinema(name='Cinema', city='Bandung', capacity=100)
+    models.db.session.add(cinema)
+    models.db.session.flush()
+    auditoriums = [models.Auditorium(cinema_id=cinema.id, name=f"Studio {index}") for index in range(3)]
+    models.db.session.add_all(auditoriums)
+    models.db.session.flush()
+    for index in range(ROWS):
+        models.db.session.add(models.Showtime(movie_id=1, auditorium_id=auditoriums[index % 3].id,
+                                              start_time='2030-01-01 19:00', price=50000))
+
+def seed_movie(models):
+    for index in range(ROWS):
+        models.db.session.add(models.Movie(title=f"Movie {index}", genre='Drama', duration=120))
+
+def seed_coupon(models):
+    for index in range(ROWS):
+        models.db.session.add(models.Coupon(code=f"PROMO{index}", name='Promo', discount_percentage=10,
+                                            valid_until=datetime.utcnow() + timedelta(days=30), is_active=True))
+
+# service -> (seed function, [(name, query, max statements, warm)])
+CHECKS = {
+    'booking': (seed_booking, [
+        ('bookings with tickets', '{ bookings(first: 50) { id tickets { seatNumber } } }', 2, False),
+        ('userBookings with tickets', '{ userBookings(userId: 1, first: 50) { id tickets { seatNumber } } }', 2, False),
+        ('bookings with tickets in a fragment',
+         '{ bookings(first: 50) { ...withTickets } } fragment withTickets on BookingType { id tickets { seatNumber } }', 2, False),
+        ('bookings without tickets', '{ bookings(first: 50) { id status } }', 1, False),
+    ]),
+    'payment': (seed_payment, [
+        ('payments without proof', '{ payments(first: 50) { id status amount } }', 1, False),
+        ('payments with proof', '{ payments(first: 50) { id paymentProofImage } }', 1, False),
+        ('userPayments', '{ userPayments(userId: 1, first: 50) { id canBeDeleted } }', 1, False),
+        ('pendingPayments', '{ pendingPayments(first: 50) { id bookingId } }', 1, False),
+    ]),
+    'user': (seed_user, [
+        ('usersByIds', '{ usersByIds(ids: [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]) { id email role } }', 1, False),
+    ]),
+    'cinema': (seed_cinema, [
+        ('showtimesByMovie with auditorium', '{ showtimesByMovie(movieId: 1, first: 50) { id auditorium { name } } }', 1, True),
+        ('cinema', '{ cinema(id: 1) { name city } }', 0, True),
+    ]),
+    'movie': (seed_movie, [
+        ('movie', '{ movie(id: 1) { title genre } }', 0, True),
+    ]),
+    'coupon': (seed_coupon, [
+        ('availableCoupons', '{ availableCoupons(first: 50) { code discountPercentage } }', 0, True),
+        ('validateCoupon', '{ validateCoupon(code: "PROMO1") }', 0, True),
+    ]),
+}
+
+def load_service(service):
+    """A service's models and schema modules, imported on their own: the services share
+    module names like models and cache, so the service's modules are dropped from
+    sys.modules again"""
+    src = os.path.join(SERVICES_DIR, f"{service}-service", 'src')
+    sys.path.insert(0, src)
+    try:
+        return importlib.import_module('models'), importlib.import_module('schema')
+    finally:
+        sys.path.remove(src)
+        for name, module in list(sys.modules.items()):
+            if os.path.dirname(os.path.abspath(getattr(module, '__file__', None) or '')) == src:
+                del sys.modules[name]
+
+def run_checks(service, data_dir):
+    """Run a service's checks, returns the number that failed"""
+    seed, checks = CHECKS[service]
+    models, schema = load_service(service)
+
+    app = Flask(f"{service}-query-counts")
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{os.path.join(data_dir, service)}.sqlite"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    models.db.init_app(app)
+
+    failed = 0
+    with app.app_context():
+        models.db.create_all()
+        seed(models)
+        models.db.session.commit()
+
+        for name, query, limit, warm in checks:
+            models.db.session.remove()
+            if warm:
+                schema.schema.execute(query)
+            try:
+                with assert_max_queries(limit, f"{service}: {name}") as stats:
+                    result = schema.schema.execute(query)
+                if result.errors:
+                    raise AssertionError(f"{service}: {name} failed: {result.errors}")
+                print(f"ok    {service}: {name} ({stats.count} statements, at most {limit})")
+            except AssertionError as e:
+                print(f"FAIL  {e}")
+                failed += 1
+    return failed
+
+def main():
+    parser = argparse.ArgumentParser(description='Check the SQL statement counts of optimized resolvers')
+    parser.add_argument('--service', choices=sorted(CHECKS), action='append', help='Only these services (repeatable)')
+    args = parser.parse_args()
+
+    instrument_queries()
+    data_dir = tempfile.mkdtemp(prefix='query-counts-')
+    try:
+        failed = sum(run_checks(service, data_dir) for service in args.service or CHECKS)
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+    print(f"{failed} check(s) failed" if failed else "All query counts within budget")
+    return 1 if failed else 0
+
+if __name__ == '__main__':
+    raise SystemExit(main())
\ No newline at end of file
@@ -0,0 +1,299 @@
+"""Replay traffic captured by the gateway (CAPTURE_DIR, see gateway/capture.py) against a gateway.
+
+Requests are sent at their captured arrival times divided by --speed, from as many
+threads as needed (up to --max-workers), so the replay keeps the capture's
+arrival pattern and concurrency instead of running a closed loop. Each captured
+caller (auth reference) is mapped to a test user: ADMIN callers log in as
+--admin-email, the others as one of --users users made by generate_dataset.py,
+anonymous requests stay anonymous and invalid tokens stay invalid. REDACTED
+password variables are sent as --password.
+
+Reported per operation: requests, errors, p50/p95/p99 of the replay next to the
+captured server-side timings (or, with --baseline, next to an earlier replay
+written with --output), plus captured and replayed peak concurrency and how late
+the replayer dispatched requests. Compare replays with each other to judge an
+optimization: captured timings come from another machine and exclude the network.
+
+    python replay_capture.py captures/gateway-20260101-*.jsonl.gz --gateway-url http://localhost:5000 \\
+        --speed 2 --output before.json
+    python replay_capture.py captures/*.jsonl.gz --gateway-url http://localhost:5000 --speed 2 --baseline before.json
+    python replay_capture.py capture.jsonl.gz --read-only --speed 10  # against stub services and a local gateway
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import defaultdict
+from gateway_load import Stack, SERVICES, percentile, login
+import threading
+import argparse
+import platform
+import requests
+import gzip
+import glob
+import json
+import time
+import re
+
+REDACTED = '[REDACTED]'
+MUTATION_PATTERN = re.compile(r'^\s*mutation\b')
+LATE_DISPATCH_WARN_MS = 20
+
+def load_capture(patterns, operations=None, read_only=False, limit=0):
+    records = []
+    for pattern in patterns:
+        paths = sorted(glob.glob(pattern)) or [pattern]
+        for path in paths:
+            opener = gzip.open if path.endswith('.gz') else open
+            with opener(path, 'rt') as capture_file:
+                try:
+                    for line in capture_file:
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            continue  # A line cut short when the gateway stopped
+                        if not record.get('query'):
+                            continue
+                        if operations and record.get('operation') not in operations:
+                            continue
+                        if read_only and MUTATION_PATTERN.match(record['query']):
+                            continue
+                        records.append(record)
+                except EOFError:
+                    pass  # Written by a gateway that was killed: everything flushed before that is read
+    records.sort(key=lambda record: record['ts'])
+    return records[:limit] if limit else records
+
+def peak_concurrency(intervals):
+    """Most intervals (start, end) open at once"""
+    events = sorted([(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals])
+    peak = current = 0
+    for _, change in events:
+        current += change
+        peak = max(peak, current)
+    return peak
+
+def latency_stats(values):
+    values = sorted(values)
+    return {
+        'p50_ms': round(percentile(values, 0.50), 2) if values else None,
+        'p95_ms': round(percentile(values, 0.95), 2) if values else None,
+        'p99_ms': round(percentile(values, 0.99), 2) if values else None
+    }
+
+def fill_redacted(value, password):
+    if isinstance(value, dict):
+        return {key: fill_redacted(item, password) for key, item in value.items()}
+    if isinstance(value, list):
+        return [fill_redacted(item, password) for item in value]
+    return password if value == REDACTED else value
+
+class Identities:
+    """Test-user tokens standing in for captured callers"""
+
+    def __init__(self, url, args):
+        self.url = url
+        self.args = args
+        self.tokens = {}
+        self.user_slots = {}
+
+    def _key(self, auth):
+        if auth.get('role') == 'ADMIN':
+            return 'admin'
+        return self.user_slots.setdefault(auth['ref'], len(self.user_slots) % self.args.users)
+
+    def prepare(self, records):
+        """Log in for every caller up front, so logins don't delay the replay"""
+        for record in records:
+            auth = record.get('auth')
+            if not auth or auth.get('role') == 'INVALID':
+                continue
+            key = self._key(auth)
+            if key in self.tokens:
+                continue
+            if key == 'admin':
+                email, password = self.args.admin_email, self.args.admin_password
+            else:
+                email, password = self.args.user_email.format(n=self.args.first_user + key), self.args.password
+            try:
+                self.tokens[key] = login(self.url, email, password)
+            except SystemExit as e:
+                print(f"{str(e)}; replaying that caller anonymously")
+                self.tokens[key] = None
+
+    def token_for(self, auth):
+        if not auth:
+            return None
+        if auth.get('role') == 'INVALID':
+            return 'invalid'
+        return self.tokens.get(self._key(auth))
+
+class Replay:
+    def __init__(self, url, records, identities, speed, max_workers):
+        self.url = url
+        self.records = records
+        self.identities = identities
+        self.speed = speed
+        self.max_workers = max_workers
+        self.results = []  # (record, latency ms, status, graphql errors, dispatch lag ms, start, end)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def send(self, record, due):
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        lag_ms = (time.perf_counter() - due) * 1000
+        headers = {'Content-Type': 'application/json'}
+        token = self.identities.token_for(record.get('auth'))
+        if token:
+            headers['Authorization'] = f"Bearer {token}"
+        body = {'query': record['query'], 'variables': fill_redacted(record.get('variables') or {}, self.identities.args.password)}
+        if record.get('operationName'):
+            body['operationName'] = record['operationName']
+        with self._lock:
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        started = time.perf_counter()
+        try:
+            response = session.post(f"{self.url}/graphql", json=body, headers=headers, timeout=60)
+            status = response.status_code
+            try:
+                errors = bool((response.json() or {}).get('errors'))
+            except ValueError:
+                errors = True
+        except requests.exceptions.RequestException:
+            status, errors = None, True
+        finished = time.perf_counter()
+        with self._lock:
+            self.in_flight -= 1
+            self.results.append((record, (finished - started) * 1000, status, errors, lag_ms, started, finished))
+
+    def run(self):
+        first_ts = self.records[0]['ts']
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            started = time.perf_counter()
+            for record in self.records:
+                due = started + (record['ts'] - first_ts) / self.speed
+                delay = due - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                pool.submit(self.send, record, due)
+        return time.perf_counter() - started
+
+def summarize(replay, elapsed):
+    by_operation = defaultdict(list)
+    for result in replay.results:
+        by_operation[result[0].get('operation') or 'unknown'].append(result)
+    operations = {}
+    for name, results in sorted(by_operation.items(), key=lambda item: -len(item[1])):
+        operations[name] = {
+            'requests': len(results),
+            'errors': sum(1 for _, _, status, errors, _, _, _ in results if errors or status != 200),
+            'captured_errors': sum(1 for record, *_ in results if record.get('errors') or record.get('status') != 200),
+            **latency_stats([latency for _, latency, *_ in results]),
+            'captured': latency_stats([record['durationMs'] for record, *_ in results if record.get('durationMs') is not None])
+        }
+    lags = sorted(result[4] for result in replay.results)
+    return {
+        'operations': operations,
+        'total': {'requests': len(replay.results), **latency_stats([result[1] for result in replay.results])},
+        'elapsed_seconds': round(elapsed, 2),
+        'captured_seconds': round(replay.records[-1]['ts'] - replay.records[0]['ts'], 2),
+        'captured_peak_concurrency': peak_concurrency(
+            [(record['ts'], record['ts'] + (record.get('durationMs') or 0) / 1000) for record in replay.records]),
+        'replay_peak_concurrency': replay.peak_in_flight,
+        'dispatch_lag_ms': {'p95': round(percentile(lags, 0.95), 2) if lags else None,
+                            'max': round(lags[-1], 2) if lags else None}
+    }
+
+def print_report(results, baseline=None):
+    against = 'baseline' if baseline else 'captured'
+    print(f"\n{'operation':<22} {'requests':>9} {'errors':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}   "
+          f"{against + ' p50/p95':>20} {'delta p50':>10} {'delta p95':>10}")
+    for name, stats in results['operations'].items():
+        if baseline:
+            before = baseline.get('operations', {}).get(name)
+        else:
+            before = stats['captured']
+        old_p50, old_p95 = (before or {}).get('p50_ms'), (before or {}).get('p95_ms')
+
+        def delta(new, old):
+            return f"{(new - old) / old:+.0%}" if old and new is not None else '-'
+
+        reference = f"{old_p50}/{old_p95}" if before else 'n/a'
+        print(f"{name:<22} {stats['requests']:>9} {stats['errors']:>7} {stats['p50_ms']:>9} {stats['p95_ms']:>9} {stats['p99_ms']:>9}   "
+              f"{reference:>20} {delta(stats['p50_ms'], old_p50):>10} {delta(stats['p95_ms'], old_p95):>10}")
+    total = results['total']
+    print(f"{'total':<22} {total['requests']:>9} {'':>7} {total['p50_ms']:>9} {total['p95_ms']:>9} {total['p99_ms']:>9}")
+    print(f"\nReplayed {results['captured_seconds']}s of traffic in {results['elapsed_seconds']}s; peak concurrency "
+          f"{results['replay_peak_concurrency']} (captured {results['captured_peak_concurrency']})")
+    lag = results['dispatch_lag_ms']
+    if lag['p95'] is not None and lag['p95'] > LATE_DISPATCH_WARN_MS:
+        print(f"Warning: requests were dispatched late (p95 {lag['p95']} ms, max {lag['max']} ms), "
+              f"raise --max-workers or lower --speed")
+    for name, stats in results['operations'].items():
+        if stats['errors'] > stats['captured_errors']:
+            print(f"  {name}: {stats['errors']} errors in the replay, {stats['captured_errors']} in the capture")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replay captured gateway traffic')
+    parser.add_argument('captures', nargs='+', help='Capture files or glob patterns (.jsonl or .jsonl.gz)')
+    parser.add_argument('--gateway-url', help='Replay against this gateway instead of starting stubs and a gateway')
+    parser.add_argument('--speed', type=float, default=1.0, help='Replay this many times faster than captured')
+    parser.add_argument('--max-workers', type=int, default=256, help='Most requests in flight at once')
+    parser.add_argument('--operations', help='Only replay these operations (comma-separated)')
+    parser.add_argument('--read-only', action='store_true', help='Skip mutations')
+    parser.add_argument('--limit', type=int, default=0, help='Replay only the first this many requests')
+    parser.add_argument('--users', type=int, default=50, help='Test users standing in for captured callers')
+    parser.add_argument('--first-user', type=int, default=3, help='First user id (generate_dataset.py users start at 3)')
+    parser.add_argument('--user-email', default='user{n}@example.com', help='Email pattern of user n')
+    parser.add_argument('--password', default='password', help='Password of the test users and for REDACTED values')
+    parser.add_argument('--admin-email', default='admin@cinema.com')
+    parser.add_argument('--admin-password', default='admin123')
+    parser.add_argument('--port-base', type=int, default=15000, help='Gateway port when starting stubs; stubs use the next six')
+    parser.add_argument('--latency-ms', type=float, default=5, help='Stub response delay for every service')
+    parser.add_argument('--baseline', help='Earlier --output to compare with instead of the captured timings')
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+
+    records = load_capture(args.captures, set(args.operations.split(',')) if args.operations else None,
+                           args.read_only, args.limit)
+    if not records:
+        raise SystemExit('No requests to replay')
+    stack = None
+    if args.gateway_url:
+        url = args.gateway_url.rstrip('/')
+    else:
+        stack = Stack(args.port_base, {service: args.latency_ms for service in SERVICES}, 0, 20)
+        url = stack.gateway_url
+    try:
+        if stack:
+            stack.start()
+        identities = Identities(url, args)
+        identities.prepare(records)
+        replay = Replay(url, records, identities, args.speed, args.max_workers)
+        print(f"Replaying {len(records)} requests at {args.speed}x against {url}")
+        elapsed = replay.run()
+    finally:
+        if stack:
+            stack.stop()
+
+    results = summarize(replay, elapsed)
+    results['recorded_at'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+    results['config'] = {
+        'captures': args.captures, 'speed': args.speed, 'read_only': args.read_only, 'operations': args.operations,
+        'target': url if args.gateway_url else 'stubs', 'python': platform.python_version(), 'machine': platform.node()
+    }
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+        for setting in ('captures', 'speed', 'read_only', 'operations', 'target'):
+            old, new = baseline.get('config', {}).get(setting), results['config'].get(setting)
+            if old != new:
+                print(f"Note: {setting} differs from the baseline ({old} -> {new}), results may not be comparable")
+    print_report(results, baseline)
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+        print(f"\nWrote {args.output}")
\ No newline at end of file
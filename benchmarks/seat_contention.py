@@ -0,0 +1,321 @@
+"""Opening-night contention benchmark: many buyers racing for the same few hundred seats.
+
+--buyers buyers each want a group of 1 to --max-group adjacent seats among the
+first --hot-seats available seats of one showtime. Tickets "go on sale" for
+all --concurrency client threads at once; a buyer whose createBooking fails
+tries another group, up to --max-retries more times, after --retry-delay-ms.
+Requests go through the gateway (--gateway-url, logging in as --users of the
+users made by generate_dataset.py) or straight to booking-service
+(--booking-url).
+
+Reported:
+  - success rate per buyer and per attempt, and when the hot seats sold out
+  - attempt latency (p50/p95/p99/max) for successes and failures, and time to
+    a seat per successful buyer including retries
+  - double-booking violations: seats claimed by more than one successful
+    booking, successful bookings whose seats ended up held by another booking,
+    and seats left RESERVED by bookings that failed (leaked holds)
+  - retry amplification: attempts per successful booking, and downstream
+    calls per successful booking from the /metrics of the gateway and
+    booking-service (--metrics-url)
+
+Final seat states are read from cinema-service (--cinema-url) or through the
+gateway. --reset-seats sets the hot seats back to AVAILABLE first (needs
+--cinema-url). --output writes the results as JSON, to compare seat-locking
+changes run against run.
+
+    python seat_contention.py --gateway-url http://localhost:5000 --cinema-url http://localhost:3008 \\
+        --showtime-id 1 --hot-seats 300 --buyers 2000 --concurrency 200 --reset-seats
+    python seat_contention.py --booking-url http://localhost:3007 --cinema-url http://localhost:3008 \\
+        --showtime-id 1 --max-retries 0 --output no-retries.json
+"""
+from gateway_load import percentile
+from collections import defaultdict
+import threading
+import argparse
+import requests
+import random
+import json
+import time
+import re
+
+METRIC_LINE = re.compile(r'^downstream_request_duration_seconds_count\{([^}]*)\}\s+([0-9.e+]+)$')
+
+def latency_summary(values):
+    values = sorted(values)
+    return {
+        'count': len(values),
+        'p50_ms': round(percentile(values, 0.50), 2) if values else None,
+        'p95_ms': round(percentile(values, 0.95), 2) if values else None,
+        'p99_ms': round(percentile(values, 0.99), 2) if values else None,
+        'max_ms': round(values[-1], 2) if values else None
+    }
+
+def post_graphql(session, url, query, variables, token=None, timeout=60):
+    headers = {'Content-Type': 'application/json'}
+    if token:
+        headers['Authorization'] = f"Bearer {token}"
+    response = session.post(f"{url}/graphql", json={'query': query, 'variables': variables}, headers=headers, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+def downstream_calls(metrics_urls):
+    """Calls made to other services so far, summed by target over the given /metrics endpoints"""
+    totals = defaultdict(float)
+    for url in metrics_urls:
+        try:
+            text = requests.get(url, timeout=10).text
+        except requests.exceptions.RequestException as e:
+            print(f"Could not read {url}: {str(e)}")
+            continue
+        for line in text.splitlines():
+            match = METRIC_LINE.match(line)
+            if match:
+                target = re.search(r'target="([^"]*)"', match.group(1))
+                totals[target.group(1) if target else 'unknown'] += float(match.group(2))
+    return totals
+
+class BookingClient:
+    """createBooking through the gateway (per-user tokens) or straight at booking-service"""
+
+    GATEWAY_MUTATION = '''mutation CreateBooking($showtimeId: Int!, $seatNumbers: [String]!) {
+        createBooking(showtimeId: $showtimeId, seatNumbers: $seatNumbers) { success message booking { id } }
+    }'''
+    SERVICE_MUTATION = '''mutation CreateBooking($userId: Int!, $showtimeId: Int!, $seatNumbers: [String]!) {
+        createBooking(userId: $userId, showtimeId: $showtimeId, seatNumbers: $seatNumbers) { success message booking { id } }
+    }'''
+
+    def __init__(self, args):
+        self.args = args
+        self.tokens = []
+        if args.gateway_url:
+            self.tokens = [self._login(args.user_email.format(n=n), args.password)
+                           for n in range(args.first_user, args.first_user + args.users)]
+
+    def _login(self, email, password):
+        result = post_graphql(requests.Session(), self.args.gateway_url, '''mutation Login($email: String!, $password: String!) {
+            login(email: $email, password: $password) { token }
+        }''', {'email': email, 'password': password})
+        token = ((result.get('data') or {}).get('login') or {}).get('token')
+        if not token:
+            raise SystemExit(f"Login as {email} failed: {result.get('errors')}")
+        return token
+
+    def create_booking(self, session, buyer, seats):
+        """(booking id or None, message)"""
+        if self.args.gateway_url:
+            result = post_graphql(session, self.args.gateway_url, self.GATEWAY_MUTATION,
+                                  {'showtimeId': self.args.showtime_id, 'seatNumbers': seats},
+                                  self.tokens[buyer % len(self.tokens)])
+        else:
+            result = post_graphql(session, self.args.booking_url, self.SERVICE_MUTATION,
+                                  {'userId': self.args.first_user + buyer, 'showtimeId': self.args.showtime_id, 'seatNumbers': seats})
+        if result.get('errors'):
+            return None, '; '.join(str(error.get('message', error) if isinstance(error, dict) else error) for error in result['errors'])
+        booking = (result.get('data') or {}).get('createBooking') or {}
+        if booking.get('success') and (booking.get('booking') or {}).get('id'):
+            return booking['booking']['id'], booking.get('message')
+        return None, booking.get('message')
+
+    def seat_statuses(self):
+        query = '''query SeatStatuses($showtimeId: Int!) {
+            seatStatuses(showtimeId: $showtimeId) { seatNumber status bookingId }
+        }'''
+        if self.args.cinema_url:
+            result = post_graphql(requests.Session(), self.args.cinema_url, query, {'showtimeId': self.args.showtime_id})
+        else:
+            result = post_graphql(requests.Session(), self.args.gateway_url, query, {'showtimeId': self.args.showtime_id}, self.tokens[0])
+        if result.get('errors'):
+            raise SystemExit(f"Could not read seat statuses: {result['errors']}")
+        return (result.get('data') or {}).get('seatStatuses') or []
+
+    def reset_seats(self, seats):
+        session = requests.Session()
+        for seat in seats:
+            post_graphql(session, self.args.cinema_url, '''mutation Reset($showtimeId: Int!, $seatNumber: String!) {
+                updateSeatStatus(showtimeId: $showtimeId, seatNumber: $seatNumber, status: "AVAILABLE", bookingId: null) { success }
+            }''', {'showtimeId': self.args.showtime_id, 'seatNumber': seat})
+
+class ContentionRun:
+    def __init__(self, client, hot_seats, args):
+        self.client = client
+        self.hot_seats = hot_seats
+        self.args = args
+        self.attempts = []  # (buyer, attempt number, seats, booking id or None, latency ms, message)
+        self.successes = []  # (buyer, booking id, seats, attempts, ms from sale start)
+        self.sold_out_ms = None
+        self._lock = threading.Lock()
+
+    def pick_seats(self, rng):
+        """Adjacent seats in the hot set, as buyers pick seats next to each other"""
+        size = rng.randint(1, self.args.max_group)
+        start = rng.randrange(0, max(1, len(self.hot_seats) - size + 1))
+        return self.hot_seats[start:start + size]
+
+    def buy(self, session, buyer, rng, sale_started):
+        for attempt in range(1, self.args.max_retries + 2):
+            seats = self.pick_seats(rng)
+            started = time.perf_counter()
+            try:
+                booking_id, message = self.client.create_booking(session, buyer, seats)
+            except (requests.exceptions.RequestException, ValueError) as e:
+                booking_id, message = None, f"request failed: {str(e)}"
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            with self._lock:
+                self.attempts.append((buyer, attempt, seats, booking_id, elapsed_ms, message))
+                if booking_id:
+                    self.successes.append((buyer, booking_id, seats, attempt, (time.perf_counter() - sale_started) * 1000))
+            if booking_id:
+                return
+            if self.args.retry_delay_ms:
+                time.sleep(self.args.retry_delay_ms / 1000 * attempt)
+
+    def run(self):
+        buyers = iter(range(self.args.buyers))
+        buyers_lock = threading.Lock()
+        on_sale = threading.Barrier(self.args.concurrency + 1)
+        timing = {}
+
+        def worker(index):
+            session = requests.Session()
+            rng = random.Random(self.args.seed * 100003 + index)
+            on_sale.wait()
+            while True:
+                with buyers_lock:
+                    buyer = next(buyers, None)
+                if buyer is None:
+                    return
+                self.buy(session, buyer, rng, timing['started'])
+
+        threads = [threading.Thread(target=worker, args=(index,), daemon=True) for index in range(self.args.concurrency)]
+        for thread in threads:
+            thread.start()
+        timing['started'] = time.perf_counter()
+        on_sale.wait()
+        for thread in threads:
+            thread.join()
+        return time.perf_counter() - timing['started']
+
+def check_violations(successes, seat_statuses, hot_seats):
+    claims = defaultdict(list)
+    for _, booking_id, seats, _, _ in successes:
+        for seat in seats:
+            claims[seat].append(booking_id)
+    successful_ids = {booking_id for _, booking_id, _, _, _ in successes}
+    holders = {status['seatNumber']: status for status in seat_statuses}
+
+    double_claimed = {seat: ids for seat, ids in claims.items() if len(ids) > 1}
+    lost = []  # Successful bookings whose seat is not held by them at the end
+    for seat, ids in claims.items():
+        holder = holders.get(seat) or {}
+        for booking_id in ids:
+            if holder.get('status') not in ('RESERVED', 'BOOKED') or holder.get('bookingId') != booking_id:
+                lost.append({'seat': seat, 'booking_id': booking_id, 'holder': holder.get('bookingId'), 'status': holder.get('status')})
+    # The hot seats were all AVAILABLE when the sale started, so a hold by any other booking
+    # was left behind by a createBooking that failed (its booking row is deleted, its seats are not released)
+    leaked = [seat for seat in hot_seats
+              if (holders.get(seat) or {}).get('status') in ('RESERVED', 'BOOKED')
+              and holders[seat].get('bookingId') not in successful_ids]
+    return {
+        'double_claimed_seats': len(double_claimed),
+        'successful_bookings_without_their_seat': len(lost),
+        'leaked_holds': len(leaked),
+        'examples': {'double_claimed': dict(list(double_claimed.items())[:5]), 'lost': lost[:5], 'leaked': leaked[:5]}
+    }
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Race concurrent createBooking calls for the same seats')
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--gateway-url', help='Book through the gateway')
+    target.add_argument('--booking-url', help='Book straight at booking-service')
+    parser.add_argument('--cinema-url', help='cinema-service, for reading and resetting seat states')
+    parser.add_argument('--metrics-url', action='append', default=[],
+                        help='Extra /metrics endpoint to count downstream calls from, e.g. booking-service (repeatable)')
+    parser.add_argument('--showtime-id', type=int, required=True)
+    parser.add_argument('--hot-seats', type=int, default=300, help='Seats everyone competes for')
+    parser.add_argument('--buyers', type=int, default=2000)
+    parser.add_argument('--concurrency', type=int, default=200, help='Client threads')
+    parser.add_argument('--max-group', type=int, default=4, help='Largest group of seats a buyer books')
+    parser.add_argument('--max-retries', type=int, default=2, help='Further attempts after a failed booking')
+    parser.add_argument('--retry-delay-ms', type=float, default=0, help='Delay before retry n is n times this')
+    parser.add_argument('--users', type=int, default=50, help='Gateway users to log in as')
+    parser.add_argument('--first-user', type=int, default=3, help='First user id (generate_dataset.py users start at 3)')
+    parser.add_argument('--user-email', default='user{n}@example.com', help='Email pattern of user n')
+    parser.add_argument('--password', default='password')
+    parser.add_argument('--reset-seats', action='store_true', help='Make the hot seats AVAILABLE first')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='Write the results as JSON to this file')
+    args = parser.parse_args()
+    if args.reset_seats and not args.cinema_url:
+        parser.error('--reset-seats needs --cinema-url')
+
+    client = BookingClient(args)
+    statuses = client.seat_statuses()
+    if args.reset_seats:
+        client.reset_seats([status['seatNumber'] for status in statuses[:args.hot_seats]])
+        statuses = client.seat_statuses()
+    hot_seats = [status['seatNumber'] for status in statuses if status['status'] == 'AVAILABLE'][:args.hot_seats]
+    if not hot_seats:
+        raise SystemExit(f"Showtime {args.showtime_id} has no available seats, try --reset-seats")
+
+    metrics_urls = [f"{(args.gateway_url or args.booking_url).rstrip('/')}/metrics"] + args.metrics_url
+    calls_before = downstream_calls(metrics_urls)
+    print(f"{args.buyers} buyers, {args.concurrency} at a time, racing for {len(hot_seats)} seats of showtime {args.showtime_id}")
+    run = ContentionRun(client, hot_seats, args)
+    elapsed = run.run()
+    calls_after = downstream_calls(metrics_urls)
+
+    violations = check_violations(run.successes, client.seat_statuses(), hot_seats)
+
+    seats_sold = sum(len(seats) for _, _, seats, _, _ in run.successes)
+    downstream = {target: int(calls_after[target] - calls_before.get(target, 0)) for target in calls_after
+                  if calls_after[target] - calls_before.get(target, 0) > 0}
+    failures = defaultdict(int)
+    for _, _, _, booking_id, _, message in run.attempts:
+        if not booking_id:
+            failures[re.sub(r'\b[A-Z]*\d+\b(?:, [A-Z]*\d+\b)*', 'N', message or 'no message')[:80]] += 1
+    results = {
+        'config': {key: value for key, value in vars(args).items() if key != 'password'},
+        'elapsed_seconds': round(elapsed, 2),
+        'buyers': args.buyers,
+        'hot_seats': len(hot_seats),
+        'seats_sold': seats_sold,
+        'buyer_success_rate': round(len({buyer for buyer, _, _, _, _ in run.successes}) / args.buyers, 4),
+        'attempts': len(run.attempts),
+        'attempt_success_rate': round(len(run.successes) / len(run.attempts), 4) if run.attempts else 0,
+        'bookings_per_second': round(len(run.successes) / elapsed, 2),
+        'last_success_ms': round(max((ms for _, _, _, _, ms in run.successes), default=0), 1),
+        'latency': {
+            'successful_attempts': latency_summary([ms for _, _, _, booking_id, ms, _ in run.attempts if booking_id]),
+            'failed_attempts': latency_summary([ms for _, _, _, booking_id, ms, _ in run.attempts if not booking_id]),
+            'time_to_seat': latency_summary([ms for _, _, _, _, ms in run.successes])
+        },
+        'retry_amplification': {
+            'attempts_per_successful_booking': round(len(run.attempts) / len(run.successes), 2) if run.successes else None,
+            'downstream_calls': downstream,
+            'downstream_calls_per_successful_booking': {target: round(count / len(run.successes), 2)
+                                                        for target, count in downstream.items()} if run.successes else {}
+        },
+        'violations': violations,
+        'failure_reasons': dict(sorted(failures.items(), key=lambda item: -item[1])[:10])
+    }
+
+    print(f"\nSold {seats_sold} of {len(hot_seats)} seats in {results['elapsed_seconds']}s "
+          f"({results['bookings_per_second']} bookings/s, last success after {results['last_success_ms']} ms)")
+    print(f"Buyers with seats: {results['buyer_success_rate']:.1%}; attempts: {results['attempts']}, "
+          f"{results['attempt_success_rate']:.1%} succeeded")
+    for name, summary in results['latency'].items():
+        print(f"  {name:<20} n={summary['count']:<6} p50 {summary['p50_ms']} ms  p95 {summary['p95_ms']} ms  "
+              f"p99 {summary['p99_ms']} ms  max {summary['max_ms']} ms")
+    amplification = results['retry_amplification']
+    print(f"Retry amplification: {amplification['attempts_per_successful_booking']} attempts per booking; "
+          f"downstream calls per booking {amplification['downstream_calls_per_successful_booking'] or 'not available'}")
+    print(f"Violations: {violations['double_claimed_seats']} seats claimed by several bookings, "
+          f"{violations['successful_bookings_without_their_seat']} successful bookings without their seat, "
+          f"{violations['leaked_holds']} holds leaked by failed bookings")
+    for reason, count in results['failure_reasons'].items():
+        print(f"  {count:>6} x {reason}")
+    if args.output:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2)
+        print(f"Wrote {args.output}")
\ No newline at end of file
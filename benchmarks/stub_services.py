@@ -0,0 +1,242 @@
+"""Canned stand-ins for the six services, for benchmarking the gateway on its own.
+
+Each stub answers POST /graphql for any query the gateway sends: root fields are
+served from the fixtures below (deterministic rows derived from the requested
+ids) and projected onto the query's selection set. Unknown root fields get an
+object whose ids are 1 and whose `success` is true. Every request sleeps for
+--latency-ms plus up to --jitter-ms first, standing in for the service's work.
+
+The user stub also serves /.well-known/jwks.json and signs tokens in loginUser:
+emails starting with "admin" get an ADMIN token for user ADMIN_USER_ID, all
+others a USER token for BENCH_USER_ID. Bookings belong to BENCH_USER_ID, are
+PENDING, and booking N is for showtime N, whose first two seats are RESERVED
+for booking N, so createPayment succeeds for any booking id.
+
+    python stub_services.py booking --port 13007 --latency-ms 5 --jitter-ms 5
+
+Needs the gateway's requirements (Flask, graphql-core, PyJWT, cryptography).
+"""
+from flask import Flask, jsonify, request
+from graphql import parse
+from graphql.language import ast
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from jwt.algorithms import OKPAlgorithm
+import argparse
+import itertools
+import datetime
+import logging
+import random
+import json
+import time
+import jwt
+
+SERVICES = ('user', 'movie', 'cinema', 'booking', 'payment', 'coupon')
+
+ADMIN_USER_ID = 1
+BENCH_USER_ID = 2
+SEATS = [f"{row}{number}" for row in 'ABCDEFGH' for number in range(1, 13)]
+RESERVED_SEATS = SEATS[:2]  # Held for the booking with the showtime's id, see seat_statuses()
+TIMESTAMP = '2026-01-01T19:00:00'
+
+_next_id = itertools.count(1000000)
+
+def cinema(cinema_id):
+    return {'id': cinema_id, 'name': f"Cinema {cinema_id}", 'city': 'Jakarta', 'capacity': 500}
+
+def auditorium(auditorium_id):
+    cinema_id = (auditorium_id - 1) // 4 + 1
+    return {
+        'id': auditorium_id, 'cinemaId': cinema_id, 'cinema_id': cinema_id, 'name': f"Studio {auditorium_id}",
+        'seatLayout': json.dumps({'seats': [{'number': seat} for seat in SEATS]}),
+        'cinema': cinema(cinema_id)
+    }
+
+def movie(movie_id):
+    return {
+        'id': movie_id, 'title': f"Movie {movie_id}", 'genre': 'Drama', 'duration': 120,
+        'description': 'Benchmark fixture', 'releaseDate': '2026-01-01', 'posterUrl': None, 'rating': 8.0
+    }
+
+def showtime(showtime_id):
+    auditorium_id = showtime_id % 20 + 1
+    return {
+        'id': showtime_id, 'movieId': showtime_id % 50 + 1, 'auditoriumId': auditorium_id,
+        'startTime': TIMESTAMP, 'price': 50000.0, 'auditorium': auditorium(auditorium_id)
+    }
+
+def seat_statuses(showtime_id):
+    return [{
+        'id': index + 1, 'showtimeId': showtime_id, 'seatNumber': seat,
+        'status': 'RESERVED' if seat in RESERVED_SEATS else 'AVAILABLE',
+        'bookingId': showtime_id if seat in RESERVED_SEATS else None, 'updatedAt': TIMESTAMP
+    } for index, seat in enumerate(SEATS)]
+
+def tickets(booking_id, seats=RESERVED_SEATS):
+    return [{'id': booking_id * 10 + index, 'bookingId': booking_id, 'seatNumber': seat} for index, seat in enumerate(seats)]
+
+def booking(booking_id, user_id=BENCH_USER_ID, showtime_id=None, status='PENDING'):
+    return {
+        'id': booking_id, 'userId': user_id, 'showtimeId': showtime_id or booking_id, 'status': status,
+        'totalPrice': 100000.0, 'bookingDate': TIMESTAMP, 'expiresAt': TIMESTAMP, 'tickets': tickets(booking_id)
+    }
+
+def payment(payment_id, user_id=BENCH_USER_ID, booking_id=None, amount=100000.0, status='PAID'):
+    return {
+        'id': payment_id, 'userId': user_id, 'bookingId': booking_id or payment_id, 'amount': amount,
+        'paymentMethod': 'CREDIT_CARD', 'paymentProofHash': None, 'status': status,
+        'createdAt': TIMESTAMP, 'updatedAt': TIMESTAMP, 'canBeDeleted': status == 'pending'
+    }
+
+def user(user_id):
+    return {'id': user_id, 'username': f"user{user_id}", 'email': f"user{user_id}@example.com",
+            'role': 'ADMIN' if user_id == ADMIN_USER_ID else 'USER'}
+
+def page(make, first, after, list_size):
+    """`first` rows (list_size when not given) with ids after `after`"""
+    start = (after or 0) + 1
+    return [make(row_id) for row_id in range(start, start + (list_size if first is None else first))]
+
+class Signer:
+    """Ed25519 key the user stub signs tokens with and publishes as its JWKS"""
+
+    def __init__(self):
+        self.kid = f"{int(time.time())}-bench"
+        self.private_key = Ed25519PrivateKey.generate()
+
+    def jwks(self):
+        jwk = json.loads(OKPAlgorithm.to_jwk(self.private_key.public_key()))
+        jwk.update({'kid': self.kid, 'alg': 'EdDSA', 'use': 'sig'})
+        return {'keys': [jwk]}
+
+    def token(self, user_id, role):
+        expires = datetime.datetime.utcnow() + datetime.timedelta(hours=12)
+        return jwt.encode({'user_id': user_id, 'role': role, 'exp': expires}, self.private_key,
+                          algorithm='EdDSA', headers={'kid': self.kid})
+
+def login(signer, email, **args):
+    user_id = ADMIN_USER_ID if (email or '').startswith('admin') else BENCH_USER_ID
+    account = user(user_id)
+    return {'success': True, 'message': 'Login successful', 'token': signer.token(user_id, account['role']), 'user': account}
+
+def root_fields(list_size, signer):
+    """Fixture per root field, called with the field's arguments"""
+    return {
+        # user
+        'loginUser': lambda **args: login(signer, **args),
+        'user': lambda id, **args: user(id),
+        'users': lambda first=None, after=None, **args: page(user, first, after, list_size),
+        'usersByIds': lambda ids, **args: [user(user_id) for user_id in ids],
+        # movie
+        'movie': lambda id, **args: movie(id),
+        'movies': lambda first=None, after=None, **args: page(movie, first, after, list_size),
+        'moviesByIds': lambda ids, **args: [movie(movie_id) for movie_id in ids],
+        # cinema
+        'cinema': lambda id, **args: cinema(id),
+        'cinemas': lambda first=None, after=None, **args: page(cinema, first, after, list_size),
+        'auditorium': lambda id, **args: auditorium(id),
+        'showtime': lambda id, **args: showtime(id),
+        'showtimes': lambda first=None, after=None, **args: page(showtime, first, after, list_size),
+        'seatStatuses': lambda showtimeId, **args: seat_statuses(showtimeId),
+        'updateSeatStatus': lambda **args: {'success': True, 'message': 'Seat status updated'},
+        # booking
+        'booking': lambda id, **args: booking(id),
+        'bookings': lambda first=None, after=None, **args: page(booking, first, after, list_size),
+        'userBookings': lambda userId, first=None, after=None, **args: page(
+            lambda booking_id: booking(booking_id, userId), first, after, list_size),
+        'tickets': lambda bookingId, **args: tickets(bookingId),
+        'createBooking': lambda userId, showtimeId, seatNumbers, **args: {
+            'booking': booking(next(_next_id), userId, showtimeId), 'success': True, 'message': 'Booking created'},
+        'updateBooking': lambda id, status=None, **args: {
+            'booking': booking(id, status=status or 'PENDING'), 'success': True, 'message': 'Booking updated'},
+        'createTickets': lambda bookingId, seatNumbers, **args: {
+            'tickets': tickets(bookingId, seatNumbers), 'success': True, 'message': 'Tickets created'},
+        # payment
+        'payments': lambda first=None, after=None, **args: page(payment, first, after, list_size),
+        'userPayments': lambda userId, first=None, after=None, **args: page(
+            lambda payment_id: payment(payment_id, userId), first, after, list_size),
+        'createPayment': lambda userId, bookingId, amount, **args: {
+            'payment': payment(next(_next_id), userId, bookingId, amount, 'pending'), 'success': True, 'message': 'Payment created'},
+        'updatePaymentStatus': lambda id, status, **args: {
+            'payment': payment(id, status=status), 'success': True, 'message': 'Payment updated'},
+    }
+
+def argument_value(node, variables):
+    if isinstance(node, ast.Variable):
+        return variables.get(node.name.value)
+    if isinstance(node, ast.IntValue):
+        return int(node.value)
+    if isinstance(node, ast.FloatValue):
+        return float(node.value)
+    if isinstance(node, ast.ListValue):
+        return [argument_value(value, variables) for value in node.values]
+    if isinstance(node, ast.ObjectValue):
+        return {field.name.value: argument_value(field.value, variables) for field in node.fields}
+    return node.value  # String, Boolean, Enum
+
+def default_value(name, has_selection):
+    if has_selection:
+        return {}
+    if name == 'id' or name.endswith('Id'):
+        return 1
+    if name == 'success':
+        return True
+    return None
+
+def project(value, selection_set):
+    """Shape fixture data like the query asked for it (the gateway sends plain fields, no fragments)"""
+    if selection_set is None or value is None:
+        return value
+    if isinstance(value, list):
+        return [project(item, selection_set) for item in value]
+    result = {}
+    for selection in selection_set.selections:
+        name = selection.name.value
+        field = value[name] if name in value else default_value(name, selection.selection_set is not None)
+        result[selection.alias.value if selection.alias else name] = project(field, selection.selection_set)
+    return result
+
+def create_app(service, latency_ms=0.0, jitter_ms=0.0, list_size=20):
+    app = Flask(f"stub-{service}")
+    signer = Signer()
+    fixtures = root_fields(list_size, signer)
+
+    @app.route('/graphql', methods=['POST'])
+    def graphql_endpoint():
+        time.sleep((latency_ms + random.uniform(0, jitter_ms)) / 1000)
+        data = request.get_json()
+        variables = data.get('variables') or {}
+        try:
+            operation = next(definition for definition in parse(data['query']).definitions
+                             if isinstance(definition, ast.OperationDefinition))
+            result = {}
+            for field in operation.selection_set.selections:
+                name = field.name.value
+                args = {argument.name.value: argument_value(argument.value, variables) for argument in field.arguments}
+                value = fixtures[name](**args) if name in fixtures else {}
+                result[field.alias.value if field.alias else name] = project(value, field.selection_set)
+        except Exception as e:
+            return jsonify({'data': None, 'errors': [f"Stub {service} service: {str(e)}"]})
+        body = {'data': result, 'errors': None}
+        if request.headers.get('X-Debug-Queries'):
+            body['extensions'] = {'sql': {'count': 0, 'timeMs': 0.0}}  # Lets the gateway count calls per service
+        return jsonify(body)
+
+    @app.route('/.well-known/jwks.json')
+    def jwks():
+        return jsonify(signer.jwks())
+
+    return app
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve a canned stand-in for one service')
+    parser.add_argument('service', choices=SERVICES)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, required=True)
+    parser.add_argument('--latency-ms', type=float, default=0.0, help='Delay before every response')
+    parser.add_argument('--jitter-ms', type=float, default=0.0, help='Extra random delay, up to this much')
+    parser.add_argument('--list-size', type=int, default=20, help='Rows in list results when `first` is not given')
+    args = parser.parse_args()
+
+    logging.getLogger('werkzeug').setLevel(logging.ERROR)  # No access log per request
+    create_app(args.service, args.latency_ms, args.jitter_ms, args.list_size).run(
+        host=args.host, port=args.port, threaded=True)
\ No newline at end of file
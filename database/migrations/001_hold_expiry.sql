@@ -0,0 +1,29 @@
+-- Hold and payment deadlines with their sweeper indexes.
+-- Existing pending payments get the default 24 hour deadline from their creation time, and
+-- existing PENDING bookings the 15 minute hold, or their pending payment's deadline if they
+-- have one (what createPayment does for new payments).
+
+USE payment_db;
+
+ALTER TABLE payments
+    ADD COLUMN expires_at DATETIME NULL,  -- Deadline while pending
+    ADD INDEX idx_payments_status_expires_at (status, expires_at);
+
+UPDATE payments SET expires_at = created_at + INTERVAL 1440 MINUTE WHERE status = 'pending';
+
+USE booking_db;
+
+ALTER TABLE bookings
+    ADD COLUMN expires_at DATETIME NULL,  -- Seat hold deadline while PENDING
+    ADD COLUMN release_pending BOOLEAN NOT NULL DEFAULT FALSE,  -- Swept, seats not released in cinema service yet
+    ADD INDEX idx_bookings_status_expires_at (status, expires_at),
+    ADD INDEX ix_bookings_release_pending (release_pending);
+
+UPDATE bookings
+    LEFT JOIN payment_db.payments ON payments.booking_id = bookings.id AND payments.status = 'pending'
+    SET bookings.expires_at = COALESCE(payments.expires_at, bookings.booking_date + INTERVAL 15 MINUTE)
+    WHERE bookings.status = 'PENDING';
+
+USE cinema_db;
+
+ALTER TABLE seat_statuses ADD INDEX idx_seat_statuses_booking_id (booking_id);
\ No newline at end of file
@@ -0,0 +1,5 @@
+-- Date-range filters of the admin booking export
+
+USE booking_db;
+
+ALTER TABLE bookings ADD INDEX ix_bookings_booking_date (booking_date);
\ No newline at end of file
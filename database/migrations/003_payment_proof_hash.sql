@@ -0,0 +1,5 @@
+-- Payment proofs move to the gateway blob store; run gateway/backfill_proof_images.py afterwards
+
+USE payment_db;
+
+ALTER TABLE payments ADD COLUMN payment_proof_hash CHAR(64) NULL AFTER payment_proof_image;
\ No newline at end of file
@@ -0,0 +1,7 @@
+-- Multi-use coupons; existing coupons stay single-use (NULL)
+
+USE coupon_db;
+
+ALTER TABLE coupons
+    ADD COLUMN max_uses INT NULL,
+    ADD COLUMN remaining_uses INT NULL;
\ No newline at end of file
@@ -0,0 +1,7 @@
+-- Codes issued by generateCouponBatch (the coupon_batches table itself is created at startup)
+
+USE coupon_db;
+
+ALTER TABLE coupons
+    ADD COLUMN batch_id INT NULL,
+    ADD INDEX ix_coupons_batch_id (batch_id);
\ No newline at end of file
@@ -0,0 +1,7 @@
+-- Personal coupons issued by the loyalty program
+
+USE coupon_db;
+
+ALTER TABLE coupons
+    ADD COLUMN issued_to_user_id INT NULL,
+    ADD INDEX ix_coupons_issued_to_user_id (issued_to_user_id);
\ No newline at end of file
@@ -0,0 +1,9 @@
+-- Keyset pagination of userBookings and showtimesByMovie
+
+USE booking_db;
+
+ALTER TABLE bookings ADD INDEX ix_bookings_user_id (user_id);
+
+USE cinema_db;
+
+ALTER TABLE showtimes ADD INDEX ix_showtimes_movie_id (movie_id);
\ No newline at end of file
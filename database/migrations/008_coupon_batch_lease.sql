@@ -0,0 +1,7 @@
+-- Lease on coupon batches, so only one process runs (or resumes) each batch
+
+USE coupon_db;
+
+ALTER TABLE coupon_batches
+    ADD COLUMN owner VARCHAR(100) NULL,
+    ADD COLUMN heartbeat_at DATETIME NULL;
\ No newline at end of file
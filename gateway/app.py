@@ -1,12 +1,52 @@
-from flask import Flask, request, send_from_directory, send_file
+from flask import Flask, Response, jsonify, request, send_from_directory, send_file
 from flask_graphql import GraphQLView
-from schema import schema
+from schema import schema, verify_authorization
+from shared.logs import init_logging
+from metrics import init_metrics, mark_graphql_errors
+from shared.tracing import init_tracing, TracingMiddleware
+from querystats import init_query_stats
+from shared.profiling import init_profiling, PROFILE_DIR
+from memory import (init_memory_diagnostics, memory_status, current_allocators, set_tracing, save_snapshot,
+                    snapshot_diff, MemoryTracingError, GROUPS, MEMORY_TOP_LIMIT)
+from capture import init_capture
+from export import build_export_stream, ExportError, ExportServiceError
+from blobstore import store_stream, blob_exists, blob_path, guess_content_type, BlobTooLarge, BlobQuotaExceeded
+import logging
 import os
 
+logger = logging.getLogger('app')  # __main__ when started with python app.py
+
 app = Flask(__name__, 
            static_folder='static',
            static_url_path='/static')
 
+# JSON log lines with request and trace ids (LOG_LEVEL, LOG_LEVELS per module)
+init_logging(app, 'gateway')
+
+# Prometheus metrics at /metrics
+init_metrics(app)
+
+# Spans for requests and root resolvers; make_service_request passes the trace on
+init_tracing(app, 'gateway')
+
+# Per-service SQL statement counts in responses to requests sending X-Debug-Queries
+init_query_stats(app)
+
+def is_admin_request():
+    try:
+        return verify_authorization(request.headers.get('Authorization'))['role'] == 'ADMIN'
+    except Exception:
+        return False
+
+# Profiles of single requests for admins or X-Profile-Secret (X-Profile), optional continuous sampling
+init_profiling(app, 'gateway', authorize=is_admin_request)
+
+# Peak allocation per GraphQL request while tracemalloc is on, see the /admin/memory routes
+init_memory_diagnostics(app)
+
+# Sampled GraphQL requests to CAPTURE_DIR for benchmarks/replay_capture.py (off unless set)
+init_capture(app)
+
 
 # Middleware untuk menambahkan headers ke context
 def add_context(request):
@@ -15,6 +55,10 @@ def add_context(request):
         'HTTP_AUTHORIZATION': request.headers.get('HTTP_AUTHORIZATION')
     }
 
+def format_graphql_error(error):
+    mark_graphql_errors()
+    return GraphQLView.format_error(error)
+
 # GraphQL endpoint
 app.add_url_rule(
     '/graphql',
@@ -22,7 +66,9 @@ app.add_url_rule(
         'graphql',
         schema=schema,
         graphiql=True,  # Enable GraphiQL interface
-        get_context=lambda: add_context(request)
+        get_context=lambda: add_context(request),
+        format_error=format_graphql_error,
+        middleware=[TracingMiddleware()]
     )
 )
 
@@ -134,6 +180,159 @@ def admin_bookings():
 def admin_login():
     return send_file('./static/admin/templates/login.html')
 
+def admin_error_response():
+    """Error response unless the request carries an admin token"""
+    try:
+        current_user = verify_authorization(request.headers.get('Authorization'))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 401
+
+    if current_user['role'] != 'ADMIN':
+        return jsonify({'error': 'Admin access required!'}), 403
+    return None
+
+# Streaming admin export: /admin/export/bookings?format=csv&status=PAID&from=2024-01-01&to=2025-01-01
+@app.route('/admin/export/<resource>')
+def admin_export(resource):
+    error = admin_error_response()
+    if error:
+        return error
+
+    export_format = request.args.get('format', 'ndjson')
+    try:
+        chunks, mimetype = build_export_stream(
+            resource,
+            export_format,
+            status=request.args.get('status'),
+            from_date=request.args.get('from'),
+            to_date=request.args.get('to'),
+            page_size=request.args.get('pageSize', type=int)
+        )
+    except ExportServiceError as e:
+        return jsonify({'error': str(e)}), 502
+    except ExportError as e:
+        return jsonify({'error': str(e)}), 400
+
+    return Response(
+        chunks,
+        mimetype=mimetype,
+        headers={'Content-Disposition': f'attachment; filename={resource}.{export_format}'}
+    )
+
+
+# Profiles written by the gateway and, on the shared profiles volume, by the services
+@app.route('/admin/profiles/<path:filename>')
+def admin_profile(filename):
+    error = admin_error_response()
+    if error:
+        return error
+
+    if not PROFILE_DIR:
+        return jsonify({'error': 'Profiles are not stored'}), 404
+    return send_from_directory(PROFILE_DIR, filename, as_attachment=True)
+
+
+def memory_query_args():
+    group = request.args.get('group', 'lineno')
+    if group not in GROUPS:
+        raise MemoryTracingError(f"group must be one of: {', '.join(GROUPS)}")
+    return group, request.args.get('limit', MEMORY_TOP_LIMIT, type=int)
+
+# Memory diagnostics: /admin/memory?group=resolver&limit=25 shows tracing status and the
+# top live allocators (group: lineno, filename, traceback or resolver)
+@app.route('/admin/memory')
+def admin_memory():
+    error = admin_error_response()
+    if error:
+        return error
+    status = memory_status()
+    if status['tracing']:
+        try:
+            group, limit = memory_query_args()
+            status['top'] = current_allocators(group, limit)
+        except MemoryTracingError as e:
+            return jsonify({'error': str(e)}), 400
+    return jsonify(status)
+
+# {"enabled": true, "frames": 16} starts tracing, {"enabled": false} stops it
+@app.route('/admin/memory/tracing', methods=['POST'])
+def admin_memory_tracing():
+    error = admin_error_response()
+    if error:
+        return error
+    data = request.get_json(silent=True) or {}
+    return jsonify(set_tracing(bool(data.get('enabled', True)), data.get('frames')))
+
+@app.route('/admin/memory/snapshots', methods=['POST'])
+def admin_memory_snapshot():
+    error = admin_error_response()
+    if error:
+        return error
+    try:
+        return jsonify(save_snapshot()), 201
+    except MemoryTracingError as e:
+        return jsonify({'error': str(e)}), 409
+
+# /admin/memory/diff?snapshot=2&base=1 (snapshot defaults to now, base to the latest before it)
+@app.route('/admin/memory/diff')
+def admin_memory_diff():
+    error = admin_error_response()
+    if error:
+        return error
+    try:
+        group, limit = memory_query_args()
+        return jsonify(snapshot_diff(request.args.get('snapshot', type=int), request.args.get('base', type=int), group, limit))
+    except MemoryTracingError as e:
+        return jsonify({'error': str(e)}), 400
+
+
+# Content-addressed blob store for payment proofs. Upload returns the SHA-256
+# hash that createPayment accepts as paymentProofHash.
+@app.route('/blobs', methods=['POST'])
+def upload_blob():
+    try:
+        current_user = verify_authorization(request.headers.get('Authorization'))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 401
+
+    # Multipart form upload (field "file") or the raw request body
+    upload = request.files.get('file')
+    stream = upload.stream if upload else request.stream
+    try:
+        content_hash, size = store_stream(stream, user_id=current_user['user_id'])
+    except BlobTooLarge as e:
+        return jsonify({'error': str(e)}), 413
+    except BlobQuotaExceeded as e:
+        return jsonify({'error': str(e)}), 429
+    except Exception as e:
+        logger.error("Error storing blob: %s", e)
+        return jsonify({'error': 'Failed to store file'}), 500
+
+    return jsonify({'hash': content_hash, 'size': size, 'url': f'/blobs/{content_hash}'}), 201
+
+@app.route('/blobs/<content_hash>')
+def download_blob(content_hash):
+    try:
+        verify_authorization(request.headers.get('Authorization'))
+    except Exception as e:
+        return jsonify({'error': str(e)}), 401
+
+    if not blob_exists(content_hash):
+        return jsonify({'error': 'File not found'}), 404
+
+    # Content never changes for a given hash, so it can be cached indefinitely
+    # and served with Range/ETag support
+    response = send_file(
+        blob_path(content_hash),
+        mimetype=guess_content_type(content_hash),
+        conditional=True,
+        etag=content_hash,
+        max_age=31536000
+    )
+    # Proofs are only served to authenticated users, keep them out of shared caches
+    response.cache_control.public = False
+    response.cache_control.private = True
+    return response
 
 
 if __name__ == '__main__':
@@ -0,0 +1,87 @@
+"""Move legacy base64 payment proofs into the blob store.
+
+Pages through payment-service with keyset cursors, stores every inline
+paymentProofImage in the blob store and replaces it with its hash.
+Safe to re-run: rows that already have a hash are skipped.
+
+    python backfill_proof_images.py --page-size 200 --dry-run
+"""
+import argparse
+from schema import SERVICE_URLS, make_service_request, handle_service_response
+from blobstore import store_bytes, decode_base64_payload
+
+PAYMENTS_PAGE_QUERY = '''
+query($first: Int, $after: Int) {
+    payments(first: $first, after: $after) {
+        id
+        paymentProofImage
+        paymentProofHash
+    }
+}
+'''
+
+UPDATE_PROOF_MUTATION = '''
+mutation($id: Int!, $paymentProofHash: String) {
+    updatePayment(id: $id, paymentProofHash: $paymentProofHash) {
+        success
+        message
+    }
+}
+'''
+
+def backfill(page_size=100, dry_run=False):
+    migrated = skipped = failed = 0
+    after = None
+
+    while True:
+        query_data = {'query': PAYMENTS_PAGE_QUERY, 'variables': {'first': page_size, 'after': after}}
+        result = make_service_request(SERVICE_URLS['payment'], query_data, 'payment')
+        response = handle_service_response(result, 'payment', 'payments')
+        if not response['success']:
+            raise Exception(response['error'])
+
+        payments = response['data'] or []
+        for payment in payments:
+            if not payment.get('paymentProofImage') or payment.get('paymentProofHash'):
+                skipped += 1
+                continue
+
+            try:
+                content_hash, size = store_bytes(decode_base64_payload(payment['paymentProofImage']))
+            except Exception as e:
+                print(f"Payment {payment['id']}: failed to store proof image: {str(e)}")
+                failed += 1
+                continue
+
+            if dry_run:
+                print(f"Payment {payment['id']}: would set paymentProofHash={content_hash} ({size} bytes)")
+                migrated += 1
+                continue
+
+            update_data = {
+                'query': UPDATE_PROOF_MUTATION,
+                'variables': {'id': payment['id'], 'paymentProofHash': content_hash}
+            }
+            update_result = make_service_request(SERVICE_URLS['payment'], update_data, 'payment')
+            update_response = handle_service_response(update_result, 'payment', 'updatePayment')
+            if update_response['success'] and (update_response['data'] or {}).get('success'):
+                migrated += 1
+            else:
+                print(f"Payment {payment['id']}: failed to update: {update_response.get('error') or update_response['data']}")
+                failed += 1
+
+        # Only an empty page ends the run: payment-service caps the page size
+        if not payments:
+            break
+        after = payments[-1]['id']
+
+    print(f"Backfill finished: {migrated} migrated, {skipped} skipped, {failed} failed")
+    return failed == 0
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Move base64 payment proof images into the blob store')
+    parser.add_argument('--page-size', type=int, default=100)
+    parser.add_argument('--dry-run', action='store_true', help='Store blobs but do not update payments')
+    args = parser.parse_args()
+
+    raise SystemExit(0 if backfill(args.page_size, args.dry_run) else 1)
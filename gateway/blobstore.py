@@ -0,0 +1,171 @@
+from collections import defaultdict
+import threading
+import binascii
+import base64
+import hashlib
+import io
+import os
+import re
+import time
+import tempfile
+
+# Content-addressed storage for uploaded files (payment proofs), keyed by SHA-256
+BLOB_STORE_DIR = os.getenv('BLOB_STORE_DIR', '/data/blobs')
+BLOB_MAX_BYTES = int(os.getenv('BLOB_MAX_BYTES', str(10 * 1024 * 1024)))
+BLOB_CHUNK_SIZE = 64 * 1024
+
+# Per-user upload quota over a rolling window, so one account can't fill the shared volume.
+# Each upload leaves a marker under owners/<user id>/ holding its size; markers older than
+# the window no longer count. Storing content the user already uploaded costs nothing.
+BLOB_USER_QUOTA_FILES = int(os.getenv('BLOB_USER_QUOTA_FILES', '20'))
+BLOB_USER_QUOTA_BYTES = int(os.getenv('BLOB_USER_QUOTA_BYTES', str(50 * 1024 * 1024)))
+BLOB_USER_QUOTA_WINDOW_SECONDS = int(os.getenv('BLOB_USER_QUOTA_WINDOW_SECONDS', str(24 * 3600)))
+
+_HASH_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+# Leading bytes used to pick a Content-Type on download
+_MAGIC_NUMBERS = [
+    (b'\x89PNG\r\n\x1a\n', 'image/png'),
+    (b'\xff\xd8\xff', 'image/jpeg'),
+    (b'GIF87a', 'image/gif'),
+    (b'GIF89a', 'image/gif'),
+    (b'%PDF-', 'application/pdf'),
+]
+
+class BlobTooLarge(Exception):
+    pass
+
+class BlobQuotaExceeded(Exception):
+    pass
+
+class InvalidBlobPayload(ValueError):
+    pass
+
+_user_locks = defaultdict(threading.Lock)  # One upload per user at a time, so the quota check holds
+
+def is_blob_hash(value):
+    return isinstance(value, str) and bool(_HASH_PATTERN.match(value))
+
+def blob_path(content_hash):
+    """Path of a blob on disk, sharded by the first two hash bytes"""
+    if not is_blob_hash(content_hash):
+        raise ValueError(f"Invalid blob hash: {content_hash}")
+    return os.path.join(BLOB_STORE_DIR, content_hash[:2], content_hash[2:4], content_hash)
+
+def blob_exists(content_hash):
+    return is_blob_hash(content_hash) and os.path.isfile(blob_path(content_hash))
+
+def _owner_dir(user_id):
+    return os.path.join(BLOB_STORE_DIR, 'owners', str(int(user_id)))
+
+def user_usage(user_id):
+    """(files, bytes) a user uploaded within the quota window, and the hashes among them"""
+    cutoff = time.time() - BLOB_USER_QUOTA_WINDOW_SECONDS
+    files = size = 0
+    hashes = set()
+    try:
+        entries = list(os.scandir(_owner_dir(user_id)))
+    except FileNotFoundError:
+        return 0, 0, hashes
+    for entry in entries:
+        try:
+            if entry.stat().st_mtime < cutoff:
+                continue
+            with open(entry.path) as marker:
+                size += int(marker.read() or 0)
+        except (OSError, ValueError):
+            continue
+        files += 1
+        hashes.add(entry.name)
+    return files, size, hashes
+
+def _store_for_user(stream, max_bytes, user_id):
+    with _user_locks[int(user_id)]:
+        files, used, hashes = user_usage(user_id)
+        if files >= BLOB_USER_QUOTA_FILES or used >= BLOB_USER_QUOTA_BYTES:
+            raise BlobQuotaExceeded(f"Upload quota reached ({BLOB_USER_QUOTA_FILES} files or "
+                                    f"{BLOB_USER_QUOTA_BYTES} bytes per {BLOB_USER_QUOTA_WINDOW_SECONDS // 3600} hours)")
+        remaining = BLOB_USER_QUOTA_BYTES - used
+        try:
+            content_hash, size = _store_stream(stream, min(max_bytes, remaining))
+        except BlobTooLarge:
+            if remaining < max_bytes:
+                raise BlobQuotaExceeded(f"File exceeds the remaining upload quota of {remaining} bytes")
+            raise
+        if content_hash not in hashes:
+            os.makedirs(_owner_dir(user_id), exist_ok=True)
+            with open(os.path.join(_owner_dir(user_id), content_hash), 'w') as marker:
+                marker.write(str(size))
+        return content_hash, size
+
+def store_stream(stream, max_bytes=BLOB_MAX_BYTES, user_id=None):
+    """Copy a file-like stream into the store chunk by chunk.
+
+    The content is hashed while it is written to a temp file, then moved into
+    place atomically. Identical content is stored once. With `user_id` the
+    upload counts against that user's quota (BlobQuotaExceeded). Returns (hash, size).
+    """
+    if user_id is not None:
+        return _store_for_user(stream, max_bytes, user_id)
+    return _store_stream(stream, max_bytes)
+
+def _store_stream(stream, max_bytes):
+    tmp_dir = os.path.join(BLOB_STORE_DIR, 'tmp')
+    os.makedirs(tmp_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+    try:
+        with os.fdopen(fd, 'wb') as tmp_file:
+            while True:
+                chunk = stream.read(BLOB_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_bytes:
+                    raise BlobTooLarge(f"File exceeds maximum size of {max_bytes} bytes")
+                digest.update(chunk)
+                tmp_file.write(chunk)
+
+        content_hash = digest.hexdigest()
+        final_path = blob_path(content_hash)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)  # Deduplicated: same content already stored
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(tmp_path, final_path)
+        return content_hash, size
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+def store_bytes(data, max_bytes=BLOB_MAX_BYTES, user_id=None):
+    """Store an in-memory payload, returns (hash, size)"""
+    return store_stream(io.BytesIO(data), max_bytes, user_id)
+
+def decode_base64_payload(value):
+    """Decode a base64 string, with or without a data: URI prefix; line breaks are allowed,
+    anything else outside the base64 alphabet raises InvalidBlobPayload"""
+    if value.startswith('data:') and ',' in value:
+        value = value.split(',', 1)[1]
+    try:
+        data = base64.b64decode(''.join(value.split()), validate=True)
+    except binascii.Error as e:
+        raise InvalidBlobPayload(f"Not valid base64: {str(e)}")
+    if not data:
+        raise InvalidBlobPayload("Empty payload")
+    return data
+
+def guess_content_type(content_hash):
+    """Detect the Content-Type of a stored blob from its leading bytes"""
+    with open(blob_path(content_hash), 'rb') as blob_file:
+        head = blob_file.read(16)
+
+    for magic, content_type in _MAGIC_NUMBERS:
+        if head.startswith(magic):
+            return content_type
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'image/webp'
+    return 'application/octet-stream'
@@ -0,0 +1,158 @@
+from flask import g, request
+import threading
+import secrets
+import hashlib
+import logging
+import atexit
+import random
+import hmac
+import gzip
+import json
+import time
+import zlib
+import jwt
+import re
+import os
+
+logger = logging.getLogger(__name__)
+
+# Opt-in traffic capture for benchmarks/replay_capture.py. With CAPTURE_DIR set, a
+# CAPTURE_SAMPLE_RATE share of GraphQL requests is appended to
+# <CAPTURE_DIR>/gateway-<hour>-<process>.jsonl.gz, one JSON object per request: arrival
+# time, duration, HTTP status, whether GraphQL errors came back, operation, query and
+# variables. Files are flushed every CAPTURE_FLUSH_SECONDS; one cut short by a killed
+# gateway reads fine up to there. Password, secret, token and proof-image values are
+# replaced with REDACTED, in variables and in the query text. The bearer token is replaced by a reference
+# (an HMAC of the user id, keyed with CAPTURE_AUTH_SALT or a per-process random key)
+# and the role it claims, so the replayer can map each caller to a test user.
+CAPTURE_DIR = os.getenv('CAPTURE_DIR', '')
+CAPTURE_SAMPLE_RATE = float(os.getenv('CAPTURE_SAMPLE_RATE', '1.0'))
+CAPTURE_FLUSH_SECONDS = float(os.getenv('CAPTURE_FLUSH_SECONDS', '1'))
+CAPTURE_AUTH_SALT = os.getenv('CAPTURE_AUTH_SALT', '').encode() or secrets.token_bytes(32)
+
+REDACTED = '[REDACTED]'
+SENSITIVE_NAME = re.compile(r'password|secret|token|proofimage', re.IGNORECASE)
+SENSITIVE_LITERAL = re.compile(r'(\b\w*(?:password|secret|token|proofimage)\w*\s*:\s*)"(?:[^"\\]|\\.)*"', re.IGNORECASE)
+
+def redact(value):
+    """Copy of GraphQL variables with sensitive values replaced"""
+    if isinstance(value, dict):
+        return {key: REDACTED if SENSITIVE_NAME.search(key) and value[key] is not None else redact(value[key])
+                for key in value}
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+    return value
+
+def redact_query(query):
+    return SENSITIVE_LITERAL.sub(lambda match: f'{match.group(1)}"{REDACTED}"', query) if query else query
+
+def auth_reference(authorization):
+    """Stable stand-in for the caller behind an Authorization header, without the token"""
+    if not authorization:
+        return None
+    token = authorization.split(' ')[1] if ' ' in authorization else authorization
+    try:
+        claims = jwt.decode(token, options={'verify_signature': False})  # Only to tell callers apart
+        subject, role = str(claims.get('user_id')), claims.get('role', 'USER')
+    except jwt.PyJWTError:
+        subject, role = token, 'INVALID'
+    return {'ref': hmac.new(CAPTURE_AUTH_SALT, subject.encode(), hashlib.sha256).hexdigest()[:16], 'role': role}
+
+class CaptureWriter:
+    """Writes records to a gzip file per hour and process; a background thread flushes it every
+    `flush_seconds`, so a gateway that is killed loses at most that much"""
+
+    def __init__(self, directory, flush_seconds):
+        self.directory = directory
+        self.instance = secrets.token_hex(3)  # Never append to a file another process may have cut short
+        self.path = None
+        self._file = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        threading.Thread(target=self._flush_forever, args=(flush_seconds,), name='capture-flush', daemon=True).start()
+
+    def _flush_forever(self, flush_seconds):
+        while True:
+            time.sleep(flush_seconds)
+            with self._lock:
+                if self._file is None or not self._pending:
+                    continue
+                try:
+                    self._file.flush(zlib.Z_SYNC_FLUSH)
+                    self._pending = 0
+                except OSError as e:
+                    logger.error("Error flushing capture %s: %s", self.path, e)
+
+    def write(self, record):
+        line = (json.dumps(record, default=str) + '\n').encode()
+        path = os.path.join(self.directory or '', f"gateway-{time.strftime('%Y%m%d-%H')}-{self.instance}.jsonl.gz")
+        with self._lock:
+            if self.directory is None:
+                return
+            try:
+                if path != self.path:
+                    self._close()
+                    os.makedirs(self.directory, exist_ok=True)
+                    self._file = gzip.open(path, 'wb')
+                    self.path = path
+                self._file.write(line)
+                self._pending += 1
+            except OSError as e:
+                logger.error("Error writing capture to %s, capture stopped: %s", path, e)
+                self.directory = None
+
+    def _close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+            self._pending = 0
+
+    def close(self):
+        with self._lock:
+            self._close()
+
+def _request_document():
+    data = request.get_json(silent=True) if request.method == 'POST' else None
+    if not isinstance(data, dict):
+        data = request.args
+    variables = data.get('variables')
+    if isinstance(variables, str):
+        try:
+            variables = json.loads(variables)
+        except ValueError:
+            pass
+    return data.get('query'), data.get('operationName'), variables
+
+def init_capture(app, directory=CAPTURE_DIR, sample_rate=CAPTURE_SAMPLE_RATE):
+    """Record a sample of /graphql requests when `directory` is set"""
+    if not directory:
+        return
+    writer = CaptureWriter(directory, CAPTURE_FLUSH_SECONDS)
+    atexit.register(writer.close)
+    logger.info("Capturing %.0f%% of GraphQL requests to %s", sample_rate * 100, directory)
+
+    @app.before_request
+    def start_capture():
+        if request.path != '/graphql' or (request.method == 'GET' and 'query' not in request.args):
+            return
+        if random.random() < sample_rate:
+            g.capture_started = (time.time(), time.perf_counter())
+
+    @app.after_request
+    def write_capture(response):
+        started = g.pop('capture_started', None)
+        if started is None:
+            return response
+        query, operation_name, variables = _request_document()
+        writer.write({
+            'ts': round(started[0], 6),
+            'durationMs': round((time.perf_counter() - started[1]) * 1000, 3),
+            'status': response.status_code,
+            'errors': bool(g.get('metrics_graphql_errors')),
+            'operation': g.get('metrics_operation'),
+            'operationName': operation_name,
+            'query': redact_query(query),
+            'variables': redact(variables),
+            'auth': auth_reference(request.headers.get('Authorization'))
+        })
+        return response
\ No newline at end of file
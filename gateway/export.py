@@ -0,0 +1,146 @@
+import logging
+import csv
+import io
+import json
+import os
+from datetime import datetime
+from schema import SERVICE_URLS, make_service_request, handle_service_response
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per downstream call; memory stays bounded by one page
+EXPORT_PAGE_SIZE = int(os.getenv('EXPORT_PAGE_SIZE', '500'))
+EXPORT_MAX_PAGE_SIZE = 1000  # The services' LIST_MAX_PAGE_SIZE; they return no more than this per page
+
+# Exportable resources and the service fields written for each row
+EXPORT_SOURCES = {
+    'bookings': {
+        'service': 'booking',
+        'data_key': 'bookings',
+        'fields': ['id', 'userId', 'showtimeId', 'status', 'totalPrice', 'bookingDate']
+    },
+    'payments': {
+        'service': 'payment',
+        'data_key': 'payments',
+        'fields': ['id', 'userId', 'bookingId', 'amount', 'paymentMethod', 'status', 'createdAt', 'updatedAt']
+    }
+}
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+class ExportError(Exception):
+    pass
+
+class ExportServiceError(ExportError):
+    """Raised when the owning service fails while pages are being fetched"""
+    pass
+
+def validate_date_filter(value, name):
+    """Reject malformed date filters before the response starts streaming"""
+    if not value:
+        return None
+    try:
+        datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        raise ExportError(f"Invalid {name} date. Use ISO format: YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS")
+    return value
+
+def iter_export_pages(resource, status=None, from_date=None, to_date=None, page_size=EXPORT_PAGE_SIZE):
+    """Yield pages of rows from the owning service using keyset cursors (last seen ID)"""
+    source = EXPORT_SOURCES[resource]
+    data_key = source['data_key']
+    query = f'''
+    query($first: Int, $after: Int, $status: String, $fromDate: String, $toDate: String) {{
+        {data_key}(first: $first, after: $after, status: $status, fromDate: $fromDate, toDate: $toDate) {{
+            {' '.join(source['fields'])}
+        }}
+    }}
+    '''
+
+    after = None
+    while True:
+        query_data = {
+            'query': query,
+            'variables': {
+                'first': page_size,
+                'after': after,
+                'status': status,
+                'fromDate': from_date,
+                'toDate': to_date
+            }
+        }
+        result = make_service_request(SERVICE_URLS[source['service']], query_data, source['service'])
+        response = handle_service_response(result, source['service'], data_key)
+        if not response['success']:
+            raise ExportServiceError(response['error'])
+
+        # Only an empty page ends the export: a service may return fewer rows than asked for
+        rows = response['data'] or []
+        if not rows:
+            return
+        yield rows
+        after = rows[-1]['id']
+
+def stream_ndjson(pages):
+    """Encode pages as newline-delimited JSON, one chunk per page"""
+    try:
+        for rows in pages:
+            yield ''.join(json.dumps(row) + '\n' for row in rows)
+    except ExportError as e:
+        # Headers are already sent, so report the failure in-band as the last line
+        yield json.dumps({'error': str(e)}) + '\n'
+
+def stream_csv(pages, fields):
+    """Encode pages as CSV with a header row, one chunk per page"""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields, extrasaction='ignore')
+    writer.writeheader()
+    yield buffer.getvalue()
+
+    try:
+        for rows in pages:
+            buffer.seek(0)
+            buffer.truncate(0)
+            writer.writerows(rows)
+            yield buffer.getvalue()
+    except ExportError as e:
+        # CSV has no in-band error line a reader would notice, so write a marker row and then
+        # break the transfer (no final chunk) so the download fails instead of looking complete
+        logger.error("Export aborted: %s", e)
+        buffer.seek(0)
+        buffer.truncate(0)
+        csv.writer(buffer).writerow(['ERROR', f"Export aborted: {e}"])
+        yield buffer.getvalue()
+        raise
+
+def build_export_stream(resource, export_format='ndjson', status=None, from_date=None, to_date=None, page_size=None):
+    """Validate export parameters and return (chunk generator, mimetype).
+
+    The first page is fetched eagerly so downstream failures surface as an
+    error response instead of an empty 200 stream.
+    """
+    if resource not in EXPORT_SOURCES:
+        raise ExportError(f"Unknown export resource '{resource}'. Valid resources are: {', '.join(EXPORT_SOURCES)}")
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f"Unknown export format '{export_format}'. Valid formats are: {', '.join(EXPORT_FORMATS)}")
+
+    from_date = validate_date_filter(from_date, 'from')
+    to_date = validate_date_filter(to_date, 'to')
+    page_size = min(max(page_size or EXPORT_PAGE_SIZE, 1), EXPORT_MAX_PAGE_SIZE)
+
+    pages = iter_export_pages(resource, status, from_date, to_date, page_size)
+    first_page = next(pages, [])
+
+    def all_pages():
+        if first_page:
+            yield first_page
+        yield from pages
+
+    if export_format == 'csv':
+        chunks = stream_csv(all_pages(), EXPORT_SOURCES[resource]['fields'])
+    else:
+        chunks = stream_ndjson(all_pages())
+    return chunks, EXPORT_FORMATS[export_format]
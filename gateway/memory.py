@@ -0,0 +1,258 @@
+from collections import OrderedDict, defaultdict
+from flask import g, request
+from metrics import REQUEST_PEAK_MEMORY_BYTES
+import tracemalloc
+import itertools
+import threading
+import logging
+import time
+import ast
+import os
+
+logger = logging.getLogger(__name__)
+
+# tracemalloc-based memory diagnostics behind the /admin/memory routes in app.py.
+# MEMORY_TRACE_FRAMES > 0 starts tracing at startup, keeping that many frames per
+# allocation (grouping by resolver needs enough to reach schema.py, 16 usually does);
+# admins can also start and stop tracing at runtime. Tracing slows every allocation
+# down and costs memory of its own, so it is off by default.
+#
+# While tracing, each POST /graphql observes graphql_request_peak_memory_bytes: the
+# traced peak above the level the request started at. tracemalloc's peak is process
+# wide, so it is only reset when no other request is in flight; a request that
+# overlapped another one is observed with concurrent="true" and the value is an
+# upper bound. Requests peaking above MEMORY_REQUEST_WARN_BYTES are logged.
+MEMORY_TRACE_FRAMES = int(os.getenv('MEMORY_TRACE_FRAMES', '0'))
+MEMORY_MAX_SNAPSHOTS = int(os.getenv('MEMORY_MAX_SNAPSHOTS', '5'))
+MEMORY_REQUEST_WARN_BYTES = int(os.getenv('MEMORY_REQUEST_WARN_BYTES', str(100 * 1024 * 1024)))
+MEMORY_TOP_LIMIT = 25
+
+GROUPS = ('lineno', 'filename', 'traceback', 'resolver')
+GATEWAY_DIR = os.path.dirname(os.path.abspath(__file__))
+SNAPSHOT_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>')
+)
+
+class MemoryTracingError(Exception):
+    """A diagnostics call that needs tracing (or a snapshot) that isn't there"""
+
+_snapshots = OrderedDict()  # id -> (taken at, snapshot)
+_snapshot_ids = itertools.count(1)
+_snapshots_lock = threading.Lock()
+
+_in_flight = 0
+_requests_started = 0
+_requests_lock = threading.Lock()
+
+_functions = {}  # filename -> [(first line, last line, qualified name)]
+
+def _function_spans(filename):
+    spans = _functions.get(filename)
+    if spans is None:
+        spans = []
+        try:
+            with open(filename) as source:
+                tree = ast.parse(source.read())
+        except (OSError, SyntaxError, ValueError):
+            tree = None
+
+        def visit(node, prefix):
+            for child in ast.iter_child_nodes(node):
+                if isinstance(child, ast.ClassDef):
+                    visit(child, f"{prefix}{child.name}.")
+                elif isinstance(child, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                    spans.append((child.lineno, child.end_lineno, f"{prefix}{child.name}"))
+                    visit(child, f"{prefix}{child.name}.")
+                else:
+                    visit(child, prefix)
+
+        if tree is not None:
+            visit(tree, '')
+        _functions[filename] = spans
+    return spans
+
+def _function_at(filename, lineno):
+    """Innermost function of a gateway source file containing the line"""
+    best = None
+    for first, last, name in _function_spans(filename):
+        if first <= lineno <= last and (best is None or first > best[0]):
+            best = (first, name)
+    return best[1] if best else None
+
+def resolver_of(traceback):
+    """Gateway resolver (or mutation) an allocation happened under, e.g. Query.resolve_all_bookings"""
+    fallback = None
+    for frame in reversed(traceback):  # Most recent call first
+        if not frame.filename.startswith(GATEWAY_DIR):
+            continue
+        name = _function_at(frame.filename, frame.lineno)
+        if name is None:
+            continue
+        if name.rsplit('.', 1)[-1].startswith('resolve_') or name.endswith('.mutate'):
+            return name
+        fallback = fallback or name
+    return fallback or '(outside gateway code)'
+
+def _resolver_totals(snapshot):
+    totals = defaultdict(lambda: [0, 0])
+    for stat in snapshot.statistics('traceback'):
+        total = totals[resolver_of(stat.traceback)]
+        total[0] += stat.size
+        total[1] += stat.count
+    return totals
+
+def _location(traceback):
+    frame = traceback[-1]
+    return f"{os.path.relpath(frame.filename, GATEWAY_DIR) if frame.filename.startswith(GATEWAY_DIR) else frame.filename}:{frame.lineno}"
+
+def top_allocators(snapshot, group='lineno', limit=MEMORY_TOP_LIMIT):
+    """Largest live allocations in a snapshot, grouped by line, file, traceback or resolver"""
+    if group == 'resolver':
+        totals = sorted(_resolver_totals(snapshot).items(), key=lambda item: item[1][0], reverse=True)
+        return [{'location': name, 'sizeBytes': size, 'count': count} for name, (size, count) in totals[:limit]]
+    top = []
+    for stat in snapshot.statistics(group)[:limit]:
+        entry = {'location': _location(stat.traceback), 'sizeBytes': stat.size, 'count': stat.count}
+        if group == 'traceback':
+            entry['traceback'] = stat.traceback.format(most_recent_first=True)
+        top.append(entry)
+    return top
+
+def diff_allocators(snapshot, base, group='lineno', limit=MEMORY_TOP_LIMIT):
+    """Largest changes from `base` to `snapshot`"""
+    if group == 'resolver':
+        now, before = _resolver_totals(snapshot), _resolver_totals(base)
+        changes = [{
+            'location': name,
+            'sizeBytes': now.get(name, (0, 0))[0],
+            'sizeDiffBytes': now.get(name, (0, 0))[0] - before.get(name, (0, 0))[0],
+            'countDiff': now.get(name, (0, 0))[1] - before.get(name, (0, 0))[1]
+        } for name in set(now) | set(before)]
+        changes.sort(key=lambda change: abs(change['sizeDiffBytes']), reverse=True)
+        return changes[:limit]
+    changes = []
+    for stat in snapshot.compare_to(base, group)[:limit]:
+        entry = {'location': _location(stat.traceback), 'sizeBytes': stat.size,
+                 'sizeDiffBytes': stat.size_diff, 'countDiff': stat.count_diff}
+        if group == 'traceback':
+            entry['traceback'] = stat.traceback.format(most_recent_first=True)
+        changes.append(entry)
+    return changes
+
+def _take_snapshot():
+    if not tracemalloc.is_tracing():
+        raise MemoryTracingError('Memory tracing is off, start it first')
+    return tracemalloc.take_snapshot().filter_traces(SNAPSHOT_FILTERS)
+
+def _rss_bytes():
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return None
+
+def memory_status():
+    traced, peak = tracemalloc.get_traced_memory()
+    with _snapshots_lock:
+        snapshots = [{'id': snapshot_id, 'takenAt': taken_at, 'tracedBytes': sum(trace.size for trace in snapshot.traces)}
+                     for snapshot_id, (taken_at, snapshot) in _snapshots.items()]
+    return {
+        'tracing': tracemalloc.is_tracing(),
+        'frames': tracemalloc.get_traceback_limit(),
+        'tracedBytes': traced,
+        'peakBytes': peak,
+        'tracingOverheadBytes': tracemalloc.get_tracemalloc_memory(),
+        'rssBytes': _rss_bytes(),
+        'snapshots': snapshots
+    }
+
+def current_allocators(group='lineno', limit=MEMORY_TOP_LIMIT):
+    return top_allocators(_take_snapshot(), group, limit)
+
+def set_tracing(enabled, frames=None):
+    """Start (restarting with a new frame limit if needed) or stop tracing; stopping drops the traces"""
+    if not enabled:
+        tracemalloc.stop()
+    else:
+        frames = frames or MEMORY_TRACE_FRAMES or 16
+        if tracemalloc.is_tracing() and tracemalloc.get_traceback_limit() != frames:
+            tracemalloc.stop()
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(frames)
+    return memory_status()
+
+def save_snapshot():
+    """Keep a snapshot to diff against later, dropping the oldest beyond MEMORY_MAX_SNAPSHOTS"""
+    snapshot = _take_snapshot()
+    with _snapshots_lock:
+        snapshot_id = next(_snapshot_ids)
+        _snapshots[snapshot_id] = (time.strftime('%Y-%m-%dT%H:%M:%S'), snapshot)
+        while len(_snapshots) > MEMORY_MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return {'id': snapshot_id, 'tracedBytes': sum(trace.size for trace in snapshot.traces)}
+
+def snapshot_diff(snapshot_id, base_id=None, group='lineno', limit=MEMORY_TOP_LIMIT):
+    """Diff a kept snapshot against another (default: the one before it); snapshot_id None means now"""
+    with _snapshots_lock:
+        ids = list(_snapshots)
+        if base_id is None:
+            earlier = [kept_id for kept_id in ids if snapshot_id is None or kept_id < snapshot_id]
+            if not earlier:
+                raise MemoryTracingError('No earlier snapshot to compare with')
+            base_id = earlier[-1]
+        if base_id not in _snapshots or (snapshot_id is not None and snapshot_id not in _snapshots):
+            raise MemoryTracingError(f"Snapshot not found, kept snapshots: {ids}")
+        base = _snapshots[base_id][1]
+        snapshot = _snapshots[snapshot_id][1] if snapshot_id is not None else None
+    if snapshot is None:
+        snapshot = _take_snapshot()
+    return {
+        'snapshot': snapshot_id or 'now',
+        'base': base_id,
+        'group': group,
+        'sizeDiffBytes': sum(trace.size for trace in snapshot.traces) - sum(trace.size for trace in base.traces),
+        'top': diff_allocators(snapshot, base, group, limit)
+    }
+
+def init_memory_diagnostics(app):
+    """Start tracing if MEMORY_TRACE_FRAMES is set and record each GraphQL request's peak allocation"""
+    if MEMORY_TRACE_FRAMES > 0:
+        tracemalloc.start(MEMORY_TRACE_FRAMES)
+
+    @app.before_request
+    def start_request_memory():
+        global _in_flight, _requests_started
+        if request.path != '/graphql' or request.method != 'POST' or not tracemalloc.is_tracing():
+            return
+        with _requests_lock:
+            if _in_flight == 0:
+                tracemalloc.reset_peak()
+            g.memory_request = {
+                'baseline': tracemalloc.get_traced_memory()[0],
+                'concurrent': _in_flight > 0,
+                'sequence': _requests_started,
+                'operation': g.get('metrics_operation', 'unknown')
+            }
+            _in_flight += 1
+            _requests_started += 1
+
+    @app.teardown_request
+    def finish_request_memory(error=None):
+        global _in_flight
+        memory = g.pop('memory_request', None)
+        if memory is None:
+            return
+        with _requests_lock:
+            _in_flight -= 1
+            concurrent = memory['concurrent'] or _requests_started != memory['sequence'] + 1
+            traced, peak = tracemalloc.get_traced_memory()
+        if not tracemalloc.is_tracing():
+            return  # Stopped while the request ran
+        peak_bytes = max(0, peak - memory['baseline'])
+        REQUEST_PEAK_MEMORY_BYTES.labels(memory['operation'], 'true' if concurrent else 'false').observe(peak_bytes)
+        if MEMORY_REQUEST_WARN_BYTES and peak_bytes > MEMORY_REQUEST_WARN_BYTES:
+            logger.warning("Request %s allocated up to %.1f MiB%s", memory['operation'], peak_bytes / 1024 / 1024,
+                           ' (with concurrent requests)' if concurrent else '')
\ No newline at end of file
@@ -0,0 +1,134 @@
+from prometheus_client import Counter, Gauge, Histogram, CONTENT_TYPE_LATEST, generate_latest
+from flask import Response, g, request
+import threading
+import requests
+import time
+import re
+import os
+
+# Prometheus metrics, served at /metrics. Operation labels come from query text sent
+# by clients, so only the first METRICS_MAX_OPERATIONS distinct names get their own
+# series; the rest are reported as "other".
+METRICS_MAX_OPERATIONS = int(os.getenv('METRICS_MAX_OPERATIONS', '200'))
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+MEMORY_BUCKETS = tuple(2 ** power for power in range(16, 31, 2))  # 64 KiB to 1 GiB
+
+REQUEST_SECONDS = Histogram(
+    'graphql_request_duration_seconds', 'GraphQL request latency by operation',
+    ['operation'], buckets=LATENCY_BUCKETS
+)
+REQUESTS_IN_FLIGHT = Gauge('graphql_requests_in_flight', 'GraphQL requests being handled')
+REQUEST_ERRORS = Counter(
+    'graphql_request_errors_total', 'GraphQL requests that failed, by kind (graphql, exception)',
+    ['operation', 'kind']
+)
+DOWNSTREAM_SECONDS = Histogram(
+    'downstream_request_duration_seconds', 'Calls to other services by target and operation',
+    ['target', 'operation'], buckets=LATENCY_BUCKETS
+)
+DOWNSTREAM_IN_FLIGHT = Gauge('downstream_requests_in_flight', 'Calls to other services in progress', ['target'])
+DOWNSTREAM_ERRORS = Counter(
+    'downstream_errors_total', 'Failed calls to other services, by kind (connection, timeout, http, graphql, other)',
+    ['target', 'operation', 'kind']
+)
+# Only observed while tracemalloc is tracing, see memory.py
+REQUEST_PEAK_MEMORY_BYTES = Histogram(
+    'graphql_request_peak_memory_bytes',
+    'Peak Python memory allocated while handling a GraphQL request, by operation; concurrent="true" includes other requests',
+    ['operation', 'concurrent'], buckets=MEMORY_BUCKETS
+)
+# Operation name of a named operation, otherwise the first root field
+OPERATION_PATTERN = re.compile(r'^\s*(?:(?:query|mutation|subscription)\b\s*(\w+)?[^{]*)?\{\s*(?:\w+\s*:\s*)?(\w+)')
+
+_operations = set()
+_operations_lock = threading.Lock()
+
+def operation_name(query, name=None):
+    """Name to label a GraphQL document with: `name` if given, else the operation or first field name"""
+    if not name and query:
+        match = OPERATION_PATTERN.match(query)
+        if match:
+            name = match.group(1) or match.group(2)
+    return operation_label(name)
+
+def operation_label(name):
+    if not name:
+        return 'unknown'
+    if name in _operations:
+        return name
+    with _operations_lock:
+        if len(_operations) < METRICS_MAX_OPERATIONS:
+            _operations.add(name)
+            return name
+    return 'other'
+
+def error_kind(error):
+    if isinstance(error, requests.exceptions.HTTPError):
+        return 'http'
+    if isinstance(error, requests.exceptions.Timeout):
+        return 'timeout'
+    if isinstance(error, requests.exceptions.ConnectionError):
+        return 'connection'
+    return 'other'
+
+class DownstreamCall:
+    """Times one call to another service. Use as a context manager; exceptions are
+    classified automatically, other failures are marked with error(kind)."""
+
+    def __init__(self, target, operation):
+        self.target = target
+        self.operation = operation
+        self.error_kind = None
+
+    def __enter__(self):
+        DOWNSTREAM_IN_FLIGHT.labels(self.target).inc()
+        self._started = time.perf_counter()
+        return self
+
+    def error(self, kind):
+        self.error_kind = kind
+
+    def __exit__(self, exc_type, exc, tb):
+        DOWNSTREAM_SECONDS.labels(self.target, self.operation).observe(time.perf_counter() - self._started)
+        DOWNSTREAM_IN_FLIGHT.labels(self.target).dec()
+        if exc is not None and self.error_kind is None:
+            self.error_kind = error_kind(exc)
+        if self.error_kind:
+            DOWNSTREAM_ERRORS.labels(self.target, self.operation, self.error_kind).inc()
+        return False
+
+def mark_graphql_errors():
+    """Count the current request as failed with GraphQL errors"""
+    g.metrics_graphql_errors = True
+
+def _request_operation():
+    data = request.get_json(silent=True) or {}
+    return operation_name(data.get('query') or request.args.get('query'),
+                          data.get('operationName') or request.args.get('operationName'))
+
+def init_metrics(app):
+    """Time POST /graphql requests per operation and serve /metrics"""
+    @app.before_request
+    def start_request_metrics():
+        if request.path == '/graphql' and request.method == 'POST':
+            g.metrics_operation = _request_operation()
+            g.metrics_started = time.perf_counter()
+            REQUESTS_IN_FLIGHT.inc()
+
+    @app.teardown_request
+    def finish_request_metrics(error=None):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return
+        operation = g.pop('metrics_operation')
+        REQUEST_SECONDS.labels(operation).observe(time.perf_counter() - started)
+        REQUESTS_IN_FLIGHT.dec()
+        if error is not None:
+            REQUEST_ERRORS.labels(operation, 'exception').inc()
+        elif g.pop('metrics_graphql_errors', False):
+            REQUEST_ERRORS.labels(operation, 'graphql').inc()
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(generate_latest(), mimetype=CONTENT_TYPE_LATEST)
\ No newline at end of file
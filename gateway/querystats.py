@@ -0,0 +1,43 @@
+from flask import g, request, has_request_context
+import json
+
+# A client sending DEBUG_QUERIES_HEADER to /graphql gets the SQL statement counts of
+# every service call the request made in the response's `extensions`. The header is
+# passed on to the services, which report their own counts (shared/querystats.py).
+DEBUG_QUERIES_HEADER = 'X-Debug-Queries'
+
+def debug_headers():
+    """Headers asking a service for its SQL stats, if our client asked for them"""
+    if has_request_context() and request.headers.get(DEBUG_QUERIES_HEADER):
+        return {DEBUG_QUERIES_HEADER: '1'}
+    return {}
+
+def record_service_stats(service_name, result):
+    """Add the SQL stats in a service response to this request's totals for that service"""
+    if not has_request_context() or not isinstance(result, dict):
+        return
+    sql = (result.get('extensions') or {}).get('sql')
+    if not sql:
+        return
+    totals = g.setdefault('service_query_stats', {}).setdefault(service_name, {'calls': 0, 'count': 0, 'timeMs': 0.0})
+    totals['calls'] += 1
+    totals['count'] += sql.get('count', 0)
+    totals['timeMs'] = round(totals['timeMs'] + sql.get('timeMs', 0), 3)
+
+def init_query_stats(app):
+    """Add the per-service SQL totals to /graphql responses when DEBUG_QUERIES_HEADER is set"""
+    @app.after_request
+    def add_query_stats(response):
+        if request.path != '/graphql' or not request.headers.get(DEBUG_QUERIES_HEADER) or not response.is_json:
+            return response
+        body = response.get_json(silent=True)
+        if not isinstance(body, dict):
+            return response  # Batched requests
+        services = g.get('service_query_stats', {})
+        body.setdefault('extensions', {})['sql'] = {
+            'count': sum(stats['count'] for stats in services.values()),
+            'timeMs': round(sum(stats['timeMs'] for stats in services.values()), 3),
+            'services': services
+        }
+        response.set_data(json.dumps(body))
+        return response
\ No newline at end of file
@@ -1,9 +1,19 @@
 import graphene
 import requests
+import logging
 import json
 import os
 from graphene import ObjectType, String, Int, Float, List, Field, Mutation, Schema, Boolean, JSONString, DateTime
 from functools import wraps
+from blobstore import blob_exists, store_bytes, decode_base64_payload, BlobTooLarge, BlobQuotaExceeded, InvalidBlobPayload
+from metrics import DownstreamCall, operation_name
+from shared.jwks import KeySetCache, verify_token
+from shared.tracing import start_span, trace_headers
+from querystats import debug_headers, record_service_stats
+from shared.profiling import profile_headers, record_service_profile
+from shared.logs import request_id_headers
+
+logger = logging.getLogger(__name__)
 
 # Service URLs
 SERVICE_URLS = {
@@ -15,36 +25,66 @@ SERVICE_URLS = {
     'coupon': os.getenv('COUPON_SERVICE_URL', 'http://coupon-service:3009')
 }
 
+# Payments approved per downstream round trip in approvePayments
+APPROVE_BATCH_SIZE = int(os.getenv('APPROVE_BATCH_SIZE', '500'))
+
+# Page size for the *Connection queries when `first` is not given, and its upper bound
+CONNECTION_DEFAULT_PAGE_SIZE = int(os.getenv('CONNECTION_DEFAULT_PAGE_SIZE', '20'))
+CONNECTION_MAX_PAGE_SIZE = int(os.getenv('CONNECTION_MAX_PAGE_SIZE', '100'))
+
+# user-service's public keys, for verifying tokens without calling it
+key_set = KeySetCache(DownstreamCall)
+
 def make_service_request(service_url, query_data, service_name="service"):
     """Helper function to make requests to services"""
-    try:
-        response = requests.post(
-            f"{service_url}/graphql",
-            json=query_data,
-            timeout=30,
-            headers={'Content-Type': 'application/json'}
-        )
-        
-        content_type = response.headers.get('content-type', '')
-        if 'text/html' in content_type:
-            print(f"Service {service_name} returned HTML instead of JSON")
-            return None
-        
+    operation = operation_name(query_data.get('query'), query_data.get('operationName'))
+    with DownstreamCall(service_name, operation) as call, \
+            start_span(f"POST {service_name}", kind='client', attributes={'graphql.operation': operation}) as span:
         try:
-            return response.json()
-        except json.JSONDecodeError:
-            print(f"Service {service_name} returned invalid JSON")
-            return None
+            response = requests.post(
+                f"{service_url}/graphql",
+                json=query_data,
+                timeout=30,
+                headers={'Content-Type': 'application/json', **trace_headers(), **request_id_headers(), **debug_headers(),
+                         **profile_headers()}
+            )
             
-    except requests.exceptions.ConnectionError:
-        print(f"Cannot connect to {service_name} service at {service_url}")
-        return None
-    except requests.exceptions.Timeout:
-        print(f"Timeout connecting to {service_name} service")
-        return None
-    except Exception as e:
-        print(f"Error connecting to {service_name} service: {str(e)}")
-        return None
+            content_type = response.headers.get('content-type', '')
+            if 'text/html' in content_type:
+                logger.warning("Service %s returned HTML instead of JSON", service_name)
+                call.error('http')
+                return None
+            
+            try:
+                result = response.json()
+            except json.JSONDecodeError:
+                logger.error("Service %s returned invalid JSON", service_name)
+                call.error('http')
+                return None
+
+            if not response.ok:
+                call.error('http')
+            elif isinstance(result, dict) and result.get('errors'):
+                call.error('graphql')
+            record_service_stats(service_name, result)
+            record_service_profile(service_name, result)
+            return result
+                
+        except requests.exceptions.ConnectionError:
+            logger.error("Cannot connect to %s service at %s", service_name, service_url)
+            call.error('connection')
+            return None
+        except requests.exceptions.Timeout:
+            logger.error("Timeout connecting to %s service", service_name)
+            call.error('timeout')
+            return None
+        except Exception as e:
+            logger.error("Error connecting to %s service: %s", service_name, e)
+            call.error('other')
+            return None
+        finally:
+            if call.error_kind:
+                span.set_attribute('error.kind', call.error_kind)
 
 def handle_service_response(result, service_name, data_key=None):
     """Centralized service response handler"""
@@ -89,43 +129,66 @@ def handle_service_response(result, service_name, data_key=None):
     
     return {'success': True, 'error': None, 'data': data}
 
+def graphql_arguments(**arguments):
+    """Render Int arguments for a service query, leaving out unset ones: '(userId: 1, first: 21)' or ''"""
+    rendered = ', '.join(f"{name}: {int(value)}" for name, value in arguments.items() if value is not None)
+    return f"({rendered})" if rendered else ''
+
+def resolve_connection(connection_type, first, after, fetch_page):
+    """Build a connection from a keyset-paginated service list.
+
+    The cursor is the id of a row, passed straight through as the service's `after`
+    argument. `fetch_page(limit, after_id)` is asked for one row more than the page
+    so hasNextPage needs no count query.
+    """
+    first = CONNECTION_DEFAULT_PAGE_SIZE if first is None else first
+    if first < 0:
+        raise Exception("first must not be negative")
+    first = min(first, CONNECTION_MAX_PAGE_SIZE)
+
+    after_id = None
+    if after:
+        try:
+            after_id = int(after)
+        except ValueError:
+            raise Exception(f"Invalid cursor: {after}")
+
+    rows = fetch_page(first + 1, after_id) or []
+    page = rows[:first]
+    edges = [
+        connection_type.Edge(node=row, cursor=str(row['id'] if isinstance(row, dict) else row.id))
+        for row in page
+    ]
+    return connection_type(
+        edges=edges,
+        page_info=graphene.relay.PageInfo(
+            has_next_page=len(rows) > first,
+            has_previous_page=after_id is not None,
+            start_cursor=edges[0].cursor if edges else None,
+            end_cursor=edges[-1].cursor if edges else None
+        )
+    )
+
 def verify_token_from_context(info):
     """Extract and verify token from GraphQL context"""
+    context = info.context
+    authorization = context.get('Authorization') or context.get('HTTP_AUTHORIZATION')
+    return verify_authorization(authorization)
+
+def verify_authorization(authorization):
+    """Verify an Authorization header value locally against user service's published keys"""
     try:
-        context = info.context
-        authorization = context.get('Authorization') or context.get('HTTP_AUTHORIZATION')
-        
         if not authorization:
             raise Exception("Token is missing!")
         
         token = authorization.split(' ')[1] if ' ' in authorization else authorization
         
-        query_data = {
-            'query': '''
-            query($token: String!) {
-                verifyToken(token: $token) {
-                    valid
-                    userId
-                    role
-                    error
-                }
-            }
-            ''',
-            'variables': {'token': token}
-        }
-        
-        result = make_service_request(SERVICE_URLS['user'], query_data, 'user')
-        response = handle_service_response(result, 'user')
-        
-        if not response['success']:
-            raise Exception(response['error'])
-        
-        token_data = response['data'].get('verifyToken')
-        if not token_data or not token_data.get('valid'):
+        token_data = verify_token(token, key_set)
+        if not token_data.get('valid'):
             raise Exception(token_data.get('error', 'Invalid token'))
         
         return {
-            'user_id': token_data.get('userId'),
+            'user_id': token_data.get('user_id'),
             'role': token_data.get('role', 'USER')
         }
         
@@ -170,6 +233,17 @@ class MovieType(ObjectType):
     posterUrl = String()    # Added poster URL
     rating = Float()        # Added rating
 
+class GenreFacetType(ObjectType):
+    genre = String()
+    count = Int()
+
+class MovieSearchResultType(ObjectType):
+    movies = List(MovieType)
+    totalCount = Int()
+    genreFacets = List(GenreFacetType)
+    endCursor = String()
+    hasNextPage = Boolean()
+
 class CinemaType(ObjectType):
     id = Int()
     name = String()
@@ -290,12 +364,18 @@ class PaymentType(ObjectType):
     amount = Float()
     paymentMethod = String()    # Changed from payment_method to paymentMethod
     status = String()
-    paymentProofImage = String() # Changed from payment_proof_image to paymentProofImage
+    paymentProofImage = String(deprecation_reason="Upload the file to /blobs and use paymentProofHash") # Changed from payment_proof_image to paymentProofImage
+    paymentProofHash = String()  # SHA-256 of the proof file in the blob store
+    paymentProofUrl = String()   # Download URL of the proof file
     createdAt = String()        # Changed from created_at to createdAt
     updatedAt = String()        # Changed from updated_at to updatedAt
     canBeDeleted = Boolean()    # Changed from can_be_deleted to canBeDeleted
     booking = Field(lambda: EnrichedBookingType)  # Add enriched booking data
 
+    def resolve_paymentProofUrl(self, info):
+        content_hash = self.get('paymentProofHash') if isinstance(self, dict) else getattr(self, 'paymentProofHash', None)
+        return f"/blobs/{content_hash}" if content_hash else None
+
 class EnrichedBookingType(ObjectType):
     """Enriched booking type for payment details"""
     id = Int()
@@ -327,6 +407,58 @@ class CouponType(ObjectType):
     isActive = Boolean()
     createdAt = String()
     updatedAt = String()
+
+class LoyaltyType(ObjectType):
+    successfulPayments = Int()
+    paymentsUntilNextCoupon = Int()
+    coupons = List(CouponType)
+
+class CouponBatchType(ObjectType):
+    id = Int()
+    prefix = String()
+    name = String()
+    discountPercentage = Float()
+    validUntil = String()
+    count = Int()
+    generatedCount = Int()
+    skippedCount = Int()
+    progress = Float()
+    status = String()
+    error = String()
+    createdAt = String()
+    finishedAt = String()
+
+# ============================================================================
+# CONNECTION TYPES (cursor pagination, cursor = id of the row)
+# ============================================================================
+
+class MovieConnection(graphene.relay.Connection):
+    class Meta:
+        node = MovieType
+
+class CinemaConnection(graphene.relay.Connection):
+    class Meta:
+        node = CinemaType
+
+class ShowtimeConnection(graphene.relay.Connection):
+    class Meta:
+        node = ShowtimeType
+
+class CouponConnection(graphene.relay.Connection):
+    class Meta:
+        node = CouponType
+
+class BookingConnection(graphene.relay.Connection):
+    class Meta:
+        node = BookingType
+
+class PaymentConnection(graphene.relay.Connection):
+    class Meta:
+        node = PaymentType
+
+class UserConnection(graphene.relay.Connection):
+    class Meta:
+        node = UserType
     
 # ============================================================================
 # RESPONSE TYPES
@@ -384,6 +516,18 @@ class CreatePaymentResponse(ObjectType):
     success = Boolean()
     message = String()
 
+class ApprovePaymentsResponse(ObjectType):
+    success = Boolean()
+    message = String()
+    approvedPaymentIds = List(Int)
+    paidBookingIds = List(Int)
+    ticketCount = Int()
+
+class GenerateCouponBatchResponse(ObjectType):
+    batch = Field(CouponBatchType)
+    success = Boolean()
+    message = String()
+
 class CreateCouponResponse(ObjectType):
     coupon = Field(CouponType)
     success = Boolean()
@@ -412,8 +556,11 @@ class Query(ObjectType):
     test = String()
     publicMovies = List(MovieType)  # Add this for public access
     publicCinemas = List(CinemaType) # Add this for public access
+    searchMovies = Field(MovieSearchResultType, text=String(), genre=String(), minRating=Float(),
+                         first=Int(default_value=20), after=String())
     
-    # User authenticated queries
+    # User authenticated queries. The unpaginated lists return the services' first page
+    # (LIST_DEFAULT_PAGE_SIZE rows); the *Connection fields below page through the rest.
     movies = List(MovieType)
     cinemas = List(CinemaType)
     auditoriums = List(AuditoriumType, cinema_id=Int())
@@ -423,6 +570,7 @@ class Query(ObjectType):
     availableCoupons = List(CouponType)
     my_bookings = List(BookingType)
     my_payments = List(PaymentType)
+    my_loyalty = Field(LoyaltyType)
     
     # Get by ID queries (authenticated)
     movie = Field(MovieType, id=Int(required=True))
@@ -433,6 +581,19 @@ class Query(ObjectType):
     all_bookings = List(BookingType)
     all_payments = List(PaymentType)
     users = List(UserType)
+    coupon_batch = Field(CouponBatchType, id=Int(required=True))
+
+    # Paginated lists; each checks auth through the list resolver it delegates to
+    movies_connection = Field(MovieConnection, first=Int(), after=String())
+    cinemas_connection = Field(CinemaConnection, first=Int(), after=String())
+    showtimes_connection = Field(ShowtimeConnection, movie_id=Int(), auditorium_id=Int(), first=Int(), after=String())
+    available_coupons_connection = Field(CouponConnection, first=Int(), after=String())
+    coupons_connection = Field(CouponConnection, first=Int(), after=String())
+    my_bookings_connection = Field(BookingConnection, first=Int(), after=String())
+    my_payments_connection = Field(PaymentConnection, first=Int(), after=String())
+    all_bookings_connection = Field(BookingConnection, first=Int(), after=String())
+    all_payments_connection = Field(PaymentConnection, first=Int(), after=String())
+    users_connection = Field(UserConnection, first=Int(), after=String())
 
     def resolve_test(self, info):
         return "Cinema GraphQL API is working!"
@@ -461,12 +622,49 @@ class Query(ObjectType):
         response = handle_service_response(result, 'movie', 'movies')
         
         if not response['success']:
-            print(f"Error fetching public movies: {response['error']}")
+            logger.warning("Error fetching public movies: %s", response['error'])
             return []
         
         return response['data'] or []
 
 
+    def resolve_searchMovies(self, info, text=None, genre=None, minRating=None, first=20, after=None):
+        """Search the movie catalog with genre facet counts (no auth required)"""
+        query_data = {
+            'query': '''
+            query($text: String, $genre: String, $minRating: Float, $first: Int, $after: String) {
+                searchMovies(text: $text, genre: $genre, minRating: $minRating, first: $first, after: $after) {
+                    movies {
+                        id
+                        title
+                        genre
+                        duration
+                        description
+                        releaseDate
+                        posterUrl
+                        rating
+                    }
+                    totalCount
+                    genreFacets {
+                        genre
+                        count
+                    }
+                    endCursor
+                    hasNextPage
+                }
+            }
+            ''',
+            'variables': {'text': text, 'genre': genre, 'minRating': minRating, 'first': first, 'after': after}
+        }
+        
+        result = make_service_request(SERVICE_URLS['movie'], query_data, 'movie')
+        response = handle_service_response(result, 'movie', 'searchMovies')
+        
+        if not response['success']:
+            raise Exception(response['error'])
+        
+        return response['data']
+
     def resolve_publicCinemas(self, info):  # FIXED: Method name changed
         """Get cinemas for public display (no auth required)"""
         query_data = {
@@ -486,14 +684,14 @@ class Query(ObjectType):
         response = handle_service_response(result, 'cinema', 'cinemas')
         
         if not response['success']:
-            print(f"Error fetching public cinemas: {response['error']}")
+            logger.warning("Error fetching public cinemas: %s", response['error'])
             return []
         
         return response['data'] or []
 
     @require_auth
-    def resolve_movies(self, info, current_user):
-        query_data = {'query': '{ movies { id title genre duration description releaseDate } }'}
+    def resolve_movies(self, info, current_user, first=None, after=None):
+        query_data = {'query': f'{{ movies{graphql_arguments(first=first, after=after)} {{ id title genre duration description releaseDate }} }}'}
         result = make_service_request(SERVICE_URLS['movie'], query_data, 'movie')
         
         response = handle_service_response(result, 'movie', 'movies')
@@ -502,8 +700,8 @@ class Query(ObjectType):
         return response['data']
 
 
-    def resolve_cinemas(self, info):
-        query_data = {'query': '{ cinemas { id name city capacity auditoriums { id name seatLayout } } }'}
+    def resolve_cinemas(self, info, first=None, after=None):
+        query_data = {'query': f'{{ cinemas{graphql_arguments(first=first, after=after)} {{ id name city capacity auditoriums {{ id name seatLayout }} }} }}'}
         result = make_service_request(SERVICE_URLS['cinema'], query_data, 'cinema')
         
         response = handle_service_response(result, 'cinema', 'cinemas')
@@ -524,8 +722,8 @@ class Query(ObjectType):
         return cinemas
     
     @require_auth
-    def resolve_availableCoupons(self, info, current_user):  # ← Changed method name
-        query_data = {'query': '{ availableCoupons { id code name discountPercentage validUntil isActive } }'}
+    def resolve_availableCoupons(self, info, current_user, first=None, after=None):  # ← Changed method name
+        query_data = {'query': f'{{ availableCoupons{graphql_arguments(first=first, after=after)} {{ id code name discountPercentage validUntil isActive }} }}'}
         result = make_service_request(SERVICE_URLS['coupon'], query_data, 'coupon')
         
         response = handle_service_response(result, 'coupon', 'availableCoupons')
@@ -534,9 +732,9 @@ class Query(ObjectType):
         return response['data']
 
     @require_admin
-    def resolve_coupons(self, info, current_user):
+    def resolve_coupons(self, info, current_user, first=None, after=None):
         """Get all coupons - admin only (read-only access)"""
-        query_data = {'query': '{ coupons { id code name discountPercentage validUntil isActive createdAt } }'}  # ← Changed field names
+        query_data = {'query': f'{{ coupons{graphql_arguments(first=first, after=after)} {{ id code name discountPercentage validUntil isActive createdAt }} }}'}  # ← Changed field names
         result = make_service_request(SERVICE_URLS['coupon'], query_data, 'coupon')
         
         response = handle_service_response(result, 'coupon', 'coupons')
@@ -545,12 +743,12 @@ class Query(ObjectType):
         return response['data']
 
     @require_auth
-    def resolve_my_bookings(self, info, current_user):
+    def resolve_my_bookings(self, info, current_user, first=None, after=None):
         """Get user's bookings with updated booking structure"""
         user_id = current_user['user_id']
         query = f'''
         {{ 
-            userBookings(userId: {user_id}) {{ 
+            userBookings{graphql_arguments(userId=user_id, first=first, after=after)} {{ 
                 id 
                 userId 
                 showtimeId 
@@ -572,7 +770,7 @@ class Query(ObjectType):
         
         for booking in bookings:
             booking_id = booking.get('id')
-            print(f"Processing booking {booking_id} for user {user_id}")  # Debug log
+            logger.debug("Processing booking %s for user %s", booking_id, user_id)
             
             if booking_id:
                 # Get tickets for this booking (same pattern as payment queries)
@@ -589,25 +787,25 @@ class Query(ObjectType):
                 }
                 
                 tickets_result = make_service_request(SERVICE_URLS['booking'], tickets_query, 'booking')
-                print(f"Tickets service response for booking {booking_id}: {tickets_result}")  # Debug log
+                logger.debug("Tickets service response for booking %s: %s", booking_id, tickets_result)
                 
                 if tickets_result and not tickets_result.get('errors'):
                     tickets_data = tickets_result.get('data', {}).get('tickets', [])
-                    print(f"Raw tickets data for booking {booking_id}: {tickets_data}")  # Debug log
+                    logger.debug("Raw tickets data for booking %s: %s", booking_id, tickets_data)
                     
                     # Use same ticket transformation as payment queries
                     from types import SimpleNamespace
                     
                     transformed_tickets = []
                     for ticket in tickets_data:
-                        print(f"Processing ticket: {ticket}")  # Debug log
+                        logger.debug("Processing ticket: %s", ticket)
                         
                         # Handle both possible field name formats from the booking service
                         ticket_id = ticket.get('id')
                         booking_id_field = ticket.get('bookingId') or ticket.get('booking_id')
                         seat_number_field = ticket.get('seatNumber') or ticket.get('seat_number')
                         
-                        print(f"Ticket fields - id: {ticket_id}, bookingId: {booking_id_field}, seatNumber: {seat_number_field}")  # Debug log
+                        logger.debug("Ticket fields - id: %s, bookingId: %s, seatNumber: %s", ticket_id, booking_id_field, seat_number_field)
                         
                         # Create an object-like structure instead of dict (same as payment queries)
                         ticket_obj = SimpleNamespace()
@@ -620,16 +818,16 @@ class Query(ObjectType):
                         ticket_obj.seat_number = seat_number_field
                         
                         transformed_tickets.append(ticket_obj)
-                        print(f"Created ticket object: id={ticket_obj.id}, bookingId={ticket_obj.bookingId}, seatNumber={ticket_obj.seatNumber}")  # Debug log
+                        logger.debug("Created ticket object: id=%s, bookingId=%s, seatNumber=%s", ticket_obj.id, ticket_obj.bookingId, ticket_obj.seatNumber)
                     
                     # Set tickets directly on booking object
                     booking['tickets'] = transformed_tickets
-                    print(f"Final transformed tickets count for booking {booking_id}: {len(transformed_tickets)}")  # Debug log
+                    logger.debug("Final transformed tickets count for booking %s: %s", booking_id, len(transformed_tickets))
                 else:
-                    print(f"Tickets service failed for booking {booking_id}: {tickets_result}")
+                    logger.warning("Tickets service failed for booking %s: %s", booking_id, tickets_result)
                     booking['tickets'] = []
             else:
-                print(f"No booking ID found for booking: {booking}")
+                logger.debug("No booking ID found for booking: %s", booking)
                 booking['tickets'] = []
         
         # Transform camelCase response to snake_case for gateway BookingType
@@ -651,10 +849,10 @@ class Query(ObjectType):
         return bookings
 
     @require_auth
-    def resolve_my_payments(self, info, current_user):
+    def resolve_my_payments(self, info, current_user, first=None, after=None):
         user_id = current_user['user_id']
-        # Updated query to request all fields including paymentProofImage
-        query = f'{{ userPayments(userId: {user_id}) {{ id userId bookingId amount paymentMethod paymentProofImage status createdAt updatedAt canBeDeleted }} }}'
+        # Proof files are served from /blobs, only their hash travels with the list
+        query = f'{{ userPayments{graphql_arguments(userId=user_id, first=first, after=after)} {{ id userId bookingId amount paymentMethod paymentProofHash status createdAt updatedAt canBeDeleted }} }}'
         query_data = {'query': query}
         result = make_service_request(SERVICE_URLS['payment'], query_data, 'payment')
         
@@ -678,7 +876,7 @@ class Query(ObjectType):
             
             # Get booking details - ensure we have bookingId
             booking_id = payment.get('bookingId')
-            print(f"Processing payment {payment.get('id')} with bookingId: {booking_id}")  # Debug log
+            logger.debug("Processing payment %s with bookingId: %s", payment.get('id'), booking_id)
             
             if booking_id:
                 # Use the same pattern as resolve_showtimes for fetching related data
@@ -697,14 +895,14 @@ class Query(ObjectType):
                     '''
                 }
                 
-                print(f"Querying booking service with: {booking_query}")  # Debug log
+                logger.debug("Querying booking service with: %s", booking_query)
                 booking_result = make_service_request(SERVICE_URLS['booking'], booking_query, 'booking')
-                print(f"Booking service response: {booking_result}")  # Debug log
+                logger.debug("Booking service response: %s", booking_result)
                 
                 # Handle booking response like resolve_showtimes handles movie response
                 if booking_result and not booking_result.get('errors'):
                     booking_data = booking_result.get('data', {}).get('booking')
-                    print(f"Booking data extracted: {booking_data}")  # Debug log
+                    logger.debug("Booking data extracted: %s", booking_data)
                     
                     if booking_data:
                         # Transform to camelCase for EnrichedBookingType (like resolve_showtimes does)
@@ -722,7 +920,7 @@ class Query(ObjectType):
                         
                         # Get showtime details
                         showtime_id = booking_data.get('showtimeId')
-                        print(f"Fetching showtime with ID: {showtime_id}")  # Debug log
+                        logger.debug("Fetching showtime with ID: %s", showtime_id)
                         
                         if showtime_id:
                             showtime_query = {
@@ -749,11 +947,11 @@ class Query(ObjectType):
                             }
                             
                             showtime_result = make_service_request(SERVICE_URLS['cinema'], showtime_query, 'cinema')
-                            print(f"Showtime service response: {showtime_result}")  # Debug log
+                            logger.debug("Showtime service response: %s", showtime_result)
                             
                             if showtime_result and not showtime_result.get('errors'):
                                 showtime_data = showtime_result.get('data', {}).get('showtime')
-                                print(f"Showtime data extracted: {showtime_data}")  # Debug log
+                                logger.debug("Showtime data extracted: %s", showtime_data)
                                 
                                 if showtime_data:
                                     # Fix startTime handling - convert to string if it's a datetime object
@@ -782,7 +980,7 @@ class Query(ObjectType):
                                     
                                     # Get movie details (following the exact same pattern as resolve_showtimes)
                                     movie_id_value = showtime_data.get('movieId')
-                                    print(f"Fetching movie with ID: {movie_id_value}")  # Debug log
+                                    logger.debug("Fetching movie with ID: %s", movie_id_value)
                                     
                                     if movie_id_value:
                                         movie_query = {
@@ -803,7 +1001,7 @@ class Query(ObjectType):
                                         }
                                         
                                         movie_result = make_service_request(SERVICE_URLS['movie'], movie_query, 'movie')
-                                        print(f"Movie service response: {movie_result}")  # Debug log
+                                        logger.debug("Movie service response: %s", movie_result)
                                         
                                         if movie_result and not movie_result.get('errors'):
                                             movie_data = movie_result.get('data', {}).get('movie')
@@ -820,9 +1018,9 @@ class Query(ObjectType):
                                                     'rating': movie_data.get('rating')
                                                 }
                                             else:
-                                                print(f"No movie data found for movie ID {movie_id_value}")
+                                                logger.debug("No movie data found for movie ID %s", movie_id_value)
                                         else:
-                                            print(f"Movie service failed for movie ID {movie_id_value}: {movie_result}")
+                                            logger.warning("Movie service failed for movie ID %s: %s", movie_id_value, movie_result)
                                             # Add placeholder movie if service fails
                                             payment['booking']['showtime']['movie'] = {
                                                 'id': movie_id_value,
@@ -835,10 +1033,10 @@ class Query(ObjectType):
                                                 'rating': 0.0
                                             }
                                     else:
-                                        print(f"No movieId found in showtime data: {showtime_data}")
+                                        logger.debug("No movieId found in showtime data: %s", showtime_data)
                                     
                                     # Get seat details (tickets for this booking) - CRITICAL FIX HERE!
-                                    print(f"Fetching tickets for booking ID: {booking_id}")  # Debug log
+                                    logger.debug("Fetching tickets for booking ID: %s", booking_id)
                                     
                                     tickets_query = {
                                         'query': f'''
@@ -853,25 +1051,25 @@ class Query(ObjectType):
                                     }
                                     
                                     tickets_result = make_service_request(SERVICE_URLS['booking'], tickets_query, 'booking')
-                                    print(f"Tickets service response: {tickets_result}")  # Debug log
+                                    logger.debug("Tickets service response: %s", tickets_result)
                                     
                                     if tickets_result and not tickets_result.get('errors'):
                                         tickets_data = tickets_result.get('data', {}).get('tickets', [])
-                                        print(f"Raw tickets data from service: {tickets_data}")  # Debug log
+                                        logger.debug("Raw tickets data from service: %s", tickets_data)
                                         
                                         # CRITICAL FIX: Create proper ticket objects instead of dict transformation
                                         from types import SimpleNamespace
                                         
                                         transformed_tickets = []
                                         for ticket in tickets_data:
-                                            print(f"Processing ticket: {ticket}")  # Debug log
+                                            logger.debug("Processing ticket: %s", ticket)
                                             
                                             # Handle both possible field name formats from the booking service
                                             ticket_id = ticket.get('id')
                                             booking_id_field = ticket.get('bookingId') or ticket.get('booking_id')
                                             seat_number_field = ticket.get('seatNumber') or ticket.get('seat_number')
                                             
-                                            print(f"Ticket fields - id: {ticket_id}, bookingId: {booking_id_field}, seatNumber: {seat_number_field}")  # Debug log
+                                            logger.debug("Ticket fields - id: %s, bookingId: %s, seatNumber: %s", ticket_id, booking_id_field, seat_number_field)
                                             
                                             # Create an object-like structure instead of dict
                                             ticket_obj = SimpleNamespace()
@@ -884,52 +1082,52 @@ class Query(ObjectType):
                                             ticket_obj.seat_number = seat_number_field
                                             
                                             transformed_tickets.append(ticket_obj)
-                                            print(f"Created ticket object: id={ticket_obj.id}, bookingId={ticket_obj.bookingId}, seatNumber={ticket_obj.seatNumber}")  # Debug log
+                                            logger.debug("Created ticket object: id=%s, bookingId=%s, seatNumber=%s", ticket_obj.id, ticket_obj.bookingId, ticket_obj.seatNumber)
                                         
                                         payment['booking']['tickets'] = transformed_tickets
-                                        print(f"Final transformed tickets count: {len(transformed_tickets)}")  # Debug log
+                                        logger.debug("Final transformed tickets count: %s", len(transformed_tickets))
                                     else:
-                                        print(f"Tickets service failed for booking {booking_id}: {tickets_result}")
+                                        logger.warning("Tickets service failed for booking %s: %s", booking_id, tickets_result)
                                         payment['booking']['tickets'] = []
                                 else:
-                                    print(f"No showtime data found for showtime ID {showtime_id}")
+                                    logger.debug("No showtime data found for showtime ID %s", showtime_id)
                                     payment['booking']['showtime'] = None
                                     payment['booking']['tickets'] = []
                             else:
-                                print(f"Showtime service failed for showtime ID {showtime_id}: {showtime_result}")
+                                logger.warning("Showtime service failed for showtime ID %s: %s", showtime_id, showtime_result)
                                 payment['booking']['showtime'] = None
                                 payment['booking']['tickets'] = []
                         else:
-                            print(f"No showtimeId found in booking data: {booking_data}")
+                            logger.debug("No showtimeId found in booking data: %s", booking_data)
                             payment['booking']['showtime'] = None
                             payment['booking']['tickets'] = []
                     else:
-                        print(f"No booking data found for booking ID {booking_id}")
+                        logger.debug("No booking data found for booking ID %s", booking_id)
                         payment['booking'] = None
                 else:
-                    print(f"Booking service failed or returned errors for booking ID {booking_id}: {booking_result}")
+                    logger.warning("Booking service failed or returned errors for booking ID %s: %s", booking_id, booking_result)
                     payment['booking'] = None
             else:
-                print(f"No bookingId found in payment: {payment}")
+                logger.debug("No bookingId found in payment: %s", payment)
                 payment['booking'] = None
         
-        print(f"Final payments data: {payments}")  # Debug log
+        logger.debug("Final payments data: %s", payments)
         return payments
 
     @require_admin
-    def resolve_all_bookings(self, info, current_user):
+    def resolve_all_bookings(self, info, current_user, first=None, after=None):
         """Get all bookings - admin only with updated booking structure"""
-        query = '''
-        { 
-            bookings { 
+        query = f'''
+        {{ 
+            bookings{graphql_arguments(first=first, after=after)} {{ 
                 id 
                 userId 
                 showtimeId 
                 status 
                 totalPrice 
                 bookingDate 
-            } 
-        }
+            }} 
+        }}
         '''
         query_data = {'query': query}
         result = make_service_request(SERVICE_URLS['booking'], query_data, 'booking')
@@ -943,7 +1141,7 @@ class Query(ObjectType):
         
         for booking in bookings:
             booking_id = booking.get('id')
-            print(f"[ADMIN] Processing booking {booking_id}")  # Debug log
+            logger.debug("[ADMIN] Processing booking %s", booking_id)
             
             if booking_id:
                 # Get tickets for this booking (same pattern as payment queries)
@@ -960,25 +1158,25 @@ class Query(ObjectType):
                 }
                 
                 tickets_result = make_service_request(SERVICE_URLS['booking'], tickets_query, 'booking')
-                print(f"[ADMIN] Tickets service response for booking {booking_id}: {tickets_result}")  # Debug log
+                logger.debug("[ADMIN] Tickets service response for booking %s: %s", booking_id, tickets_result)
                 
                 if tickets_result and not tickets_result.get('errors'):
                     tickets_data = tickets_result.get('data', {}).get('tickets', [])
-                    print(f"[ADMIN] Raw tickets data for booking {booking_id}: {tickets_data}")  # Debug log
+                    logger.debug("[ADMIN] Raw tickets data for booking %s: %s", booking_id, tickets_data)
                     
                     # Use same ticket transformation as payment queries
                     from types import SimpleNamespace
                     
                     transformed_tickets = []
                     for ticket in tickets_data:
-                        print(f"[ADMIN] Processing ticket: {ticket}")  # Debug log
+                        logger.debug("[ADMIN] Processing ticket: %s", ticket)
                         
                         # Handle both possible field name formats from the booking service
                         ticket_id = ticket.get('id')
                         booking_id_field = ticket.get('bookingId') or ticket.get('booking_id')
                         seat_number_field = ticket.get('seatNumber') or ticket.get('seat_number')
                         
-                        print(f"[ADMIN] Ticket fields - id: {ticket_id}, bookingId: {booking_id_field}, seatNumber: {seat_number_field}")  # Debug log
+                        logger.debug("[ADMIN] Ticket fields - id: %s, bookingId: %s, seatNumber: %s", ticket_id, booking_id_field, seat_number_field)
                         
                         # Create an object-like structure instead of dict (same as payment queries)
                         ticket_obj = SimpleNamespace()
@@ -991,16 +1189,16 @@ class Query(ObjectType):
                         ticket_obj.seat_number = seat_number_field
                         
                         transformed_tickets.append(ticket_obj)
-                        print(f"[ADMIN] Created ticket object: id={ticket_obj.id}, bookingId={ticket_obj.bookingId}, seatNumber={ticket_obj.seatNumber}")  # Debug log
+                        logger.debug("[ADMIN] Created ticket object: id=%s, bookingId=%s, seatNumber=%s", ticket_obj.id, ticket_obj.bookingId, ticket_obj.seatNumber)
                     
                     # Set tickets directly on booking object
                     booking['tickets'] = transformed_tickets
-                    print(f"[ADMIN] Final transformed tickets count for booking {booking_id}: {len(transformed_tickets)}")  # Debug log
+                    logger.debug("[ADMIN] Final transformed tickets count for booking %s: %s", booking_id, len(transformed_tickets))
                 else:
-                    print(f"[ADMIN] Tickets service failed for booking {booking_id}: {tickets_result}")
+                    logger.warning("[ADMIN] Tickets service failed for booking %s: %s", booking_id, tickets_result)
                     booking['tickets'] = []
             else:
-                print(f"[ADMIN] No booking ID found for booking: {booking}")
+                logger.debug("[ADMIN] No booking ID found for booking: %s", booking)
                 booking['tickets'] = []
         
         # Transform camelCase response to snake_case for gateway BookingType
@@ -1022,8 +1220,8 @@ class Query(ObjectType):
         return bookings
     
     @require_admin
-    def resolve_all_payments(self, info, current_user):
-        query = '{ payments { id userId bookingId amount paymentMethod paymentProofImage status createdAt updatedAt canBeDeleted } }'
+    def resolve_all_payments(self, info, current_user, first=None, after=None):
+        query = f'{{ payments{graphql_arguments(first=first, after=after)} {{ id userId bookingId amount paymentMethod paymentProofHash status createdAt updatedAt canBeDeleted }} }}'
         query_data = {'query': query}
         result = make_service_request(SERVICE_URLS['payment'], query_data, 'payment')
         
@@ -1049,7 +1247,7 @@ class Query(ObjectType):
             
             # Get booking details - ensure we have bookingId
             booking_id = payment.get('bookingId')
-            print(f"[ADMIN] Processing payment {payment.get('id')} with bookingId: {booking_id}")  # Debug log
+            logger.debug("[ADMIN] Processing payment %s with bookingId: %s", payment.get('id'), booking_id)
             
             if booking_id:
                 booking_query = {
@@ -1067,13 +1265,13 @@ class Query(ObjectType):
                     '''
                 }
                 
-                print(f"[ADMIN] Querying booking service with: {booking_query}")  # Debug log
+                logger.debug("[ADMIN] Querying booking service with: %s", booking_query)
                 booking_result = make_service_request(SERVICE_URLS['booking'], booking_query, 'booking')
-                print(f"[ADMIN] Booking service response: {booking_result}")  # Debug log
+                logger.debug("[ADMIN] Booking service response: %s", booking_result)
                 
                 if booking_result and not booking_result.get('errors'):
                     booking_data = booking_result.get('data', {}).get('booking')
-                    print(f"[ADMIN] Booking data extracted: {booking_data}")  # Debug log
+                    logger.debug("[ADMIN] Booking data extracted: %s", booking_data)
                     
                     if booking_data:
                         # Transform to camelCase for EnrichedBookingType (same as user method)
@@ -1089,31 +1287,11 @@ class Query(ObjectType):
                         # Update payment status to match booking status
                         payment['status'] = booking_data.get('status', payment.get('status', 'PAID'))
                         
-                        # Get user details for admin view
-                        user_id = booking_data.get('userId')
-                        if user_id:
-                            user_query = {
-                                'query': f'''
-                                {{
-                                    user(id: {user_id}) {{
-                                        id
-                                        username
-                                        email
-                                        role
-                                    }}
-                                }}
-                                '''
-                            }
-                            
-                            user_result = make_service_request(SERVICE_URLS['user'], user_query, 'user')
-                            if user_result and not user_result.get('errors'):
-                                user_data = user_result.get('data', {}).get('user')
-                                if user_data:
-                                    payment['booking']['user'] = user_data
+                        # User details for admin view are attached after the loop in one usersByIds call
                         
                         # Get showtime details (same pattern as user method)
                         showtime_id = booking_data.get('showtimeId')
-                        print(f"[ADMIN] Fetching showtime with ID: {showtime_id}")  # Debug log
+                        logger.debug("[ADMIN] Fetching showtime with ID: %s", showtime_id)
                         
                         if showtime_id:
                             showtime_query = {
@@ -1140,11 +1318,11 @@ class Query(ObjectType):
                             }
                             
                             showtime_result = make_service_request(SERVICE_URLS['cinema'], showtime_query, 'cinema')
-                            print(f"[ADMIN] Showtime service response: {showtime_result}")  # Debug log
+                            logger.debug("[ADMIN] Showtime service response: %s", showtime_result)
                             
                             if showtime_result and not showtime_result.get('errors'):
                                 showtime_data = showtime_result.get('data', {}).get('showtime')
-                                print(f"[ADMIN] Showtime data extracted: {showtime_data}")  # Debug log
+                                logger.debug("[ADMIN] Showtime data extracted: %s", showtime_data)
                                 
                                 if showtime_data:
                                     # Fix startTime handling (same as user method)
@@ -1170,7 +1348,7 @@ class Query(ObjectType):
                                     
                                     # Get movie details (same pattern as user method)
                                     movie_id_value = showtime_data.get('movieId')
-                                    print(f"[ADMIN] Fetching movie with ID: {movie_id_value}")  # Debug log
+                                    logger.debug("[ADMIN] Fetching movie with ID: %s", movie_id_value)
                                     
                                     if movie_id_value:
                                         movie_query = {
@@ -1191,7 +1369,7 @@ class Query(ObjectType):
                                         }
                                         
                                         movie_result = make_service_request(SERVICE_URLS['movie'], movie_query, 'movie')
-                                        print(f"[ADMIN] Movie service response: {movie_result}")  # Debug log
+                                        logger.debug("[ADMIN] Movie service response: %s", movie_result)
                                         
                                         if movie_result and not movie_result.get('errors'):
                                             movie_data = movie_result.get('data', {}).get('movie')
@@ -1207,9 +1385,9 @@ class Query(ObjectType):
                                                     'rating': movie_data.get('rating')
                                                 }
                                             else:
-                                                print(f"[ADMIN] No movie data found for movie ID {movie_id_value}")
+                                                logger.debug("[ADMIN] No movie data found for movie ID %s", movie_id_value)
                                         else:
-                                            print(f"[ADMIN] Movie service failed for movie ID {movie_id_value}: {movie_result}")
+                                            logger.warning("[ADMIN] Movie service failed for movie ID %s: %s", movie_id_value, movie_result)
                                             # Add placeholder movie if service fails
                                             payment['booking']['showtime']['movie'] = {
                                                 'id': movie_id_value,
@@ -1222,10 +1400,10 @@ class Query(ObjectType):
                                                 'rating': 0.0
                                             }
                                     else:
-                                        print(f"[ADMIN] No movieId found in showtime data: {showtime_data}")
+                                        logger.debug("[ADMIN] No movieId found in showtime data: %s", showtime_data)
                                     
                                     # Get seat details (tickets for this booking) - SAME FIX AS USER METHOD
-                                    print(f"[ADMIN] Fetching tickets for booking ID: {booking_id}")  # Debug log
+                                    logger.debug("[ADMIN] Fetching tickets for booking ID: %s", booking_id)
                                     
                                     tickets_query = {
                                         'query': f'''
@@ -1240,25 +1418,25 @@ class Query(ObjectType):
                                     }
                                     
                                     tickets_result = make_service_request(SERVICE_URLS['booking'], tickets_query, 'booking')
-                                    print(f"[ADMIN] Tickets service response: {tickets_result}")  # Debug log
+                                    logger.debug("[ADMIN] Tickets service response: %s", tickets_result)
                                     
                                     if tickets_result and not tickets_result.get('errors'):
                                         tickets_data = tickets_result.get('data', {}).get('tickets', [])
-                                        print(f"[ADMIN] Raw tickets data from service: {tickets_data}")  # Debug log
+                                        logger.debug("[ADMIN] Raw tickets data from service: %s", tickets_data)
                                         
                                         # CRITICAL FIX: Use same ticket handling as user method
                                         from types import SimpleNamespace
                                         
                                         transformed_tickets = []
                                         for ticket in tickets_data:
-                                            print(f"[ADMIN] Processing ticket: {ticket}")  # Debug log
+                                            logger.debug("[ADMIN] Processing ticket: %s", ticket)
                                             
                                             # Handle both possible field name formats from the booking service
                                             ticket_id = ticket.get('id')
                                             booking_id_field = ticket.get('bookingId') or ticket.get('booking_id')
                                             seat_number_field = ticket.get('seatNumber') or ticket.get('seat_number')
                                             
-                                            print(f"[ADMIN] Ticket fields - id: {ticket_id}, bookingId: {booking_id_field}, seatNumber: {seat_number_field}")  # Debug log
+                                            logger.debug("[ADMIN] Ticket fields - id: %s, bookingId: %s, seatNumber: %s", ticket_id, booking_id_field, seat_number_field)
                                             
                                             # Create an object-like structure instead of dict (SAME AS USER METHOD)
                                             ticket_obj = SimpleNamespace()
@@ -1271,41 +1449,68 @@ class Query(ObjectType):
                                             ticket_obj.seat_number = seat_number_field
                                             
                                             transformed_tickets.append(ticket_obj)
-                                            print(f"[ADMIN] Created ticket object: id={ticket_obj.id}, bookingId={ticket_obj.bookingId}, seatNumber={ticket_obj.seatNumber}")  # Debug log
+                                            logger.debug("[ADMIN] Created ticket object: id=%s, bookingId=%s, seatNumber=%s", ticket_obj.id, ticket_obj.bookingId, ticket_obj.seatNumber)
                                         
                                         payment['booking']['tickets'] = transformed_tickets
-                                        print(f"[ADMIN] Final transformed tickets count: {len(transformed_tickets)}")  # Debug log
+                                        logger.debug("[ADMIN] Final transformed tickets count: %s", len(transformed_tickets))
                                     else:
-                                        print(f"[ADMIN] Tickets service failed for booking {booking_id}: {tickets_result}")
+                                        logger.warning("[ADMIN] Tickets service failed for booking %s: %s", booking_id, tickets_result)
                                         payment['booking']['tickets'] = []
                                 else:
-                                    print(f"[ADMIN] No showtime data found for showtime ID {showtime_id}")
+                                    logger.debug("[ADMIN] No showtime data found for showtime ID %s", showtime_id)
                                     payment['booking']['showtime'] = None
                                     payment['booking']['tickets'] = []
                             else:
-                                print(f"[ADMIN] Showtime service failed for showtime ID {showtime_id}: {showtime_result}")
+                                logger.warning("[ADMIN] Showtime service failed for showtime ID %s: %s", showtime_id, showtime_result)
                                 payment['booking']['showtime'] = None
                                 payment['booking']['tickets'] = []
                         else:
-                            print(f"[ADMIN] No showtimeId found in booking data: {booking_data}")
+                            logger.debug("[ADMIN] No showtimeId found in booking data: %s", booking_data)
                             payment['booking']['showtime'] = None
                             payment['booking']['tickets'] = []
                     else:
-                        print(f"[ADMIN] No booking data found for booking ID {booking_id}")
+                        logger.debug("[ADMIN] No booking data found for booking ID %s", booking_id)
                         payment['booking'] = None
                 else:
-                    print(f"[ADMIN] Booking service failed or returned errors for booking ID {booking_id}: {booking_result}")
+                    logger.warning("[ADMIN] Booking service failed or returned errors for booking ID %s: %s", booking_id, booking_result)
                     payment['booking'] = None
             else:
-                print(f"[ADMIN] No bookingId found in payment: {payment}")
+                logger.debug("[ADMIN] No bookingId found in payment: %s", payment)
                 payment['booking'] = None
         
-        print(f"[ADMIN] Final payments data: {payments}")  # Debug log
+        # Get user details for all bookings with a single multi-get instead of one call per payment
+        user_ids = sorted({payment['booking']['userId'] for payment in payments
+                           if payment.get('booking') and payment['booking'].get('userId')})
+        if user_ids:
+            users_query = {
+                'query': '''
+                query($ids: [Int]!) {
+                    usersByIds(ids: $ids) {
+                        id
+                        username
+                        email
+                        role
+                    }
+                }
+                ''',
+                'variables': {'ids': user_ids}
+            }
+            users_result = make_service_request(SERVICE_URLS['user'], users_query, 'user')
+            users_response = handle_service_response(users_result, 'user', 'usersByIds')
+            if users_response['success']:
+                users_by_id = {int(user['id']): user for user in users_response['data'] or []}
+                for payment in payments:
+                    if payment.get('booking') and payment['booking'].get('userId') in users_by_id:
+                        payment['booking']['user'] = users_by_id[payment['booking']['userId']]
+            else:
+                logger.debug("[ADMIN] Failed to load users for payments: %s", users_response['error'])
+        
+        logger.debug("[ADMIN] Final payments data: %s", payments)
         return payments
 
     @require_admin
-    def resolve_users(self, info, current_user):
-        query = '{ users { id username email role } }'
+    def resolve_users(self, info, current_user, first=None, after=None):
+        query = f'{{ users{graphql_arguments(first=first, after=after)} {{ id username email role }} }}'
         query_data = {'query': query}
         result = make_service_request(SERVICE_URLS['user'], query_data, 'user')
         
@@ -1314,6 +1519,49 @@ class Query(ObjectType):
             raise Exception(response['error'])
         return response['data']
 
+    @require_auth
+    def resolve_my_loyalty(self, info, current_user):
+        """Loyalty progress and personal coupons, read from coupon-service counters"""
+        query_data = {
+            'query': '''
+            query($userId: Int!) {
+                userLoyalty(userId: $userId) {
+                    successfulPayments
+                    paymentsUntilNextCoupon
+                    coupons { id code name discountPercentage validUntil isActive createdAt }
+                }
+            }
+            ''',
+            'variables': {'userId': current_user['user_id']}
+        }
+        result = make_service_request(SERVICE_URLS['coupon'], query_data, 'coupon')
+
+        response = handle_service_response(result, 'coupon', 'userLoyalty')
+        if not response['success']:
+            raise Exception(response['error'])
+        return response['data']
+
+    @require_admin
+    def resolve_coupon_batch(self, info, current_user, id):
+        """Progress of a generateCouponBatch job"""
+        query_data = {
+            'query': '''
+            query($id: Int!) {
+                couponBatch(id: $id) {
+                    id prefix name discountPercentage validUntil count
+                    generatedCount skippedCount progress status error createdAt finishedAt
+                }
+            }
+            ''',
+            'variables': {'id': id}
+        }
+        result = make_service_request(SERVICE_URLS['coupon'], query_data, 'coupon')
+
+        response = handle_service_response(result, 'coupon', 'couponBatch')
+        if not response['success']:
+            raise Exception(response['error'])
+        return response['data']
+
     # ============================================================================
     # GET BY ID RESOLVERS
     # ============================================================================
@@ -1448,48 +1696,49 @@ class Query(ObjectType):
         return auditoriums
     
 
-    def resolve_showtimes(self, info, movie_id=None, auditorium_id=None):
-        print(f"resolve_showtimes called with movie_id={movie_id}, auditorium_id={auditorium_id}")
+    def resolve_showtimes(self, info, movie_id=None, auditorium_id=None, first=None, after=None):
+        logger.debug("resolve_showtimes called with movie_id=%s, auditorium_id=%s", movie_id, auditorium_id)
         
-        # Get all showtimes from cinema service
+        # Filters and page bounds are applied by cinema service
+        arguments = graphql_arguments(movieId=movie_id, auditoriumId=auditorium_id, first=first, after=after)
         query_data = {
-            'query': '''
-            {
-                showtimes {
+            'query': f'''
+            {{
+                showtimes{arguments} {{
                     id
                     movieId
                     auditoriumId
                     startTime
                     price
-                    auditorium {
+                    auditorium {{
                         id
                         name
-                        cinema {
+                        cinema {{
                             id
                             name
                             city
-                        }
-                    }
-                }
-            }
+                        }}
+                    }}
+                }}
+            }}
             '''
         }
         
-        print(f"Making request to cinema service with query: {query_data}")
+        logger.debug("Making request to cinema service with query: %s", query_data)
         result = make_service_request(SERVICE_URLS['cinema'], query_data, 'cinema')
-        print(f"Cinema service response: {result}")
+        logger.debug("Cinema service response: %s", result)
         
         response = handle_service_response(result, 'cinema', 'showtimes')
         if not response['success']:
-            print(f"Error fetching showtimes: {response['error']}")
+            logger.warning("Error fetching showtimes: %s", response['error'])
             return []
         
         # Get raw showtimes data
         raw_showtimes = response['data'] or []
-        print(f"Raw showtimes from cinema service: {len(raw_showtimes)} items")
+        logger.debug("Raw showtimes from cinema service: %s items", len(raw_showtimes))
         
         if not raw_showtimes:
-            print("No showtimes returned from cinema service")
+            logger.debug("No showtimes returned from cinema service")
             return []
         
         # Process each showtime with datetime cleaning
@@ -1497,7 +1746,7 @@ class Query(ObjectType):
         
         for showtime in raw_showtimes:
             try:
-                print(f"Processing showtime: {showtime}")
+                logger.debug("Processing showtime: %s", showtime)
                 
                 # Create processed showtime with cleaned datetime
                 processed_showtime = dict(showtime)  # Copy original
@@ -1509,7 +1758,7 @@ class Query(ObjectType):
                         # Clean the datetime string by removing quotes
                         clean_start_time = start_time.strip("'\"")
                         processed_showtime['startTime'] = clean_start_time
-                        print(f"Cleaned datetime for showtime {showtime.get('id')}: {start_time} -> {clean_start_time}")
+                        logger.debug("Cleaned datetime for showtime %s: %s -> %s", showtime.get('id'), start_time, clean_start_time)
                     else:
                         # Convert to string if not already
                         processed_showtime['startTime'] = str(start_time)
@@ -1521,19 +1770,19 @@ class Query(ObjectType):
                     showtime_movie_id = processed_showtime.get('movieId')
                     if showtime_movie_id != int(movie_id):
                         include_showtime = False
-                        print(f"Filtered out showtime {processed_showtime.get('id')} - movie mismatch")
+                        logger.debug("Filtered out showtime %s - movie mismatch", processed_showtime.get('id'))
                 
                 if auditorium_id and include_showtime:
                     showtime_auditorium_id = processed_showtime.get('auditoriumId')
                     if showtime_auditorium_id != int(auditorium_id):
                         include_showtime = False
-                        print(f"Filtered out showtime {processed_showtime.get('id')} - auditorium mismatch")
+                        logger.debug("Filtered out showtime %s - auditorium mismatch", processed_showtime.get('id'))
                 
                 if include_showtime:
                     # Enrich with movie details
                     movie_id_value = processed_showtime.get('movieId')
                     if movie_id_value:
-                        print(f"Fetching movie details for movieId: {movie_id_value}")
+                        logger.debug("Fetching movie details for movieId: %s", movie_id_value)
                         movie_query = {
                             'query': f'''
                             {{
@@ -1557,9 +1806,9 @@ class Query(ObjectType):
                                 movie_data = movie_result.get('data', {}).get('movie')
                                 if movie_data:
                                     processed_showtime['movie'] = movie_data
-                                    print(f"Added movie data: {movie_data.get('title')}")
+                                    logger.debug("Added movie data: %s", movie_data.get('title'))
                                 else:
-                                    print(f"No movie data found for ID {movie_id_value}")
+                                    logger.debug("No movie data found for ID %s", movie_id_value)
                                     # Add placeholder
                                     processed_showtime['movie'] = {
                                         'id': movie_id_value,
@@ -1571,9 +1820,9 @@ class Query(ObjectType):
                                         'description': None
                                     }
                             else:
-                                print(f"Movie service error: {movie_result}")
+                                logger.warning("Movie service error: %s", movie_result)
                         except Exception as movie_error:
-                            print(f"Error fetching movie data: {movie_error}")
+                            logger.error("Error fetching movie data: %s", movie_error)
                     
                     # Transform to snake_case for gateway compatibility
                     gateway_showtime = {
@@ -1587,16 +1836,16 @@ class Query(ObjectType):
                     }
                     
                     processed_showtimes.append(gateway_showtime)
-                    print(f"Added showtime {gateway_showtime.get('id')} to results")
+                    logger.debug("Added showtime %s to results", gateway_showtime.get('id'))
             
             except Exception as process_error:
-                print(f"Error processing showtime {showtime}: {process_error}")
+                logger.error("Error processing showtime %s: %s", showtime, process_error)
                 # Continue with next showtime instead of failing completely
                 continue
         
-        print(f"Final processed showtimes: {len(processed_showtimes)} items")
+        logger.debug("Final processed showtimes: %s items", len(processed_showtimes))
         if processed_showtimes:
-            print(f"Sample processed showtime: {processed_showtimes[0]}")
+            logger.debug("Sample processed showtime: %s", processed_showtimes[0])
         
         return processed_showtimes
     
@@ -1656,6 +1905,48 @@ class Query(ObjectType):
         
         return user_data
 
+    # CONNECTION RESOLVERS - pages of the list queries above, same auth rules
+    def resolve_movies_connection(self, info, first=None, after=None):
+        return resolve_connection(MovieConnection, first, after,
+                                  lambda limit, after_id: Query.resolve_movies(self, info, first=limit, after=after_id))
+
+    def resolve_cinemas_connection(self, info, first=None, after=None):
+        return resolve_connection(CinemaConnection, first, after,
+                                  lambda limit, after_id: Query.resolve_cinemas(self, info, first=limit, after=after_id))
+
+    def resolve_showtimes_connection(self, info, movie_id=None, auditorium_id=None, first=None, after=None):
+        return resolve_connection(ShowtimeConnection, first, after,
+                                  lambda limit, after_id: Query.resolve_showtimes(self, info, movie_id=movie_id, auditorium_id=auditorium_id,
+                                                                                  first=limit, after=after_id))
+
+    def resolve_available_coupons_connection(self, info, first=None, after=None):
+        return resolve_connection(CouponConnection, first, after,
+                                  lambda limit, after_id: Query.resolve_availableCoupons(self, info, first=limit, after=after_id))
+
+    def resolve_coupons_connection(self, info, first=None, after=None):
+        return resolve_connection(CouponConnection, first, after,
+                                  lambda limit, after_id: Query.resolve_coupons(self, info, first=limit, after=after_id))
+
+    def resolve_my_bookings_connection(self, info, first=None, after=None):
+        return resolve_connection(BookingConnection, first, after,
+                                  lambda limit, after_id: Query.resolve_my_bookings(self, info, first=limit, after=after_id))
+
+    def resolve_my_payments_connection(self, info, first=None, after=None):
+        return resolve_connection(PaymentConnection, first, after,
+                                  lambda limit, after_id: Query.resolve_my_payments(self, info, first=limit, after=after_id))
+
+    def resolve_all_bookings_connection(self, info, first=None, after=None):
+        return resolve_connection(BookingConnection, first, after,
+                                  lambda limit, after_id: Query.resolve_all_bookings(self, info, first=limit, after=after_id))
+
+    def resolve_all_payments_connection(self, info, first=None, after=None):
+        return resolve_connection(PaymentConnection, first, after,
+                                  lambda limit, after_id: Query.resolve_all_payments(self, info, first=limit, after=after_id))
+
+    def resolve_users_connection(self, info, first=None, after=None):
+        return resolve_connection(UserConnection, first, after,
+                                  lambda limit, after_id: Query.resolve_users(self, info, first=limit, after=after_id))
+
 # ============================================================================
 # MUTATION RESOLVERS
 # ============================================================================
@@ -2522,17 +2813,59 @@ class DeleteBooking(Mutation):
                 message=delete_result.get('message', 'Failed to cancel booking')
             )
 
+def extend_booking_hold(booking_id, until):
+    """Keep a PENDING booking's seats held until `until`, returns (success, error message)"""
+    query_data = {
+        'query': '''
+        mutation($bookingId: Int!, $until: String!) {
+            extendHold(bookingId: $bookingId, until: $until) {
+                success
+                message
+            }
+        }
+        ''',
+        'variables': {'bookingId': booking_id, 'until': until}
+    }
+    result = make_service_request(SERVICE_URLS['booking'], query_data, 'booking')
+    response = handle_service_response(result, 'booking', 'extendHold')
+    if not response['success']:
+        return False, response['error']
+    extend_result = response['data'] or {}
+    if not extend_result.get('success'):
+        return False, extend_result.get('message', 'Failed to extend booking hold')
+    return True, None
+
 class CreatePayment(Mutation):
     class Arguments:
         # Removed amount from required arguments - will be calculated automatically
         bookingId = Int(required=True)
         paymentMethod = String()
-        paymentProofImage = String()
+        paymentProofImage = String()  # Deprecated: base64 payload, stored in the blob store on arrival
+        paymentProofHash = String()   # Hash returned by POST /blobs
 
     Output = CreatePaymentResponse
 
     @require_auth
-    def mutate(self, info, current_user, bookingId, paymentMethod='CREDIT_CARD', paymentProofImage=None):
+    def mutate(self, info, current_user, bookingId, paymentMethod='CREDIT_CARD', paymentProofImage=None, paymentProofHash=None):
+        # Step 0: Resolve the proof file to a blob hash
+        if paymentProofHash and not blob_exists(paymentProofHash):
+            return CreatePaymentResponse(
+                payment=None,
+                success=False,
+                message="Payment proof file not found. Upload it to /blobs first"
+            )
+
+        if paymentProofImage and not paymentProofHash:
+            try:
+                paymentProofHash, _ = store_bytes(decode_base64_payload(paymentProofImage), user_id=current_user['user_id'])
+            except (BlobTooLarge, BlobQuotaExceeded) as e:
+                return CreatePaymentResponse(payment=None, success=False, message=str(e))
+            except InvalidBlobPayload as e:
+                return CreatePaymentResponse(payment=None, success=False, message=f"Invalid payment proof image: {str(e)}")
+            except OSError as e:
+                logger.error("Error storing payment proof: %s", e)
+                return CreatePaymentResponse(payment=None, success=False, message="Failed to store payment proof image")
+
         # Step 1: Validate booking exists and get booking details
         booking_check_query = {
             'query': f'''
@@ -2651,13 +2984,13 @@ class CreatePayment(Mutation):
         seat_count = len(reserved_seats)
         calculated_amount = showtime_price * seat_count
         
-        print(f"Payment calculation: {seat_count} seats × {showtime_price} = {calculated_amount}")  # Debug log
+        logger.debug("Payment calculation: %s seats × %s = %s", seat_count, showtime_price, calculated_amount)
 
         # Step 5: Create payment with calculated amount (status starts as 'pending')
         payment_query = {
             'query': '''
-            mutation($amount: Float!, $userId: Int!, $bookingId: Int!, $paymentMethod: String!, $paymentProofImage: String) {
-                createPayment(amount: $amount, userId: $userId, bookingId: $bookingId, paymentMethod: $paymentMethod, paymentProofImage: $paymentProofImage) {
+            mutation($amount: Float!, $userId: Int!, $bookingId: Int!, $paymentMethod: String!, $paymentProofHash: String) {
+                createPayment(amount: $amount, userId: $userId, bookingId: $bookingId, paymentMethod: $paymentMethod, paymentProofHash: $paymentProofHash) {
                     payment {
                         id
                         userId
@@ -2665,9 +2998,10 @@ class CreatePayment(Mutation):
                         amount
                         paymentMethod
                         status
-                        paymentProofImage
+                        paymentProofHash
                         createdAt
                         updatedAt
+                        expiresAt
                     }
                     success
                     message
@@ -2679,7 +3013,7 @@ class CreatePayment(Mutation):
                 'userId': current_user['user_id'],
                 'bookingId': bookingId,
                 'paymentMethod': paymentMethod,
-                'paymentProofImage': paymentProofImage
+                'paymentProofHash': paymentProofHash
             }
         }
         
@@ -2722,8 +3056,20 @@ class CreatePayment(Mutation):
                 message="Payment created but ID not returned"
             )
 
+        # Step 5b: Hold the seats for as long as the payment may stay pending, so the hold
+        # sweeper doesn't cancel a booking whose payment is still waiting for approval
+        if payment_service_data.get('expiresAt'):
+            held, hold_error = extend_booking_hold(bookingId, payment_service_data['expiresAt'])
+            if not held:
+                update_payment_statuses([payment_id], 'failed', from_status='pending')
+                return CreatePaymentResponse(
+                    payment=None,
+                    success=False,
+                    message=f"Booking hold could not be kept for the payment: {hold_error}"
+                )
+
         # Step 6: AUTOMATICALLY update payment status to 'success' (system-driven)
-        print(f"Automatically updating payment {payment_id} status to 'success'")  # Debug log
+        logger.debug("Automatically updating payment %s status to 'success'", payment_id)
         
         status_update_query = {
             'query': '''
@@ -2745,10 +3091,10 @@ class CreatePayment(Mutation):
         }
         
         status_update_result = make_service_request(SERVICE_URLS['payment'], status_update_query, 'payment')
-        print(f"Payment status update result: {status_update_result}")  # Debug log
+        logger.debug("Payment status update result: %s", status_update_result)
 
         # Step 7: AUTOMATICALLY update booking status to 'PAID' (system-driven)
-        print(f"Automatically updating booking {bookingId} status to 'PAID'")  # Debug log
+        logger.debug("Automatically updating booking %s status to 'PAID'", bookingId)
         
         booking_update_query = {
             'query': '''
@@ -2770,7 +3116,7 @@ class CreatePayment(Mutation):
         }
         
         booking_update_result = make_service_request(SERVICE_URLS['booking'], booking_update_query, 'booking')
-        print(f"Booking status update result: {booking_update_result}")  # Debug log
+        logger.debug("Booking status update result: %s", booking_update_result)
         
         # Step 8: Create tickets for reserved seats automatically
         if reserved_seats:
@@ -2795,7 +3141,7 @@ class CreatePayment(Mutation):
             }
             
             ticket_result = make_service_request(SERVICE_URLS['booking'], ticket_query, 'booking')
-            print(f"Ticket creation result: {ticket_result}")  # Debug log
+            logger.debug("Ticket creation result: %s", ticket_result)
             
             # Update seat statuses from RESERVED to BOOKED after creating tickets
             for seat_number in reserved_seats:
@@ -2827,13 +3173,13 @@ class CreatePayment(Mutation):
                 'amount': payment_service_data.get('amount') or calculated_amount,
                 'paymentMethod': payment_service_data.get('paymentMethod') or paymentMethod,
                 'status': 'success',  # Set final status to success
-                'paymentProofImage': payment_service_data.get('paymentProofImage') or paymentProofImage,
+                'paymentProofHash': payment_service_data.get('paymentProofHash') or paymentProofHash,
                 'createdAt': payment_service_data.get('createdAt'),
                 'updatedAt': payment_service_data.get('updatedAt'),
                 'canBeDeleted': False  # Success payments cannot be deleted
             }
             
-            print(f"Final transformed payment: {transformed_payment}")
+            logger.debug("Final transformed payment: %s", transformed_payment)
             
             return CreatePaymentResponse(
                 payment=transformed_payment,
@@ -2847,6 +3193,152 @@ class CreatePayment(Mutation):
                 message="Payment processing completed but data not available"
             )
 
+def update_payment_statuses(payment_ids, status, from_status=None, queue_events=True):
+    """Bulk status change in payment service, returns (success, changed payments or error message)"""
+    query_data = {
+        'query': '''
+        mutation($ids: [Int]!, $status: String!, $fromStatus: String, $queueEvents: Boolean) {
+            updatePaymentStatuses(ids: $ids, status: $status, fromStatus: $fromStatus, queueEvents: $queueEvents) {
+                payments {
+                    id
+                    bookingId
+                }
+                success
+                message
+            }
+        }
+        ''',
+        'variables': {'ids': payment_ids, 'status': status, 'fromStatus': from_status, 'queueEvents': queue_events}
+    }
+    result = make_service_request(SERVICE_URLS['payment'], query_data, 'payment')
+    response = handle_service_response(result, 'payment', 'updatePaymentStatuses')
+    if not response['success']:
+        return False, response['error']
+    update_result = response['data'] or {}
+    if not update_result.get('success'):
+        return False, update_result.get('message', 'Failed to update payment statuses')
+    return True, update_result.get('payments') or []
+
+def queue_payment_events(payment_ids):
+    """Queue payment.succeeded for payments approved with queue_events=False, returns (success, error message)"""
+    query_data = {
+        'query': '''
+        mutation($ids: [Int]!) {
+            queuePaymentEvents(ids: $ids) {
+                success
+                message
+            }
+        }
+        ''',
+        'variables': {'ids': payment_ids}
+    }
+    result = make_service_request(SERVICE_URLS['payment'], query_data, 'payment')
+    response = handle_service_response(result, 'payment', 'queuePaymentEvents')
+    if not response['success']:
+        return False, response['error']
+    queue_result = response['data'] or {}
+    if not queue_result.get('success'):
+        return False, queue_result.get('message', 'Failed to queue payment events')
+    return True, None
+
+class ApprovePayments(Mutation):
+    """Approve pending payments in bulk (e.g. a backlog of bank transfers).
+
+    Per batch: one payment-service UPDATE, then one booking-service call that
+    marks the bookings PAID, books their seats and creates tickets. If the
+    booking step fails, the batch's payments are put back to pending; a
+    payment whose booking was cancelled meanwhile is marked failed. Only the
+    payments that stay approved get their payment.succeeded event (loyalty).
+    """
+    class Arguments:
+        paymentIds = List(Int, required=True)
+
+    Output = ApprovePaymentsResponse
+
+    @require_admin
+    def mutate(self, info, current_user, paymentIds):
+        approved_payment_ids = []
+        paid_booking_ids = []
+        ticket_count = 0
+        errors = []
+
+        payment_ids = list(dict.fromkeys(paymentIds))  # Deduplicate, keep order
+        for start in range(0, len(payment_ids), APPROVE_BATCH_SIZE):
+            batch = payment_ids[start:start + APPROVE_BATCH_SIZE]
+
+            # Step 1: pending -> success in one statement; already handled payments are skipped.
+            # Events wait for step 3, so a payment reverted below never reaches the loyalty counters
+            ok, payments = update_payment_statuses(batch, 'success', from_status='pending', queue_events=False)
+            if not ok:
+                errors.append(payments)
+                continue
+            if not payments:
+                continue
+
+            # Step 2: bookings -> PAID, seats -> BOOKED, tickets created, all in one call
+            booking_query = {
+                'query': '''
+                mutation($bookingIds: [Int]!) {
+                    markBookingsPaid(bookingIds: $bookingIds) {
+                        success
+                        message
+                        paidBookingIds
+                        alreadyPaidBookingIds
+                        ticketCount
+                    }
+                }
+                ''',
+                'variables': {'bookingIds': [payment['bookingId'] for payment in payments]}
+            }
+            booking_result = make_service_request(SERVICE_URLS['booking'], booking_query, 'booking')
+            booking_response = handle_service_response(booking_result, 'booking', 'markBookingsPaid')
+            paid_result = booking_response['data'] or {}
+
+            if not booking_response['success'] or not paid_result.get('success'):
+                errors.append(booking_response.get('error') or paid_result.get('message', 'Failed to mark bookings as paid'))
+                # Compensate so the payments can be approved again later
+                changed_ids = [payment['id'] for payment in payments]
+                reverted, revert_error = update_payment_statuses(changed_ids, 'pending', from_status='success')
+                if not reverted:
+                    errors.append(f"Payments {changed_ids} are approved but their bookings are not paid: {revert_error}")
+                continue
+
+            newly_paid = paid_result.get('paidBookingIds') or []
+            payable = set(newly_paid) | set(paid_result.get('alreadyPaidBookingIds') or [])
+
+            # A booking that is neither newly nor already PAID was cancelled (or is gone): its payment fails
+            unpaid = [payment for payment in payments if payment['bookingId'] not in payable]
+            if unpaid:
+                unpaid_ids = [payment['id'] for payment in unpaid]
+                errors.append(f"Payments {unpaid_ids} were not approved: bookings {[payment['bookingId'] for payment in unpaid]} are no longer payable")
+                reverted, revert_error = update_payment_statuses(unpaid_ids, 'failed', from_status='success')
+                if not reverted:
+                    errors.append(f"Payments {unpaid_ids} are approved but their bookings are not paid: {revert_error}")
+
+            approved_ids = [payment['id'] for payment in payments if payment['bookingId'] in payable]
+
+            # Step 3: payment.succeeded events for the payments that stay approved
+            if approved_ids:
+                queued, queue_error = queue_payment_events(approved_ids)
+                if not queued:
+                    errors.append(f"Payments {approved_ids} are approved but their loyalty events were not queued: {queue_error}")
+
+            approved_payment_ids.extend(approved_ids)
+            paid_booking_ids.extend(newly_paid)
+            ticket_count += paid_result.get('ticketCount') or 0
+
+        message = f"Approved {len(approved_payment_ids)} of {len(payment_ids)} payments, {len(paid_booking_ids)} bookings paid, {ticket_count} tickets created"
+        if errors:
+            message += f". Errors: {'; '.join(errors)}"
+
+        return ApprovePaymentsResponse(
+            success=not errors,
+            message=message,
+            approvedPaymentIds=approved_payment_ids,
+            paidBookingIds=paid_booking_ids,
+            ticketCount=ticket_count
+        )
+
 class DeletePayment(Mutation):
     class Arguments:
         id = Int(required=True)
@@ -2863,8 +3355,9 @@ class DeletePayment(Mutation):
             payment_check_query = {
                 'query': f'''
                 {{
-                    userPayments(userId: {user_id}) {{
+                    payment(id: {int(id)}) {{
                         id
+                        userId
                         canBeDeleted
                     }}
                 }}
@@ -2875,8 +3368,10 @@ class DeletePayment(Mutation):
             if not payment_result:
                 return DeleteResponse(success=False, message="Payment service unavailable")
             
-            user_payments = payment_result.get('data', {}).get('userPayments', [])
-            target_payment = next((p for p in user_payments if p['id'] == id), None)
+            # Looked up by id: a list of the user's payments only holds their first page
+            target_payment = (payment_result.get('data') or {}).get('payment')
+            if target_payment and target_payment.get('userId') != user_id:
+                target_payment = None
             
             if not target_payment:
                 return DeleteResponse(success=False, message=f"Payment {id} not found or not owned by user")
@@ -3119,13 +3614,13 @@ class UseCoupon(Mutation):
     def mutate(self, info, current_user, code, booking_amount):
         query_data = {
             'query': '''
-            mutation($code: String!, $booking_amount: Float!) {
-                useCoupon(code: $code, booking_amount: $booking_amount) {
-                    success message discount_amount
+            mutation($code: String!, $bookingAmount: Float!, $userId: Int) {
+                useCoupon(code: $code, bookingAmount: $bookingAmount, userId: $userId) {
+                    success message discountAmount
                 }
             }
             ''',
-            'variables': {'code': code, 'booking_amount': booking_amount}
+            'variables': {'code': code, 'bookingAmount': booking_amount, 'userId': current_user['user_id']}
         }
         
         result = make_service_request(SERVICE_URLS['coupon'], query_data, 'coupon')
@@ -3140,7 +3635,88 @@ class UseCoupon(Mutation):
         return UseCouponResponse(
             success=use_result.get('success', False),
             message=use_result.get('message', 'Coupon use completed'),
-            discount_amount=use_result.get('discount_amount', 0.0)
+            discount_amount=use_result.get('discountAmount', 0.0)
+        )
+
+class GenerateCouponBatch(Mutation):
+    class Arguments:
+        prefix = String(required=True)
+        count = Int(required=True)
+        discount = Float(required=True)
+        valid_until = String(required=True)
+        name = String()
+
+    Output = GenerateCouponBatchResponse
+
+    @require_admin
+    def mutate(self, info, current_user, prefix, count, discount, valid_until, name=None):
+        query_data = {
+            'query': '''
+            mutation($prefix: String!, $count: Int!, $discount: Float!, $validUntil: String!, $name: String) {
+                generateCouponBatch(prefix: $prefix, count: $count, discount: $discount, validUntil: $validUntil, name: $name) {
+                    batch { id prefix name discountPercentage validUntil count generatedCount skippedCount progress status createdAt }
+                    success
+                    message
+                }
+            }
+            ''',
+            'variables': {
+                'prefix': prefix,
+                'count': count,
+                'discount': discount,
+                'validUntil': valid_until,
+                'name': name
+            }
+        }
+
+        result = make_service_request(SERVICE_URLS['coupon'], query_data, 'coupon')
+        if not result:
+            return GenerateCouponBatchResponse(batch=None, success=False, message="Coupon service unavailable")
+
+        if result.get('errors'):
+            error_messages = [error.get('message', 'Unknown error') if isinstance(error, dict) else str(error) for error in result['errors']]
+            return GenerateCouponBatchResponse(batch=None, success=False, message=f"Error: {'; '.join(error_messages)}")
+
+        batch_result = result.get('data', {}).get('generateCouponBatch', {})
+        return GenerateCouponBatchResponse(
+            batch=batch_result.get('batch'),
+            success=batch_result.get('success', False),
+            message=batch_result.get('message', 'Coupon batch started')
+        )
+
+class RedeemCoupon(Mutation):
+    class Arguments:
+        code = String(required=True)
+        booking_amount = Float(required=True)
+
+    Output = UseCouponResponse
+
+    @require_auth
+    def mutate(self, info, current_user, code, booking_amount):
+        query_data = {
+            'query': '''
+            mutation($code: String!, $userId: Int!, $bookingAmount: Float!) {
+                redeemCoupon(code: $code, userId: $userId, bookingAmount: $bookingAmount) {
+                    success message discountAmount
+                }
+            }
+            ''',
+            'variables': {'code': code, 'userId': current_user['user_id'], 'bookingAmount': booking_amount}
+        }
+        
+        result = make_service_request(SERVICE_URLS['coupon'], query_data, 'coupon')
+        if not result:
+            return UseCouponResponse(success=False, message="Coupon service unavailable", discount_amount=0.0)
+        
+        if result.get('errors'):
+            error_messages = [error.get('message', 'Unknown error') for error in result['errors']]
+            return UseCouponResponse(success=False, message=f"Error: {'; '.join(error_messages)}", discount_amount=0.0)
+        
+        redeem_result = result.get('data', {}).get('redeemCoupon', {})
+        return UseCouponResponse(
+            success=redeem_result.get('success', False),
+            message=redeem_result.get('message', 'Coupon redemption completed'),
+            discount_amount=redeem_result.get('discountAmount', 0.0)
         )
 
 # Tambahkan mutation UpdateCinema setelah class UseCoupon
@@ -3812,6 +4388,7 @@ class Mutation(ObjectType):
     update_booking = UpdateBooking.Field()
     delete_booking = DeleteBooking.Field()
     use_coupon = UseCoupon.Field()  # ← User dapat menggunakan coupon
+    redeem_coupon = RedeemCoupon.Field()
     update_user = UpdateUser.Field()
     
     # Admin mutations (NO COUPON CRUD)
@@ -3828,6 +4405,8 @@ class Mutation(ObjectType):
     update_showtime = UpdateShowtime.Field() 
     delete_showtime = DeleteShowtime.Field()
     delete_user = DeleteUser.Field()
+    approve_payments = ApprovePayments.Field()
+    generate_coupon_batch = GenerateCouponBatch.Field()
     
     update_seat_status = UpdateSeatStatus.Field()
 
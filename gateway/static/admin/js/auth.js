@@ -8,6 +8,7 @@ class AdminAuthService {
         this.baseURL = '/graphql';
         this.tokenKey = 'admin_token';
         this.userKey = 'admin_user';
+        this.pageSize = 50;  // Rows per admin list request, see getConnectionPage()
         this.init();
     }
 
@@ -159,115 +160,100 @@ class AdminAuthService {
         return user && user.role === 'admin';
     }
 
-    // Get admin movies (with full access)
-    async getMovies() {
+    // One page of a *Connection query: { nodes, endCursor, hasNextPage }.
+    // The admin lists never ask for more than pageSize rows at once.
+    async getConnectionPage(field, nodeFields, after = null) {
         const query = `
-            query GetAdminMovies {
-                movies {
-                    id
-                    title
-                    genre
-                    duration
-                    description
-                    releaseDate
-                    posterUrl
-                    rating
+            query AdminPage($first: Int, $after: String) {
+                ${field}(first: $first, after: $after) {
+                    edges {
+                        node {
+                            ${nodeFields}
+                        }
+                    }
+                    pageInfo {
+                        hasNextPage
+                        endCursor
+                    }
                 }
             }
         `;
 
         try {
-            const result = await this.graphqlRequest(query);
-            return result.data.movies || [];
+            const result = await this.graphqlRequest(query, { first: this.pageSize, after });
+            const connection = result.data[field];
+            return {
+                nodes: connection.edges.map(edge => edge.node),
+                endCursor: connection.pageInfo.endCursor,
+                hasNextPage: connection.pageInfo.hasNextPage
+            };
         } catch (error) {
-            console.error('Error fetching admin movies:', error);
+            console.error(`Error fetching ${field}:`, error);
             throw error;
         }
     }
 
-    // Get admin cinemas (with full access)
-    async getCinemas() {
-        const query = `
-            query GetAdminCinemas {
-                cinemas {
-                    id
-                    name
-                    city
-                    capacity
-                    auditoriums {
-                        id
-                        name
-                        seat_layout
-                    }
-                }
-            }
-        `;
-
-        try {
-            const result = await this.graphqlRequest(query);
-            return result.data.cinemas || [];
-        } catch (error) {
-            console.error('Error fetching admin cinemas:', error);
-            throw error;
-        }
+    // Get admin movies (with full access), one page at a time (pass the previous page's endCursor)
+    async getMovies(after = null) {
+        return this.getConnectionPage('moviesConnection', `
+            id
+            title
+            genre
+            duration
+            description
+            releaseDate
+            posterUrl
+            rating
+        `, after);
     }
 
-    // Get admin users
-    async getUsers() {
-        const query = `
-            query GetUsers {
-                users {
-                    id
-                    username
-                    email
-                    role
-                }
+    // Get admin cinemas (with full access), one page at a time (pass the previous page's endCursor)
+    async getCinemas(after = null) {
+        return this.getConnectionPage('cinemasConnection', `
+            id
+            name
+            city
+            capacity
+            auditoriums {
+                id
+                name
+                seat_layout
             }
-        `;
+        `, after);
+    }
 
-        try {
-            const result = await this.graphqlRequest(query);
-            return result.data.users || [];
-        } catch (error) {
-            console.error('Error fetching users:', error);
-            throw error;
-        }
+    // Get admin users, one page at a time (pass the previous page's endCursor)
+    async getUsers(after = null) {
+        return this.getConnectionPage('usersConnection', `
+            id
+            username
+            email
+            role
+        `, after);
     }
 
-    // Get admin bookings
-    async getBookings() {
-        const query = `
-            query GetAllBookings {
-                allBookings {
-                    id
-                    user_id
-                    movie_id
-                    auditorium_id
-                    showtime_id
-                    seat_numbers
-                    total_price
-                    status
-                    booking_time
-                    movie {
-                        title
-                    }
-                    auditorium {
-                        name
-                        cinema {
-                            name
-                        }
-                    }
+    // Get admin bookings, one page at a time (pass the previous page's endCursor)
+    async getBookings(after = null) {
+        return this.getConnectionPage('allBookingsConnection', `
+            id
+            user_id
+            movie_id
+            auditorium_id
+            showtime_id
+            seat_numbers
+            total_price
+            status
+            booking_time
+            movie {
+                title
+            }
+            auditorium {
+                name
+                cinema {
+                    name
                 }
             }
-        `;
-
-        try {
-            const result = await this.graphqlRequest(query);
-            return result.data.allBookings || [];
-        } catch (error) {
-            console.error('Error fetching bookings:', error);
-            throw error;
-        }
+        `, after);
     }
 
     // Create movie
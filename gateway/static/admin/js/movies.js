@@ -6,6 +6,7 @@
 // Global state
 let allMovies = [];
 let filteredMovies = [];
+let moviesCursor = null;  // endCursor of the last loaded page, null when there are no more
 let currentPage = 1;
 const moviesPerPage = 12;
 let currentView = 'grid';
@@ -40,6 +41,8 @@ function cacheElements() {
         emptyState: document.getElementById('empty-state'),
         errorState: document.getElementById('error-state'),
         paginationContainer: document.getElementById('pagination-container'),
+        loadMoreContainer: document.getElementById('load-more-container'),
+        loadMoreButton: document.getElementById('load-more-movies'),
         
         // Filters
         genreFilter: document.getElementById('genre-filter'),
@@ -79,6 +82,11 @@ function setupEventListeners() {
     elements.searchInput.addEventListener('input', debounce(handleSearchInput, 300));
     elements.clearSearchBtn.addEventListener('click', clearSearch);
     
+    // Next page of movies
+    if (elements.loadMoreButton) {
+        elements.loadMoreButton.addEventListener('click', loadMoreMovies);
+    }
+    
     // Save movie
     elements.saveMovieBtn.addEventListener('click', handleSaveMovie);
     elements.updateMovieBtn.addEventListener('click', handleUpdateMovie);
@@ -95,21 +103,21 @@ function setupEventListeners() {
     });
 }
 
-// Load movies from API
+// Load the first page of movies from API
 async function loadMovies() {
     try {
         showLoadingState();
         console.log('Loading movies for admin...');
         
-        const movies = await AdminAuth.getMovies();
+        const page = await AdminAuth.getMovies();
+        allMovies = page.nodes;
+        updateMoviesCursor(page);
         
-        if (movies && movies.length > 0) {
-            allMovies = movies;
+        if (allMovies.length > 0) {
             applyFilters();
             populateGenreFilter();
-            console.log(`Loaded ${movies.length} movies successfully`);
+            console.log(`Loaded ${allMovies.length} movies successfully`);
         } else {
-            allMovies = [];
             showEmptyState();
             console.log('No movies found');
         }
@@ -119,6 +127,35 @@ async function loadMovies() {
     }
 }
 
+// Append the next page of movies
+async function loadMoreMovies() {
+    if (!moviesCursor) {
+        return;
+    }
+    
+    try {
+        elements.loadMoreButton.disabled = true;
+        const page = await AdminAuth.getMovies(moviesCursor);
+        allMovies = allMovies.concat(page.nodes);
+        updateMoviesCursor(page);
+        applyFilters();
+        populateGenreFilter();
+        elements.genreFilter.value = currentFilters.genre;  // Rebuilding the options resets the selection
+    } catch (error) {
+        console.error('Error loading more movies:', error);
+        showErrorState('Failed to load more movies. Please try again.');
+    } finally {
+        elements.loadMoreButton.disabled = false;
+    }
+}
+
+function updateMoviesCursor(page) {
+    moviesCursor = page.hasNextPage ? page.endCursor : null;
+    if (elements.loadMoreContainer) {
+        elements.loadMoreContainer.style.display = moviesCursor ? 'block' : 'none';
+    }
+}
+
 // Show loading state
 function showLoadingState() {
     elements.loadingContainer.style.display = 'block';
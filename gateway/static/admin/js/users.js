@@ -6,6 +6,7 @@
 // Global variables
 let allUsers = [];
 let filteredUsers = [];
+let usersCursor = null;  // endCursor of the last loaded page, null when there are no more
 
 // DOM Elements
 let elements = {};
@@ -35,6 +36,8 @@ function cacheElements() {
         emptyState: document.getElementById('empty-state'),
         errorState: document.getElementById('error-state'),
         errorMessage: document.getElementById('error-message'),
+        loadMoreContainer: document.getElementById('load-more-container'),
+        loadMoreButton: document.getElementById('load-more-users'),
         
         // Filters
         roleFilter: document.getElementById('role-filter'),
@@ -62,22 +65,26 @@ function setupEventListeners() {
     if (elements.roleFilter) {
         elements.roleFilter.addEventListener('change', applyFilters);
     }
+
+    if (elements.loadMoreButton) {
+        elements.loadMoreButton.addEventListener('click', loadMoreUsers);
+    }
 }
 
-// Load users from API
+// Load the first page of users from API
 async function loadUsers() {
     try {
         showLoadingState();
         
         console.log('Loading users for admin...');
-        const users = await AdminAuth.getUsers();
+        const page = await AdminAuth.getUsers();
+        allUsers = page.nodes;
+        updateUsersCursor(page);
         
-        if (users && users.length > 0) {
-            allUsers = users;
-            updateStats(users);
+        if (allUsers.length > 0) {
+            updateStats(allUsers);
             applyFilters();
         } else {
-            allUsers = [];
             showEmptyState();
         }
         
@@ -87,6 +94,34 @@ async function loadUsers() {
     }
 }
 
+// Append the next page of users
+async function loadMoreUsers() {
+    if (!usersCursor) {
+        return;
+    }
+    
+    try {
+        elements.loadMoreButton.disabled = true;
+        const page = await AdminAuth.getUsers(usersCursor);
+        allUsers = allUsers.concat(page.nodes);
+        updateUsersCursor(page);
+        updateStats(allUsers);
+        applyFilters();
+    } catch (error) {
+        console.error('Error loading more users:', error);
+        showErrorState('Failed to load more users. Please try again.');
+    } finally {
+        elements.loadMoreButton.disabled = false;
+    }
+}
+
+function updateUsersCursor(page) {
+    usersCursor = page.hasNextPage ? page.endCursor : null;
+    if (elements.loadMoreContainer) {
+        elements.loadMoreContainer.style.display = usersCursor ? 'block' : 'none';
+    }
+}
+
 // Update statistics
 function updateStats(users) {
     const totalUsers = users.length;
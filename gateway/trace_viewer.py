@@ -0,0 +1,99 @@
+"""Render traces written by shared/tracing.py as text waterfalls.
+
+Reads every <service>.jsonl span file in the trace directory (the shared
+`traces` volume). Without a trace id it lists the most recent traces; with
+one (or a unique prefix, e.g. from a response's X-Trace-Id header) it prints
+the spans of that trace as a waterfall, children indented under parents.
+
+    python trace_viewer.py --limit 20
+    python trace_viewer.py 4bf92f35 --no-sql
+"""
+import argparse
+import json
+import os
+from collections import defaultdict
+
+# Same default as shared/tracing.py; runs without the gateway's dependencies, e.g. against a copied trace directory
+TRACE_DIR = os.getenv('TRACE_DIR', '/app/traces')
+
+def load_spans(directory, trace_prefix=None):
+    spans = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith('.jsonl'):
+            continue
+        with open(os.path.join(directory, filename)) as span_file:
+            for line in span_file:
+                if trace_prefix and trace_prefix not in line:
+                    continue  # Cheap filter before parsing
+                try:
+                    span = json.loads(line)
+                except ValueError:
+                    continue  # Partially written last line
+                if trace_prefix is None or span['trace_id'].startswith(trace_prefix):
+                    spans.append(span)
+    return spans
+
+def list_traces(spans, limit):
+    traces = defaultdict(list)
+    for span in spans:
+        traces[span['trace_id']].append(span)
+
+    rows = []
+    for trace_id, trace_spans in traces.items():
+        start = min(span['start'] for span in trace_spans)
+        end = max(span['start'] + span['duration_ms'] / 1000 for span in trace_spans)
+        root = min(trace_spans, key=lambda span: (span['parent_id'] is not None, span['start']))
+        fields = ','.join(root['attributes'].get('graphql.fields', []))
+        rows.append((start, trace_id, (end - start) * 1000, len(trace_spans), f"{root['service']} {root['name']} {fields}".strip()))
+
+    for start, trace_id, duration_ms, count, description in sorted(rows, reverse=True)[:limit]:
+        print(f"{trace_id}  {duration_ms:9.1f} ms  {count:4d} spans  {description}")
+
+def print_waterfall(spans, width=60, show_sql=True):
+    trace_ids = {span['trace_id'] for span in spans}
+    if len(trace_ids) != 1:
+        print(f"Found {len(trace_ids)} traces for that id, give more characters" if trace_ids else "Trace not found")
+        return False
+
+    if not show_sql:
+        spans = [span for span in spans if not span['name'].startswith('SQL')]
+    span_ids = {span['span_id'] for span in spans}
+    children = defaultdict(list)
+    for span in spans:
+        # Spans whose parent was not recorded (e.g. an untraced caller) are shown as roots
+        parent = span['parent_id'] if span['parent_id'] in span_ids else None
+        children[parent].append(span)
+
+    start = min(span['start'] for span in spans)
+    total_ms = max((span['start'] - start) * 1000 + span['duration_ms'] for span in spans) or 1
+    sql_count = sum(1 for span in spans if span['name'].startswith('SQL'))
+    print(f"trace {spans[0]['trace_id']}  {total_ms:.1f} ms  {len(spans)} spans ({sql_count} SQL)")
+
+    def render(span, depth):
+        offset_ms = (span['start'] - start) * 1000
+        bar_start = int(offset_ms / total_ms * width)
+        bar_length = max(1, int(round(span['duration_ms'] / total_ms * width)))
+        bar = ' ' * bar_start + '#' * min(bar_length, width - bar_start)
+        label = f"{'  ' * depth}{span['name']}"
+        error = f"  ERROR {span['error']}" if span.get('error') else ''
+        print(f"{span['service'][:16]:<16} {label[:48]:<48} |{bar:<{width}}| {offset_ms:8.1f} +{span['duration_ms']:.1f} ms{error}")
+        for child in sorted(children[span['span_id']], key=lambda child: child['start']):
+            render(child, depth + 1)
+
+    for root in sorted(children[None], key=lambda span: span['start']):
+        render(root, 0)
+    return True
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Show traces recorded by the gateway and services')
+    parser.add_argument('trace_id', nargs='?', help='Trace id or unique prefix; omit to list recent traces')
+    parser.add_argument('--dir', default=TRACE_DIR, help='Directory holding the <service>.jsonl span files')
+    parser.add_argument('--limit', type=int, default=20, help='Number of traces to list')
+    parser.add_argument('--width', type=int, default=60, help='Width of the waterfall bars')
+    parser.add_argument('--no-sql', action='store_true', help='Hide SQL statement spans')
+    args = parser.parse_args()
+
+    if args.trace_id:
+        found = print_waterfall(load_spans(args.dir, args.trace_id.lower()), args.width, not args.no_sql)
+        raise SystemExit(0 if found else 1)
+    list_traces(load_spans(args.dir), args.limit)
\ No newline at end of file
@@ -11,7 +11,13 @@ CREATE TABLE IF NOT EXISTS bookings (
     showtime_id INT NOT NULL,
     status ENUM('PENDING', 'PAID', 'CANCELLED') NOT NULL DEFAULT 'PENDING',
     total_price DECIMAL(10, 2),
-    booking_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP
+    booking_date DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    expires_at DATETIME NULL,  -- Seat hold deadline while PENDING
+    release_pending BOOLEAN NOT NULL DEFAULT FALSE,  -- Swept, seats not released in cinema service yet
+    INDEX idx_bookings_status_expires_at (status, expires_at),
+    INDEX ix_bookings_release_pending (release_pending),
+    INDEX ix_bookings_booking_date (booking_date),
+    INDEX ix_bookings_user_id (user_id)  -- userBookings pages by (user_id, id)
 );
 
 -- Create tickets table
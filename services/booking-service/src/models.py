@@ -1,18 +1,34 @@
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from datetime import datetime, timedelta
+import os
 
 db = SQLAlchemy()
 
+# How long a PENDING booking may hold its RESERVED seats before the sweeper releases them
+BOOKING_HOLD_MINUTES = int(os.getenv('BOOKING_HOLD_MINUTES', '15'))
+
+def default_hold_expiry():
+    return datetime.utcnow() + timedelta(minutes=BOOKING_HOLD_MINUTES)
+
 class Booking(db.Model):
     __tablename__ = 'bookings'
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)  # booking_id
-    user_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False, index=True)
     showtime_id = db.Column(db.Integer, nullable=False)  # Changed from movie_id + cinema_id to showtime_id
     status = db.Column(db.Enum('PENDING', 'PAID', 'CANCELLED', name='booking_status_enum'), 
                       nullable=False, default='PENDING')
     total_price = db.Column(db.Numeric(10, 2), nullable=True)
-    booking_date = db.Column(db.DateTime, default=datetime.utcnow)
+    booking_date = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+    expires_at = db.Column(db.DateTime, nullable=True, default=default_hold_expiry)  # Seat hold deadline while PENDING
+    # Cancelled by the hold sweeper but its seats not released in cinema service yet. Kept on the
+    # row so a restarted sweeper still retries the release
+    release_pending = db.Column(db.Boolean, nullable=False, default=False, index=True)
+
+    # Sweeper range-scans (status, expires_at) instead of loading every PENDING booking
+    __table_args__ = (
+        db.Index('idx_bookings_status_expires_at', 'status', 'expires_at'),
+    )
 
     # Relationship with tickets
     tickets = db.relationship('Ticket', backref='booking', lazy=True, cascade='all, delete-orphan')
@@ -25,6 +41,92 @@ class Booking(db.Model):
         db.session.delete(self)
         db.session.commit()
 
+    def is_expired(self):
+        """Check if the seat hold of a PENDING booking has run out"""
+        return self.status == 'PENDING' and self.expires_at is not None and self.expires_at <= datetime.utcnow()
+
+    @classmethod
+    def claim_expired_holds(cls, limit):
+        """Cancel up to `limit` PENDING bookings whose hold has expired and return their IDs.
+
+        Rows are locked with SKIP LOCKED so several booking-service workers can sweep
+        concurrently without cancelling the same booking twice. The bookings are flagged
+        release_pending until mark_released records that their seats were released.
+        """
+        rows = (db.session.query(cls.id)
+                .filter(cls.status == 'PENDING', cls.expires_at <= datetime.utcnow())
+                .order_by(cls.expires_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all())
+        booking_ids = [row.id for row in rows]
+        if booking_ids:
+            cls.query.filter(cls.id.in_(booking_ids)).update(
+                {'status': 'CANCELLED', 'release_pending': True}, synchronize_session=False
+            )
+        db.session.commit()
+        return booking_ids
+
+    @classmethod
+    def unreleased(cls, limit):
+        """IDs of up to `limit` swept bookings whose seats still have to be released"""
+        rows = (db.session.query(cls.id)
+                .filter(cls.release_pending.is_(True))
+                .order_by(cls.id)
+                .limit(limit)
+                .all())
+        db.session.commit()
+        return [row.id for row in rows]
+
+    @classmethod
+    def mark_released(cls, booking_ids):
+        cls.query.filter(cls.id.in_(booking_ids)).update({'release_pending': False}, synchronize_session=False)
+        db.session.commit()
+
+    @classmethod
+    def extend_hold(cls, booking_id, until):
+        """Keep a PENDING booking's seats held until at least `until`; False if it is no longer PENDING.
+
+        The row is locked first, so a sweeper that already claimed the booking wins and
+        one that hasn't yet sees the new deadline.
+        """
+        booking = cls.query.filter(cls.id == booking_id, cls.status == 'PENDING').with_for_update().first()
+        if booking is None:
+            db.session.rollback()
+            return False
+        if booking.expires_at is not None and booking.expires_at < until:
+            booking.expires_at = until
+        db.session.commit()
+        return True
+
+    @classmethod
+    def lock_pending(cls, booking_ids):
+        """Lock the PENDING bookings among `booking_ids` until the current transaction ends and return their IDs"""
+        rows = (db.session.query(cls.id)
+                .filter(cls.id.in_(booking_ids), cls.status == 'PENDING')
+                .with_for_update()
+                .all())
+        return [row.id for row in rows]
+
+    @classmethod
+    def paid_among(cls, booking_ids):
+        """IDs of the bookings among `booking_ids` that are already PAID"""
+        if not booking_ids:
+            return []
+        rows = db.session.query(cls.id).filter(cls.id.in_(booking_ids), cls.status == 'PAID').all()
+        return [row.id for row in rows]
+
+    @classmethod
+    def mark_paid(cls, booking_ids, seats):
+        """Set bookings to PAID and insert one ticket per (booking_id, seat_number) in one transaction"""
+        cls.query.filter(cls.id.in_(booking_ids)).update({'status': 'PAID'}, synchronize_session=False)
+        if seats:
+            db.session.bulk_insert_mappings(Ticket, [
+                {'booking_id': booking_id, 'seat_number': seat_number}
+                for booking_id, seat_number in seats
+            ])
+        db.session.commit()
+
     def __repr__(self):
         return f"<Booking(id={self.id}, user_id={self.user_id}, showtime_id={self.showtime_id}, status='{self.status}')>"
 
@@ -1,10 +1,15 @@
 from graphene import ObjectType, String, Int, Float, List, Field, Mutation, Schema, Boolean
 from models import Booking, Ticket, db
+from shared.resolvers import keyset_page, selected_fields
+from sweeper import sweep_expired_holds, HOLD_SWEEP_BATCH_SIZE
+from shared.metrics import post_graphql
+from sqlalchemy.orm import selectinload
 from datetime import datetime
-import traceback
-import requests
+import logging
 import os
 
+logger = logging.getLogger(__name__)
+
 # Service URLs
 CINEMA_SERVICE_URL = os.getenv('CINEMA_SERVICE_URL', 'http://cinema-service:3008')
 
@@ -26,6 +31,7 @@ class BookingType(ObjectType):
     status = String()
     totalPrice = Float()  # Changed to camelCase to match gateway expectations
     bookingDate = String()  # Changed to camelCase to match gateway expectations
+    expiresAt = String()  # Seat hold deadline while PENDING
     tickets = List(TicketType)
 
     def resolve_userId(self, info):
@@ -40,6 +46,9 @@ class BookingType(ObjectType):
     def resolve_bookingDate(self, info):
         return self.booking_date.isoformat() if self.booking_date else None  # Map from snake_case model to camelCase response
 
+    def resolve_expiresAt(self, info):
+        return self.expires_at.isoformat() if self.expires_at else None
+
     def resolve_tickets(self, info):
         return self.tickets
 
@@ -88,12 +97,7 @@ class CreateBooking(Mutation):
                     }
                 }
                 
-                response = requests.post(
-                    f"{CINEMA_SERVICE_URL}/graphql",
-                    json=seat_update_query,
-                    timeout=30,
-                    headers={'Content-Type': 'application/json'}
-                )
+                response = post_graphql('cinema', f"{CINEMA_SERVICE_URL}/graphql", seat_update_query)
                 
                 if not response.ok:
                     failed_seats.append(seat_number)
@@ -118,7 +122,7 @@ class CreateBooking(Mutation):
                 message="Booking created successfully and seats reserved"
             )
         except Exception as e:
-            traceback.print_exc()
+            logger.exception("Error in CreateBooking.mutate")
             db.session.rollback()
             return CreateBookingResponse(
                 booking=None,
@@ -195,20 +199,15 @@ class UpdateBooking(Mutation):
                         }
                     }
                     
-                    response = requests.post(
-                        f"{CINEMA_SERVICE_URL}/graphql",
-                        json=seat_update_query,
-                        timeout=30,
-                        headers={'Content-Type': 'application/json'}
-                    )
+                    response = post_graphql('cinema', f"{CINEMA_SERVICE_URL}/graphql", seat_update_query)
                     
                     if not response.ok:
-                        print(f"Failed to update seat {seat_number} status")
+                        logger.warning("Failed to update seat %s status", seat_number)
                         continue
                         
                     response_data = response.json()
                     if response_data.get('errors'):
-                        print(f"Error updating seat {seat_number}: {response_data['errors']}")
+                        logger.warning("Error updating seat %s: %s", seat_number, response_data['errors'])
 
             # If status changed from PENDING to PAID, create tickets
             if old_status == 'PENDING' and status == 'PAID':
@@ -227,7 +226,7 @@ class UpdateBooking(Mutation):
                 message="Booking updated successfully"
             )
         except Exception as e:
-            traceback.print_exc()
+            logger.exception("Error in UpdateBooking.mutate")
             db.session.rollback()
             return UpdateBookingResponse(
                 booking=None,
@@ -280,19 +279,14 @@ class DeleteBooking(Mutation):
                     }
                 }
                 
-                requests.post(
-                    f"{CINEMA_SERVICE_URL}/graphql",
-                    json=seat_update_query,
-                    timeout=30,
-                    headers={'Content-Type': 'application/json'}
-                )
+                post_graphql('cinema', f"{CINEMA_SERVICE_URL}/graphql", seat_update_query)
             
             return DeleteBookingResponse(
                 success=True,
                 message="Booking cancelled successfully"
             )
         except Exception as e:
-            traceback.print_exc()
+            logger.exception("Error in DeleteBooking.mutate")
             db.session.rollback()
             return DeleteBookingResponse(
                 success=False,
@@ -356,12 +350,7 @@ class CreateTickets(Mutation):
                     }
                 }
                 
-                requests.post(
-                    f"{CINEMA_SERVICE_URL}/graphql",
-                    json=seat_update_query,
-                    timeout=30,
-                    headers={'Content-Type': 'application/json'}
-                )
+                post_graphql('cinema', f"{CINEMA_SERVICE_URL}/graphql", seat_update_query)
 
             return CreateTicketsResponse(
                 tickets=tickets,
@@ -369,7 +358,7 @@ class CreateTickets(Mutation):
                 message="Tickets created successfully"
             )
         except Exception as e:
-            traceback.print_exc()
+            logger.exception("Error in CreateTickets.mutate")
             db.session.rollback()
             return CreateTicketsResponse(
                 tickets=None,
@@ -377,40 +366,206 @@ class CreateTickets(Mutation):
                 message=f"Error creating tickets: {str(e)}"
             )
 
+def book_reserved_seats(booking_ids):
+    """Confirm RESERVED seats of the given bookings as BOOKED in cinema service with one call.
+
+    Returns a list of (booking_id, seat_number) for the seats that were booked.
+    """
+    book_seats_query = {
+        'query': '''
+        mutation($bookingIds: [Int]!) {
+            bookSeats(bookingIds: $bookingIds) {
+                success
+                message
+                seats {
+                    bookingId
+                    seatNumber
+                }
+            }
+        }
+        ''',
+        'variables': {'bookingIds': booking_ids}
+    }
+
+    response = post_graphql('cinema', f"{CINEMA_SERVICE_URL}/graphql", book_seats_query)
+    if not response.ok:
+        raise Exception(f"Cinema service returned HTTP {response.status_code}")
+
+    response_data = response.json()
+    book_result = (response_data.get('data') or {}).get('bookSeats') or {}
+    if response_data.get('errors') or not book_result.get('success'):
+        raise Exception(f"Failed to book seats: {response_data.get('errors') or book_result.get('message')}")
+
+    return [(seat['bookingId'], seat['seatNumber']) for seat in book_result.get('seats') or []]
+
+class MarkBookingsPaidResponse(ObjectType):
+    success = Boolean()
+    message = String()
+    paidBookingIds = List(Int)
+    alreadyPaidBookingIds = List(Int)
+    ticketCount = Int()
+
+class MarkBookingsPaid(Mutation):
+    """Move PENDING bookings to PAID in bulk: one seat call to cinema service, one UPDATE and one ticket insert.
+
+    Bookings that were PAID before the call come back in alreadyPaidBookingIds; any other
+    requested booking (cancelled or missing) is in neither list.
+    """
+    class Arguments:
+        bookingIds = List(Int, required=True)
+
+    Output = MarkBookingsPaidResponse
+
+    def mutate(self, info, bookingIds):
+        try:
+            # Bookings stay locked until commit, so the hold sweeper skips them meanwhile
+            booking_ids = Booking.lock_pending(bookingIds)
+            already_paid = Booking.paid_among([booking_id for booking_id in bookingIds if booking_id not in booking_ids])
+            if not booking_ids:
+                db.session.rollback()
+                return MarkBookingsPaidResponse(
+                    success=True,
+                    message="No pending bookings to mark as paid",
+                    paidBookingIds=[],
+                    alreadyPaidBookingIds=already_paid,
+                    ticketCount=0
+                )
+
+            seats = book_reserved_seats(booking_ids)
+            Booking.mark_paid(booking_ids, seats)
+
+            return MarkBookingsPaidResponse(
+                success=True,
+                message=f"Marked {len(booking_ids)} bookings as PAID and created {len(seats)} tickets",
+                paidBookingIds=booking_ids,
+                alreadyPaidBookingIds=already_paid,
+                ticketCount=len(seats)
+            )
+        except Exception as e:
+            logger.exception("Error in MarkBookingsPaid.mutate")
+            db.session.rollback()
+            return MarkBookingsPaidResponse(
+                success=False,
+                message=f"Error marking bookings as paid: {str(e)}",
+                paidBookingIds=[],
+                alreadyPaidBookingIds=[],
+                ticketCount=0
+            )
+
+class ExtendHoldResponse(ObjectType):
+    booking = Field(BookingType)
+    success = Boolean()
+    message = String()
+
+class ExtendHold(Mutation):
+    """Hold a PENDING booking's seats until `until`, e.g. while its payment waits for approval"""
+    class Arguments:
+        bookingId = Int(required=True)
+        until = String(required=True)
+
+    Output = ExtendHoldResponse
+
+    def mutate(self, info, bookingId, until):
+        try:
+            if not Booking.extend_hold(bookingId, parse_date_filter(until)):
+                return ExtendHoldResponse(
+                    booking=None,
+                    success=False,
+                    message=f"Booking {bookingId} is no longer PENDING"
+                )
+            return ExtendHoldResponse(
+                booking=Booking.query.get(bookingId),
+                success=True,
+                message="Booking hold extended"
+            )
+        except Exception as e:
+            logger.exception("Error in ExtendHold.mutate")
+            db.session.rollback()
+            return ExtendHoldResponse(
+                booking=None,
+                success=False,
+                message=f"Error extending booking hold: {str(e)}"
+            )
+
+class SweepExpiredHoldsResponse(ObjectType):
+    success = Boolean()
+    message = String()
+    cancelledCount = Int()
+
+class SweepExpiredHolds(Mutation):
+    """Run the hold-expiry sweep now instead of waiting for the next interval"""
+    class Arguments:
+        batchSize = Int()
+
+    Output = SweepExpiredHoldsResponse
+
+    def mutate(self, info, batchSize=None):
+        try:
+            cancelled_count = sweep_expired_holds(batchSize or HOLD_SWEEP_BATCH_SIZE)
+            return SweepExpiredHoldsResponse(
+                success=True,
+                message=f"Cancelled {cancelled_count} expired bookings",
+                cancelledCount=cancelled_count
+            )
+        except Exception as e:
+            logger.exception("Error in SweepExpiredHolds.mutate")
+            db.session.rollback()
+            return SweepExpiredHoldsResponse(
+                success=False,
+                message=f"Error sweeping expired holds: {str(e)}",
+                cancelledCount=0
+            )
+
+def parse_date_filter(value):
+    """Parse an ISO date/datetime filter argument (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+def with_tickets(query, info):
+    """Load the bookings' tickets in one extra statement instead of one per booking"""
+    if 'tickets' in selected_fields(info):
+        return query.options(selectinload(Booking.tickets))
+    return query
+
 class Query(ObjectType):
-    bookings = List(BookingType)
+    bookings = List(BookingType, first=Int(), after=Int(), status=String(), fromDate=String(), toDate=String())
     booking = Field(BookingType, id=Int(required=True))
-    userBookings = List(BookingType, userId=Int(required=True))  # Changed to camelCase
+    userBookings = List(BookingType, userId=Int(required=True), first=Int(), after=Int())  # Changed to camelCase
     tickets = List(TicketType, bookingId=Int(required=True))  # Changed to camelCase
 
-    def resolve_bookings(self, info):
+    def resolve_bookings(self, info, first=None, after=None, status=None, fromDate=None, toDate=None):
         try:
-            return Booking.query.all()
+            query = Booking.query
+            if status:
+                query = query.filter(Booking.status == status)
+            if fromDate:
+                query = query.filter(Booking.booking_date >= parse_date_filter(fromDate))
+            if toDate:
+                query = query.filter(Booking.booking_date < parse_date_filter(toDate))
+            return keyset_page(with_tickets(query, info), Booking.id, first, after).all()
         except Exception as e:
-            print(f"Error in resolve_bookings: {str(e)}")
-            traceback.print_exc()
-            return []
+            logger.exception("Error in resolve_bookings: %s", e)
+            raise Exception(f"Error fetching bookings: {str(e)}")  # An empty page would read as the end of an export
 
     def resolve_booking(self, info, id):
         try:
             return Booking.query.get(id)
         except Exception as e:
-            print(f"Error in resolve_booking: {str(e)}")
+            logger.error("Error in resolve_booking: %s", e)
             return None
         
-    def resolve_userBookings(self, info, userId):  # Changed to camelCase
+    def resolve_userBookings(self, info, userId, first=None, after=None):  # Changed to camelCase
         try:
-            return Booking.query.filter(Booking.user_id == userId).all()
+            query = with_tickets(Booking.query.filter(Booking.user_id == userId), info)
+            return keyset_page(query, Booking.id, first, after).all()
         except Exception as e:
-            print(f"Error in resolve_userBookings: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error in resolve_userBookings: %s", e)
             return []
 
     def resolve_tickets(self, info, bookingId):  # Changed to camelCase
         try:
             return Ticket.query.filter(Ticket.booking_id == bookingId).all()
         except Exception as e:
-            print(f"Error in resolve_tickets: {str(e)}")
+            logger.error("Error in resolve_tickets: %s", e)
             return []
 
 class Mutation(ObjectType):
@@ -418,6 +573,9 @@ class Mutation(ObjectType):
     updateBooking = UpdateBooking.Field()  # Changed to camelCase
     deleteBooking = DeleteBooking.Field()  # Changed to camelCase
     createTickets = CreateTickets.Field()  # Changed to camelCase
+    markBookingsPaid = MarkBookingsPaid.Field()
+    extendHold = ExtendHold.Field()
+    sweepExpiredHolds = SweepExpiredHolds.Field()
 
 
 schema = Schema(query=Query, mutation=Mutation)
@@ -0,0 +1,89 @@
+from models import Booking
+from shared.metrics import post_graphql
+import threading
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Service URLs
+CINEMA_SERVICE_URL = os.getenv('CINEMA_SERVICE_URL', 'http://cinema-service:3008')
+
+# Sweeper settings
+HOLD_SWEEP_INTERVAL_SECONDS = int(os.getenv('HOLD_SWEEP_INTERVAL_SECONDS', '30'))
+HOLD_SWEEP_BATCH_SIZE = int(os.getenv('HOLD_SWEEP_BATCH_SIZE', '500'))
+
+def release_seats(booking_ids):
+    """Release RESERVED seats of the given bookings in cinema service with one call"""
+    seat_release_query = {
+        'query': '''
+        mutation($bookingIds: [Int]!) {
+            releaseSeats(bookingIds: $bookingIds) {
+                success
+                message
+                releasedCount
+            }
+        }
+        ''',
+        'variables': {'bookingIds': list(booking_ids)}
+    }
+
+    try:
+        response = post_graphql('cinema', f"{CINEMA_SERVICE_URL}/graphql", seat_release_query)
+        if not response.ok:
+            logger.warning("Failed to release seats for bookings %s: HTTP %s", list(booking_ids), response.status_code)
+            return False
+
+        response_data = response.json()
+        release_result = (response_data.get('data') or {}).get('releaseSeats') or {}
+        if response_data.get('errors') or not release_result.get('success'):
+            logger.warning("Failed to release seats for bookings %s: %s", list(booking_ids), response_data.get('errors') or release_result.get('message'))
+            return False
+
+        return True
+    except Exception as e:
+        logger.error("Error releasing seats for bookings %s: %s", list(booking_ids), e)
+        return False
+
+def sweep_expired_holds(batch_size=HOLD_SWEEP_BATCH_SIZE):
+    """Cancel expired PENDING bookings batch by batch and release their seats.
+
+    Returns the number of bookings cancelled in this sweep.
+    """
+    # Bookings cancelled by an earlier sweep (possibly before a restart) whose release failed
+    retry_ids = Booking.unreleased(batch_size)
+    if retry_ids and release_seats(retry_ids):
+        Booking.mark_released(retry_ids)
+
+    cancelled_count = 0
+    while True:
+        booking_ids = Booking.claim_expired_holds(batch_size)
+        if not booking_ids:
+            break
+
+        cancelled_count += len(booking_ids)
+        if release_seats(booking_ids):
+            Booking.mark_released(booking_ids)
+
+        if len(booking_ids) < batch_size:
+            break
+
+    if cancelled_count:
+        logger.info("Hold sweeper cancelled %s expired bookings", cancelled_count)
+    return cancelled_count
+
+def start_hold_sweeper(app, interval=HOLD_SWEEP_INTERVAL_SECONDS):
+    """Run sweep_expired_holds periodically in a daemon thread"""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    sweep_expired_holds()
+            except Exception as e:
+                logger.exception("Error in hold sweeper: %s", e)
+
+    thread = threading.Thread(target=run, name='hold-sweeper', daemon=True)
+    thread.start()
+    return thread
@@ -5,6 +5,7 @@ DROP TABLE IF EXISTS seat_statuses;
 DROP TABLE IF EXISTS showtimes;
 DROP TABLE IF EXISTS auditoriums;
 DROP TABLE IF EXISTS cinemas;
+DROP TABLE IF EXISTS cache_versions;
 
 -- Create cinemas table
 CREATE TABLE IF NOT EXISTS cinemas (
@@ -30,7 +31,8 @@ CREATE TABLE IF NOT EXISTS showtimes (
     auditorium_id INT NOT NULL,
     start_time VARCHAR(50) NOT NULL,  -- Changed from DATETIME to VARCHAR
     price DECIMAL(10, 2) NOT NULL,
-    FOREIGN KEY (auditorium_id) REFERENCES auditoriums(id) ON DELETE CASCADE
+    FOREIGN KEY (auditorium_id) REFERENCES auditoriums(id) ON DELETE CASCADE,
+    INDEX ix_showtimes_movie_id (movie_id)  -- showtimes_by_movie pages by (movie_id, id)
 );
 
 -- Create seat_statuses table
@@ -42,7 +44,14 @@ CREATE TABLE IF NOT EXISTS seat_statuses (
     booking_id INT,
     updated_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     FOREIGN KEY (showtime_id) REFERENCES showtimes(id) ON DELETE CASCADE,
-    UNIQUE KEY unique_seat_showtime (showtime_id, seat_number)
+    UNIQUE KEY unique_seat_showtime (showtime_id, seat_number),
+    INDEX idx_seat_statuses_booking_id (booking_id)
+);
+
+-- Write counters for the in-process entity caches
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
 );
 
 -- Insert sample data
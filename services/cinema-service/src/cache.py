@@ -0,0 +1,12 @@
+from collections import namedtuple
+from shared.cache import EntityCache
+
+# Detached, read-only copies of rows. Field names match the models so the
+# GraphQL types resolve them the same way.
+CinemaSnapshot = namedtuple('CinemaSnapshot', ['id', 'name', 'city', 'capacity'])
+AuditoriumSnapshot = namedtuple('AuditoriumSnapshot', ['id', 'cinema_id', 'name', 'seat_layout'])
+
+cinema_cache = EntityCache('cinemas')
+auditorium_cache = EntityCache('auditoriums')
+
+entity_caches = {cache.name: cache for cache in (cinema_cache, auditorium_cache)}
\ No newline at end of file
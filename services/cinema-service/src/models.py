@@ -1,9 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
+from cache import cinema_cache, auditorium_cache, CinemaSnapshot, AuditoriumSnapshot
+from shared.cache import cache_version_model, snapshot
 from datetime import datetime
 import json
 
 db = SQLAlchemy()
 
+CacheVersion = cache_version_model(db)
+
 class Cinema(db.Model):
     __tablename__ = 'cinemas'
 
@@ -17,11 +21,24 @@ class Cinema(db.Model):
 
     def save(self):
         db.session.add(self)
+        CacheVersion.bump(cinema_cache.name)
         db.session.commit()
+        cinema_cache.invalidate(self.id)
 
     def delete(self):
+        cinema_id = self.id
+        auditorium_ids = [auditorium.id for auditorium in self.auditoriums]
         db.session.delete(self)
+        CacheVersion.bump(cinema_cache.name, auditorium_cache.name)
         db.session.commit()
+        cinema_cache.invalidate(cinema_id)
+        for auditorium_id in auditorium_ids:
+            auditorium_cache.invalidate(auditorium_id)
+
+    @classmethod
+    def get_cached(cls, cinema_id):
+        """Read-only snapshot of a cinema, from memory when possible"""
+        return cinema_cache.get(cinema_id, lambda key: snapshot(CinemaSnapshot, cls.query.get(key)))
 
     def __repr__(self):
         return f"<Cinema(id={self.id}, name='{self.name}', city='{self.city}', capacity={self.capacity})>"
@@ -40,11 +57,21 @@ class Auditorium(db.Model):
 
     def save(self):
         db.session.add(self)
+        CacheVersion.bump(auditorium_cache.name)
         db.session.commit()
+        auditorium_cache.invalidate(self.id)
 
     def delete(self):
+        auditorium_id = self.id
         db.session.delete(self)
+        CacheVersion.bump(auditorium_cache.name)
         db.session.commit()
+        auditorium_cache.invalidate(auditorium_id)
+
+    @classmethod
+    def get_cached(cls, auditorium_id):
+        """Read-only snapshot of an auditorium, from memory when possible"""
+        return auditorium_cache.get(auditorium_id, lambda key: snapshot(AuditoriumSnapshot, cls.query.get(key)))
 
     def __repr__(self):
         return f"<Auditorium(id={self.id}, cinema_id={self.cinema_id}, name='{self.name}')>"
@@ -54,7 +81,7 @@ class Showtime(db.Model):
     __tablename__ = 'showtimes'
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
-    movie_id = db.Column(db.Integer, nullable=False)  # Reference to movie service
+    movie_id = db.Column(db.Integer, nullable=False, index=True)  # Reference to movie service
     auditorium_id = db.Column(db.Integer, db.ForeignKey('auditoriums.id'), nullable=False)
     start_time = db.Column(db.String(50), nullable=False)  # Changed from DateTime to String
     price = db.Column(db.Numeric(10, 2), nullable=False)
@@ -82,7 +109,7 @@ class SeatStatus(db.Model):
     seat_number = db.Column(db.String(10), nullable=False)
     status = db.Column(db.Enum('AVAILABLE', 'BOOKED', 'RESERVED', name='seat_status_enum'), 
                       nullable=False, default='AVAILABLE')
-    booking_id = db.Column(db.Integer, nullable=True)  # Reference to booking service
+    booking_id = db.Column(db.Integer, nullable=True, index=True)  # Reference to booking service
     updated_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     def save(self):
@@ -93,5 +120,36 @@ class SeatStatus(db.Model):
         db.session.delete(self)
         db.session.commit()
 
+    @classmethod
+    def release_reserved(cls, booking_ids):
+        """Set RESERVED seats of the given bookings back to AVAILABLE in one statement"""
+        released_count = cls.query.filter(
+            cls.booking_id.in_(booking_ids),
+            cls.status == 'RESERVED'
+        ).update({'status': 'AVAILABLE', 'booking_id': None}, synchronize_session=False)
+        db.session.commit()
+        return released_count
+
+    @classmethod
+    def book_reserved(cls, booking_ids):
+        """Turn RESERVED seats of the given bookings into BOOKED and return all of their booked seats.
+
+        Seats already BOOKED for these bookings are included, so a caller retrying after
+        a failure on its side (bookings still PENDING) gets the same seats again.
+        """
+        seats = (cls.query
+                 .filter(cls.booking_id.in_(booking_ids), cls.status.in_(['RESERVED', 'BOOKED']))
+                 .with_for_update()
+                 .all())
+        reserved_ids = [seat.id for seat in seats if seat.status == 'RESERVED']
+        if reserved_ids:
+            cls.query.filter(cls.id.in_(reserved_ids)).update(
+                {'status': 'BOOKED'}, synchronize_session='evaluate'
+            )
+        for seat in seats:
+            db.session.expunge(seat)  # Keep loaded values readable without a reload per seat after commit
+        db.session.commit()
+        return seats
+
     def __repr__(self):
         return f"<SeatStatus(id={self.id}, showtime_id={self.showtime_id}, seat_number='{self.seat_number}', status='{self.status}')>"
\ No newline at end of file
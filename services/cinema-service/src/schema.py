@@ -1,9 +1,14 @@
 from graphene import ObjectType, String, Int, List, Field, Mutation, Schema, Boolean, Float, JSONString
 from models import Cinema, Auditorium, Showtime, SeatStatus, db
+from shared.resolvers import keyset_page
+from shared.cache import CacheStatsType
+from cache import entity_caches
 from datetime import datetime
-import traceback
+import logging
 import json
 
+logger = logging.getLogger(__name__)
+
 # GraphQL Types
 class CinemaType(ObjectType):
     id = Int()
@@ -13,7 +18,7 @@ class CinemaType(ObjectType):
     auditoriums = List(lambda: AuditoriumType)
 
     def resolve_auditoriums(self, info):
-        return self.auditoriums
+        return Auditorium.query.filter_by(cinema_id=self.id).all()
 
 class AuditoriumType(ObjectType):
     id = Int()
@@ -24,10 +29,10 @@ class AuditoriumType(ObjectType):
     showtimes = List(lambda: ShowtimeType)
 
     def resolve_cinema(self, info):
-        return self.cinema
+        return Cinema.get_cached(self.cinema_id)
 
     def resolve_showtimes(self, info):
-        return self.showtimes
+        return Showtime.query.filter_by(auditorium_id=self.id).all()
 
 class ShowtimeType(ObjectType):
     id = Int()
@@ -51,7 +56,7 @@ class ShowtimeType(ObjectType):
         return getattr(self, 'start_time', None)
 
     def resolve_auditorium(self, info):
-        return self.auditorium
+        return Auditorium.get_cached(self.auditorium_id)
 
     def resolve_seat_statuses(self, info):
         return self.seat_statuses
@@ -133,7 +138,7 @@ class CreateCinema(Mutation):
                 message="Cinema created successfully"
             )
         except Exception as e:
-            traceback.print_exc()
+            logger.exception("Error in CreateCinema.mutate")
             db.session.rollback()
             return CreateCinemaResponse(
                 cinema=None, 
@@ -176,7 +181,7 @@ class UpdateCinema(Mutation):
             )
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in UpdateCinema.mutate")
             return CreateCinemaResponse(
                 cinema=None,
                 success=False,
@@ -199,7 +204,7 @@ class DeleteCinema(Mutation):
             return DeleteResponse(success=True, message="Cinema deleted successfully")
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in DeleteCinema.mutate")
             return DeleteResponse(success=False, message=f"Error deleting cinema: {str(e)}")
 
 # Auditorium Mutations
@@ -234,7 +239,7 @@ class CreateAuditorium(Mutation):
                 message="Auditorium created successfully"
             )
         except Exception as e:
-            traceback.print_exc()
+            logger.exception("Error in CreateAuditorium.mutate")
             db.session.rollback()
             return CreateAuditoriumResponse(
                 auditorium=None, 
@@ -284,7 +289,7 @@ class UpdateAuditorium(Mutation):
             )
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in UpdateAuditorium.mutate")
             return CreateAuditoriumResponse(
                 auditorium=None,
                 success=False,
@@ -307,7 +312,7 @@ class DeleteAuditorium(Mutation):
             return DeleteResponse(success=True, message="Auditorium deleted successfully")
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in DeleteAuditorium.mutate")
             return DeleteResponse(success=False, message=f"Error deleting auditorium: {str(e)}")
 
 # Showtime Mutations
@@ -366,7 +371,7 @@ class CreateShowtime(Mutation):
                 message="Showtime created successfully"
             )
         except Exception as e:
-            traceback.print_exc()
+            logger.exception("Error in CreateShowtime.mutate")
             db.session.rollback()
             return CreateShowtimeResponse(
                 showtime=None, 
@@ -428,7 +433,7 @@ class UpdateShowtime(Mutation):
             )
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in UpdateShowtime.mutate")
             return CreateShowtimeResponse(
                 showtime=None,
                 success=False,
@@ -451,7 +456,7 @@ class DeleteShowtime(Mutation):
             return DeleteResponse(success=True, message="Showtime deleted successfully")
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in DeleteShowtime.mutate")
             return DeleteResponse(success=False, message=f"Error deleting showtime: {str(e)}")
 
 # Seat Status Mutations
@@ -506,104 +511,180 @@ class UpdateSeatStatus(Mutation):
             )
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in UpdateSeatStatus.mutate")
             return UpdateSeatStatusResponse(
                 seat_status=None,
                 success=False,
                 message=f"Error updating seat status: {str(e)}"
             )
 
+class ReleaseSeatsResponse(ObjectType):
+    success = Boolean()
+    message = String()
+    released_count = Int()
+
+class ReleaseSeats(Mutation):
+    """Release all RESERVED seats held by the given bookings in a single UPDATE"""
+    class Arguments:
+        booking_ids = List(Int, required=True)
+
+    Output = ReleaseSeatsResponse
+
+    def mutate(self, info, booking_ids):
+        try:
+            if not booking_ids:
+                return ReleaseSeatsResponse(success=True, message="No bookings given", released_count=0)
+
+            released_count = SeatStatus.release_reserved(booking_ids)
+            return ReleaseSeatsResponse(
+                success=True,
+                message=f"Released {released_count} seats for {len(booking_ids)} bookings",
+                released_count=released_count
+            )
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Error in ReleaseSeats.mutate")
+            return ReleaseSeatsResponse(
+                success=False,
+                message=f"Error releasing seats: {str(e)}",
+                released_count=0
+            )
+
+class BookSeatsResponse(ObjectType):
+    success = Boolean()
+    message = String()
+    seats = List(SeatStatusType)
+
+class BookSeats(Mutation):
+    """Confirm all RESERVED seats held by the given bookings as BOOKED in a single UPDATE.
+
+    Idempotent: seats the bookings already have BOOKED are returned as well.
+    """
+    class Arguments:
+        booking_ids = List(Int, required=True)
+
+    Output = BookSeatsResponse
+
+    def mutate(self, info, booking_ids):
+        try:
+            if not booking_ids:
+                return BookSeatsResponse(success=True, message="No bookings given", seats=[])
+
+            seats = SeatStatus.book_reserved(booking_ids)
+            return BookSeatsResponse(
+                success=True,
+                message=f"Booked {len(seats)} seats for {len(booking_ids)} bookings",
+                seats=seats
+            )
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Error in BookSeats.mutate")
+            return BookSeatsResponse(
+                success=False,
+                message=f"Error booking seats: {str(e)}",
+                seats=[]
+            )
+
 # Query Class
 class Query(ObjectType):
     # Cinema queries
-    cinemas = List(CinemaType)
+    cinemas = List(CinemaType, first=Int(), after=Int())
     cinema = Field(CinemaType, id=Int(required=True))
     
     # Auditorium queries
-    auditoriums = List(AuditoriumType)
+    auditoriums = List(AuditoriumType, first=Int(), after=Int())
     auditorium = Field(AuditoriumType, id=Int(required=True))
-    auditoriums_by_cinema = List(AuditoriumType, cinema_id=Int(required=True))
+    auditoriums_by_cinema = List(AuditoriumType, cinema_id=Int(required=True), first=Int(), after=Int())
     
     # Showtime queries
-    showtimes = List(ShowtimeType)
+    showtimes = List(ShowtimeType, movie_id=Int(), auditorium_id=Int(), first=Int(), after=Int())
     showtime = Field(ShowtimeType, id=Int(required=True))
-    showtimes_by_auditorium = List(ShowtimeType, auditorium_id=Int(required=True))
-    showtimes_by_movie = List(ShowtimeType, movie_id=Int(required=True))  # Changed from String to Int
+    showtimes_by_auditorium = List(ShowtimeType, auditorium_id=Int(required=True), first=Int(), after=Int())
+    showtimes_by_movie = List(ShowtimeType, movie_id=Int(required=True), first=Int(), after=Int())  # Changed from String to Int
     
     # Seat status queries
     seat_statuses = List(SeatStatusType, showtime_id=Int(required=True))
 
-    def resolve_cinemas(self, info):
+    entityCacheStats = List(CacheStatsType)
+
+    def resolve_cinemas(self, info, first=None, after=None):
         try:
-            return Cinema.query.all()
+            return keyset_page(Cinema.query, Cinema.id, first, after).all()
         except Exception as e:
-            print(f"Error in resolve_cinemas: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error in resolve_cinemas: %s", e)
             return []
 
     def resolve_cinema(self, info, id):
         try:
-            return Cinema.query.get(id)
+            return Cinema.get_cached(id)
         except Exception as e:
-            print(f"Error in resolve_cinema: {str(e)}")
+            logger.error("Error in resolve_cinema: %s", e)
             return None
 
-    def resolve_auditoriums(self, info):
+    def resolve_auditoriums(self, info, first=None, after=None):
         try:
-            return Auditorium.query.all()
+            return keyset_page(Auditorium.query, Auditorium.id, first, after).all()
         except Exception as e:
-            print(f"Error in resolve_auditoriums: {str(e)}")
+            logger.error("Error in resolve_auditoriums: %s", e)
             return []
 
     def resolve_auditorium(self, info, id):
         try:
-            return Auditorium.query.get(id)
+            return Auditorium.get_cached(id)
         except Exception as e:
-            print(f"Error in resolve_auditorium: {str(e)}")
+            logger.error("Error in resolve_auditorium: %s", e)
             return None
 
-    def resolve_auditoriums_by_cinema(self, info, cinema_id):
+    def resolve_auditoriums_by_cinema(self, info, cinema_id, first=None, after=None):
         try:
-            return Auditorium.query.filter_by(cinema_id=cinema_id).all()
+            return keyset_page(Auditorium.query.filter_by(cinema_id=cinema_id), Auditorium.id, first, after).all()
         except Exception as e:
-            print(f"Error in resolve_auditoriums_by_cinema: {str(e)}")
+            logger.error("Error in resolve_auditoriums_by_cinema: %s", e)
             return []
 
-    def resolve_showtimes(self, info):
+    def resolve_showtimes(self, info, movie_id=None, auditorium_id=None, first=None, after=None):
         try:
-            return Showtime.query.all()
+            query = Showtime.query
+            if movie_id is not None:
+                query = query.filter_by(movie_id=movie_id)
+            if auditorium_id is not None:
+                query = query.filter_by(auditorium_id=auditorium_id)
+            return keyset_page(query, Showtime.id, first, after).all()
         except Exception as e:
-            print(f"Error in resolve_showtimes: {str(e)}")
+            logger.error("Error in resolve_showtimes: %s", e)
             return []
 
     def resolve_showtime(self, info, id):
         try:
             return Showtime.query.get(id)
         except Exception as e:
-            print(f"Error in resolve_showtime: {str(e)}")
+            logger.error("Error in resolve_showtime: %s", e)
             return None
 
-    def resolve_showtimes_by_auditorium(self, info, auditorium_id):
+    def resolve_showtimes_by_auditorium(self, info, auditorium_id, first=None, after=None):
         try:
-            return Showtime.query.filter_by(auditorium_id=auditorium_id).all()
+            return keyset_page(Showtime.query.filter_by(auditorium_id=auditorium_id), Showtime.id, first, after).all()
         except Exception as e:
-            print(f"Error in resolve_showtimes_by_auditorium: {str(e)}")
+            logger.error("Error in resolve_showtimes_by_auditorium: %s", e)
             return []
 
-    def resolve_showtimes_by_movie(self, info, movie_id):
+    def resolve_showtimes_by_movie(self, info, movie_id, first=None, after=None):
         try:
-            return Showtime.query.filter_by(movie_id=movie_id).all()
+            return keyset_page(Showtime.query.filter_by(movie_id=movie_id), Showtime.id, first, after).all()
         except Exception as e:
-            print(f"Error in resolve_showtimes_by_movie: {str(e)}")
+            logger.error("Error in resolve_showtimes_by_movie: %s", e)
             return []
 
     def resolve_seat_statuses(self, info, showtime_id):
         try:
             return SeatStatus.query.filter_by(showtime_id=showtime_id).all()
         except Exception as e:
-            print(f"Error in resolve_seat_statuses: {str(e)}")
+            logger.error("Error in resolve_seat_statuses: %s", e)
             return []
 
+    def resolve_entityCacheStats(self, info):
+        return [cache.stats() for cache in entity_caches.values()]
+
 # Mutation Class
 class Mutation(ObjectType):
     # Cinema mutations
@@ -623,5 +704,7 @@ class Mutation(ObjectType):
     
     # Seat status mutations
     update_seat_status = UpdateSeatStatus.Field()
+    release_seats = ReleaseSeats.Field()
+    book_seats = BookSeats.Field()
 
 schema = Schema(query=Query, mutation=Mutation)
\ No newline at end of file
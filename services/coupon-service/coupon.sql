@@ -9,5 +9,49 @@ CREATE TABLE IF NOT EXISTS coupons (
     is_active BOOLEAN DEFAULT TRUE,
     is_auto_generated BOOLEAN DEFAULT FALSE,
     used_by_user_id INT NULL,
-    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    max_uses INT NULL,  -- NULL = single-use coupon
+    remaining_uses INT NULL,  -- Decremented atomically on each multi-use redemption
+    batch_id INT NULL,  -- Set for codes issued by generateCouponBatch
+    issued_to_user_id INT NULL,  -- Personal coupons (loyalty rewards)
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX ix_coupons_batch_id (batch_id),
+    INDEX ix_coupons_issued_to_user_id (issued_to_user_id)
+);
+
+-- Successful payments per user, maintained from payment-service events
+CREATE TABLE IF NOT EXISTS user_loyalty (
+    user_id INT PRIMARY KEY,
+    successful_payments INT NOT NULL DEFAULT 0,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Payments already counted in user_loyalty (deduplicates redelivered events)
+CREATE TABLE IF NOT EXISTS loyalty_payment_events (
+    payment_id INT PRIMARY KEY,
+    user_id INT NOT NULL,
+    recorded_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Next unused counter value per promo code prefix
+CREATE TABLE IF NOT EXISTS coupon_code_sequences (
+    prefix VARCHAR(20) PRIMARY KEY,
+    next_value BIGINT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS coupon_batches (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    prefix VARCHAR(20) NOT NULL,
+    name VARCHAR(100) NOT NULL,
+    discount_percentage FLOAT NOT NULL,
+    valid_until DATETIME NOT NULL,
+    count INT NOT NULL,
+    start_index BIGINT NOT NULL,
+    generated_count INT NOT NULL DEFAULT 0,
+    skipped_count INT NOT NULL DEFAULT 0,
+    status ENUM('RUNNING', 'COMPLETED', 'FAILED') NOT NULL DEFAULT 'RUNNING',
+    error TEXT NULL,
+    owner VARCHAR(100) NULL,
+    heartbeat_at DATETIME NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    finished_at DATETIME NULL
 );
\ No newline at end of file
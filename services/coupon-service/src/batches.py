@@ -0,0 +1,169 @@
+from models import Coupon, CouponBatch, CouponCodeSequence, db
+from cache import coupon_cache, available_coupons_cache
+from codes import make_codes
+from datetime import datetime
+from itertools import islice
+import threading
+import logging
+import socket
+import time
+import re
+import os
+
+logger = logging.getLogger(__name__)
+
+# Rows per multi-row INSERT; progress is committed after each chunk
+COUPON_BATCH_INSERT_SIZE = int(os.getenv('COUPON_BATCH_INSERT_SIZE', '5000'))
+COUPON_BATCH_MAX_COUNT = int(os.getenv('COUPON_BATCH_MAX_COUNT', '1000000'))
+# A RUNNING batch whose owner has not written a heartbeat for this long is taken over by
+# the next process that checks (every COUPON_BATCH_LEASE_SECONDS)
+COUPON_BATCH_LEASE_SECONDS = int(os.getenv('COUPON_BATCH_LEASE_SECONDS', '120'))
+
+# Lease owner name of this process
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
+
+_running = set()  # Batch ids with a thread in this process
+_running_lock = threading.Lock()
+
+PREFIX_PATTERN = re.compile(r'^[A-Z0-9]{1,20}$')
+
+class CouponBatchError(Exception):
+    pass
+
+def create_batch(prefix, count, discount_percentage, valid_until, name=None):
+    """Validate the request, reserve a counter range for the prefix and record the batch"""
+    prefix = (prefix or '').upper()
+    if not PREFIX_PATTERN.match(prefix):
+        raise CouponBatchError("Prefix must be 1-20 letters or digits")
+    if count < 1 or count > COUPON_BATCH_MAX_COUNT:
+        raise CouponBatchError(f"Count must be between 1 and {COUPON_BATCH_MAX_COUNT}")
+    if not 0 < discount_percentage <= 100:
+        raise CouponBatchError("Discount must be between 0 and 100 percent")
+    if valid_until <= datetime.utcnow():
+        raise CouponBatchError("validUntil must be in the future")
+
+    start_index = CouponCodeSequence.reserve(prefix, count)
+    batch = CouponBatch(
+        prefix=prefix,
+        name=name or f"{prefix} Promo {discount_percentage:g}%",
+        discount_percentage=discount_percentage,
+        valid_until=valid_until,
+        count=count,
+        start_index=start_index,
+        status='RUNNING',
+        owner=WORKER_ID,
+        heartbeat_at=datetime.utcnow()
+    )
+    batch.save()
+    return batch
+
+def run_batch(batch_id, chunk_size=COUPON_BATCH_INSERT_SIZE):
+    """Generate and insert the batch's codes chunk by chunk, committing progress as it goes.
+
+    Codes are a pure function of the batch's counter range, so an interrupted batch
+    resumes from its committed progress. Each chunk commits together with the progress
+    and heartbeat of this process's lease; if another process has taken the batch over,
+    the chunk is rolled back and the run stops.
+    """
+    batch = CouponBatch.query.get(batch_id)
+    generated_count, skipped_count = batch.generated_count, batch.skipped_count
+    done = generated_count + skipped_count
+    codes = make_codes(batch.prefix, batch.start_index + done, batch.count - done)
+    insert_statement = Coupon.__table__.insert().prefix_with('IGNORE')
+
+    try:
+        while True:
+            chunk = list(islice(codes, chunk_size))
+            if not chunk:
+                break
+
+            now = datetime.utcnow()
+            rows = [{
+                'code': code,
+                'name': batch.name,
+                'discount_percentage': batch.discount_percentage,
+                'valid_until': batch.valid_until,
+                'is_active': True,
+                'is_auto_generated': False,
+                'used_by_user_id': None,
+                'max_uses': None,
+                'remaining_uses': None,
+                'batch_id': batch.id,
+                'created_at': now
+            } for code in chunk]
+
+            # INSERT IGNORE: a code that already exists (e.g. created by hand) is skipped
+            # instead of failing the whole chunk
+            result = db.session.execute(insert_statement, rows)
+            inserted = result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(rows)
+            generated_count += inserted
+            skipped_count += len(rows) - inserted
+
+            if not CouponBatch.update_owned(batch.id, WORKER_ID, {'generated_count': generated_count,
+                                                                 'skipped_count': skipped_count}):
+                db.session.rollback()
+                logger.warning("Coupon batch %s was taken over by another process, stopping", batch.id)
+                return
+            db.session.commit()
+
+        CouponBatch.update_owned(batch.id, WORKER_ID, {'status': 'COMPLETED', 'finished_at': datetime.utcnow()})
+        db.session.commit()
+        logger.info("Coupon batch %s completed: %s codes, %s skipped", batch.id, generated_count, skipped_count)
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Error in run_batch")
+        CouponBatch.update_owned(batch.id, WORKER_ID, {'status': 'FAILED', 'error': str(e),
+                                                      'finished_at': datetime.utcnow()})
+        db.session.commit()
+    finally:
+        # Bulk inserts bypass Coupon.save(), so drop cached lookups (including negative ones)
+        coupon_cache.clear()
+        available_coupons_cache.clear()
+
+def start_batch(app, batch_id):
+    """Run run_batch in a background thread; progress is read back through couponBatch(id).
+    Does nothing if this process is already running the batch."""
+    with _running_lock:
+        if batch_id in _running:
+            return None
+        _running.add(batch_id)
+
+    def run():
+        try:
+            with app.app_context():
+                run_batch(batch_id)
+        finally:
+            with _running_lock:
+                _running.discard(batch_id)
+
+    thread = threading.Thread(target=run, name=f'coupon-batch-{batch_id}', daemon=True)
+    thread.start()
+    return thread
+
+def resume_batches(app):
+    """Claim and restart RUNNING batches whose owner stopped sending heartbeats (or was this
+    process before a restart)"""
+    with app.app_context():
+        with _running_lock:
+            running = set(_running)
+        batch_ids = [row.id for row in db.session.query(CouponBatch.id).filter(CouponBatch.status == 'RUNNING')
+                     if row.id not in running]
+        claimed = [batch_id for batch_id in batch_ids
+                   if CouponBatch.claim(batch_id, WORKER_ID, COUPON_BATCH_LEASE_SECONDS)]
+    for batch_id in claimed:
+        logger.info("Resuming coupon batch %s", batch_id)
+        start_batch(app, batch_id)
+
+def start_batch_resumer(app, interval=COUPON_BATCH_LEASE_SECONDS):
+    """Run resume_batches now and then periodically in a daemon thread"""
+    def run():
+        while True:
+            try:
+                resume_batches(app)
+            except Exception as e:
+                logger.exception("Error in batch resumer: %s", e)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name='coupon-batch-resumer', daemon=True)
+    thread.start()
+    return thread
\ No newline at end of file
@@ -0,0 +1,31 @@
+from collections import namedtuple
+from shared.cache import BoundedCache, snapshot
+from datetime import datetime
+import os
+
+# Cache settings. Entries also expire after the TTL so several workers converge
+# after a write made in another process.
+COUPON_CACHE_SIZE = int(os.getenv('COUPON_CACHE_SIZE', '1024'))
+COUPON_CACHE_TTL_SECONDS = float(os.getenv('COUPON_CACHE_TTL_SECONDS', '30'))
+COUPON_NEGATIVE_TTL_SECONDS = float(os.getenv('COUPON_NEGATIVE_TTL_SECONDS', '5'))
+
+# Detached, read-only copy of a coupon row. Field names match the model so
+# CouponType resolves it the same way.
+CouponSnapshot = namedtuple('CouponSnapshot', [
+    'id', 'code', 'name', 'discount_percentage', 'valid_until',
+    'is_active', 'is_auto_generated', 'used_by_user_id', 'max_uses', 'remaining_uses',
+    'issued_to_user_id', 'created_at'
+])
+
+def snapshot_coupon(coupon):
+    return snapshot(CouponSnapshot, coupon)
+
+# Coupon rows by code (None is cached briefly for unknown codes)
+coupon_cache = BoundedCache('coupons_by_code', COUPON_CACHE_SIZE, COUPON_CACHE_TTL_SECONDS,
+                            COUPON_NEGATIVE_TTL_SECONDS)
+# The availableCoupons list, stored under a single key
+available_coupons_cache = BoundedCache('available_coupons', 1, COUPON_CACHE_TTL_SECONDS)
+
+def seconds_until(moment):
+    """Seconds from now until a naive UTC datetime, never negative"""
+    return max((moment - datetime.utcnow()).total_seconds(), 0)
@@ -0,0 +1,59 @@
+import hashlib
+import os
+
+# Promo codes are prefix + an 8 character encoding of a 40-bit keyed permutation
+# of a per-prefix counter. The permutation is a bijection, so distinct counter
+# values can never produce the same code, and without the key the codes are not
+# guessable from each other.
+COUPON_CODE_SECRET = os.getenv('COUPON_CODE_SECRET', 'change-me-coupon-code-secret').encode()
+
+CODE_BITS = 40
+HALF_BITS = CODE_BITS // 2
+HALF_MASK = (1 << HALF_BITS) - 1
+CODE_SPACE = 1 << CODE_BITS
+FEISTEL_ROUNDS = 4
+
+# Crockford base32: no I, L, O, U so codes are easy to read out and type
+CODE_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+CODE_LENGTH = CODE_BITS // 5
+
+def _prefix_key(prefix):
+    # One key per prefix, so equal counters under different prefixes give unrelated codes
+    return hashlib.blake2b(prefix.encode(), key=COUPON_CODE_SECRET[:64]).digest()
+
+def _round_hashers(key):
+    """Keyed BLAKE2b states, one per Feistel round; copied per call to skip key setup"""
+    return [hashlib.blake2b(bytes((round_number,)), key=key, digest_size=3) for round_number in range(FEISTEL_ROUNDS)]
+
+def _permute(round_hashers, index):
+    left, right = index >> HALF_BITS, index & HALF_MASK
+    for hasher in round_hashers:
+        round_hash = hasher.copy()
+        round_hash.update(right.to_bytes(3, 'big'))
+        left, right = right, left ^ (int.from_bytes(round_hash.digest(), 'big') & HALF_MASK)
+    return (left << HALF_BITS) | right
+
+def permute(index, prefix=''):
+    """Map a counter value in [0, 2^40) to a unique pseudo-random value in the same range (Feistel network)"""
+    if not 0 <= index < CODE_SPACE:
+        raise ValueError(f"Code index {index} is outside the code space")
+    return _permute(_round_hashers(_prefix_key(prefix)), index)
+
+def encode(value):
+    chars = []
+    for _ in range(CODE_LENGTH):
+        chars.append(CODE_ALPHABET[value & 31])
+        value >>= 5
+    return ''.join(reversed(chars))
+
+def make_code(prefix, index):
+    """Promo code for the index-th code ever issued under `prefix`"""
+    return f"{prefix}-{encode(permute(index, prefix))}"
+
+def make_codes(prefix, start, count):
+    """Yield the codes for counter values [start, start + count) under `prefix`"""
+    if start < 0 or start + count > CODE_SPACE:
+        raise ValueError(f"Code range {start}..{start + count} is outside the code space")
+    round_hashers = _round_hashers(_prefix_key(prefix))
+    for index in range(start, start + count):
+        yield f"{prefix}-{encode(_permute(round_hashers, index))}"
@@ -1,10 +1,19 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.mysql import insert as mysql_insert
 from datetime import datetime, timedelta
+from cache import (coupon_cache, available_coupons_cache, snapshot_coupon, seconds_until,
+                   COUPON_CACHE_TTL_SECONDS)
 import random
 import string
+import os
 
 db = SQLAlchemy()
 
+# A loyalty coupon is issued every time a user's successful payments reach a multiple of this
+LOYALTY_COUPON_EVERY = int(os.getenv('LOYALTY_COUPON_EVERY', '3'))
+LOYALTY_MAX_DISCOUNT = float(os.getenv('LOYALTY_MAX_DISCOUNT', '50'))
+
 class Coupon(db.Model):
     __tablename__ = 'coupons'
 
@@ -16,13 +25,18 @@ class Coupon(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     is_auto_generated = db.Column(db.Boolean, default=False)  # New field
     used_by_user_id = db.Column(db.Integer, nullable=True)  # New field
+    max_uses = db.Column(db.Integer, nullable=True)  # NULL = single-use coupon, otherwise multi-use limit
+    remaining_uses = db.Column(db.Integer, nullable=True)  # Decremented atomically on each multi-use redemption
+    batch_id = db.Column(db.Integer, nullable=True, index=True)  # Set for codes issued by generateCouponBatch
+    issued_to_user_id = db.Column(db.Integer, nullable=True, index=True)  # Personal coupons (loyalty rewards)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     @classmethod
     def generate_loyalty_coupon(cls, user_id, payment_count):
         """Generate automatic loyalty coupon based on payment count"""
-        # Base discount of 10% + 5% for every 3 payments beyond the first 3
-        discount = 10 + (((payment_count - 3) // 3) * 5)
+        # Base discount of 10% + 5% for every 3 payments beyond the first 3, capped now that
+        # coupons are issued automatically
+        discount = min(10 + (((payment_count - 3) // 3) * 5), LOYALTY_MAX_DISCOUNT)
         
         # Generate unique code
         code = f"LOYALTY{user_id}_{payment_count}_{cls._generate_random_string(6)}"
@@ -47,26 +61,262 @@ class Coupon(db.Model):
     def save(self):
         db.session.add(self)
         db.session.commit()
+        self.invalidate_cache(self.code)
 
     def delete(self):
+        code = self.code
         db.session.delete(self)
         db.session.commit()
-    
-    def use_coupon(self, user_id):
-        """Mark coupon as used by a specific user"""
-        if self.used_by_user_id is not None:
+        self.invalidate_cache(code)
+
+    @staticmethod
+    def invalidate_cache(code):
+        """Drop cached copies after a write (write-through invalidation)"""
+        coupon_cache.invalidate(code)
+        available_coupons_cache.clear()
+
+    @classmethod
+    def get_cached_by_code(cls, code):
+        """Coupon snapshot by code from the LRU cache, loading it on a miss. Returns None if unknown
+        (cached for COUPON_NEGATIVE_TTL_SECONDS)."""
+        return coupon_cache.get(code, lambda key: snapshot_coupon(cls.query.filter_by(code=key).first()))
+
+    @classmethod
+    def get_cached_available(cls):
+        """Active, unexpired coupons with uses left, from cache. The list expires when its first coupon does."""
+        found, snapshots = available_coupons_cache.lookup('available')
+        if found:
+            return snapshots
+
+        generation = available_coupons_cache.generation
+        # Batch promo codes and personal coupons are handed out individually, never listed
+        coupons = cls.query.filter(
+            cls.is_active == True,
+            cls.valid_until >= datetime.utcnow(),
+            cls.batch_id.is_(None),
+            cls.issued_to_user_id.is_(None),
+            db.or_(cls.max_uses.is_(None), cls.remaining_uses > 0)
+        ).order_by(cls.id).all()
+        snapshots = [snapshot_coupon(coupon) for coupon in coupons]
+
+        ttl = COUPON_CACHE_TTL_SECONDS
+        if snapshots:
+            ttl = min(ttl, seconds_until(min(snapshot.valid_until for snapshot in snapshots)))
+        available_coupons_cache.set('available', snapshots, ttl=ttl, generation=generation)
+        return snapshots
+
+    @staticmethod
+    def is_usable(coupon, user_id=None):
+        """Check an active, unexpired coupon (model or snapshot) without touching the database.
+        A personal coupon is only usable by the user it was issued to."""
+        if coupon is None or not coupon.is_active or coupon.valid_until < datetime.utcnow():
+            return False
+        if coupon.issued_to_user_id is not None and coupon.issued_to_user_id != user_id:
+            return False
+        if coupon.max_uses is None:
+            return coupon.used_by_user_id is None
+        return (coupon.remaining_uses or 0) > 0
+
+    @classmethod
+    def redeem(cls, code, user_id):
+        """Redeem a coupon with one guarded UPDATE; the affected-row count decides success.
+
+        Single-use coupons are claimed for `user_id` and deactivated. Multi-use coupons
+        decrement remaining_uses and stop matching the guard once it reaches zero.
+        Concurrent redeemers cannot both win because the check and the write are the
+        same statement. Returns (success, message).
+        """
+        snapshot = cls.get_cached_by_code(code)
+        if snapshot is None:
+            return False, "Coupon not found"
+
+        now = datetime.utcnow()
+        guard = cls.query.filter(
+            cls.code == code,
+            cls.is_active == True,
+            cls.valid_until > now,
+            db.or_(cls.issued_to_user_id.is_(None), cls.issued_to_user_id == user_id)
+        )
+        if snapshot.max_uses is None:
+            updated = guard.filter(
+                cls.max_uses.is_(None),
+                cls.used_by_user_id.is_(None)
+            ).update({'used_by_user_id': user_id, 'is_active': False}, synchronize_session=False)
+            exhausted = True
+        else:
+            updated = guard.filter(
+                cls.remaining_uses > 0
+            ).update({'remaining_uses': cls.remaining_uses - 1}, synchronize_session=False)
+            exhausted = updated == 1 and db.session.query(cls.remaining_uses).filter(cls.code == code).scalar() == 0
+        db.session.commit()
+
+        if updated == 1:
+            if exhausted:
+                cls.invalidate_cache(code)
+            # Multi-use entries with uses left stay cached on the hot path; validation may lag
+            # by the cache TTL, redemption itself is always decided by the database
+            return True, "Coupon used successfully"
+
+        # Losing path: read the row once to explain why
+        coupon = cls.query.filter_by(code=code).first()
+        cls.invalidate_cache(code)
+        if coupon is None:
+            return False, "Coupon not found"
+        if not coupon.is_active and coupon.max_uses is None and coupon.used_by_user_id is not None:
             return False, "Coupon has already been used"
-        
-        if not self.is_active:
+        if not coupon.is_active:
             return False, "Coupon is not active"
-        
-        if datetime.utcnow() > self.valid_until:
+        if coupon.valid_until <= now:
             return False, "Coupon has expired"
-        
-        self.used_by_user_id = user_id
-        self.is_active = False
-        self.save()
-        return True, "Coupon used successfully"
+        if coupon.issued_to_user_id is not None and coupon.issued_to_user_id != user_id:
+            return False, "Coupon belongs to another user"
+        if coupon.max_uses is not None:
+            return False, "Coupon has no uses left"
+        return False, "Coupon has already been used"
+
+    def use_coupon(self, user_id):
+        """Mark coupon as used by a specific user"""
+        return Coupon.redeem(self.code, user_id)
+
+    def __repr__(self):
+        return f"<Coupon(id={self.id}, code='{self.code}', name='{self.name}', discount_percentage={self.discount_percentage}, valid_until='{self.valid_until}')>"
+
+class CouponCodeSequence(db.Model):
+    """Next unused counter value per promo code prefix"""
+    __tablename__ = 'coupon_code_sequences'
+
+    prefix = db.Column(db.String(20), primary_key=True)
+    next_value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    @classmethod
+    def reserve(cls, prefix, count):
+        """Reserve `count` consecutive counter values for `prefix` and return the first one.
+
+        The sequence row is locked while it is advanced, so concurrent batches with the
+        same prefix get disjoint ranges.
+        """
+        sequence = cls.query.filter_by(prefix=prefix).with_for_update().first()
+        if sequence is None:
+            try:
+                sequence = cls(prefix=prefix, next_value=0)
+                db.session.add(sequence)
+                db.session.flush()
+            except IntegrityError:
+                # Another batch created the row first
+                db.session.rollback()
+                sequence = cls.query.filter_by(prefix=prefix).with_for_update().first()
+
+        start = sequence.next_value
+        sequence.next_value = start + count
+        db.session.commit()
+        return start
+
+class CouponBatch(db.Model):
+    """A generateCouponBatch job and its progress"""
+    __tablename__ = 'coupon_batches'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    prefix = db.Column(db.String(20), nullable=False)
+    name = db.Column(db.String(100), nullable=False)
+    discount_percentage = db.Column(db.Float, nullable=False)
+    valid_until = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+    start_index = db.Column(db.BigInteger, nullable=False)  # First counter value of this batch's range
+    generated_count = db.Column(db.Integer, nullable=False, default=0)
+    skipped_count = db.Column(db.Integer, nullable=False, default=0)  # Codes that already existed
+    status = db.Column(db.Enum('RUNNING', 'COMPLETED', 'FAILED', name='coupon_batch_status_enum'),
+                       nullable=False, default='RUNNING')
+    error = db.Column(db.Text, nullable=True)
+    owner = db.Column(db.String(100), nullable=True)  # Process running the batch, see claim()
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Refreshed by the owner after every chunk
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def save(self):
+        db.session.add(self)
+        db.session.commit()
+
+    @classmethod
+    def claim(cls, batch_id, owner, lease_seconds):
+        """Take over a RUNNING batch whose lease is free, stale or already ours, in one guarded UPDATE.
+
+        Returns True if `owner` now holds the lease. Of several processes claiming the
+        same batch at once, exactly one wins.
+        """
+        now = datetime.utcnow()
+        updated = cls.query.filter(
+            cls.id == batch_id,
+            cls.status == 'RUNNING',
+            db.or_(
+                cls.owner.is_(None),
+                cls.owner == owner,
+                cls.heartbeat_at.is_(None),
+                cls.heartbeat_at < now - timedelta(seconds=lease_seconds)
+            )
+        ).update({'owner': owner, 'heartbeat_at': now}, synchronize_session=False)
+        db.session.commit()
+        return updated == 1
+
+    @classmethod
+    def update_owned(cls, batch_id, owner, values):
+        """Update the batch and refresh its heartbeat only while `owner` holds the lease.
+        Does not commit; returns False if the lease was lost."""
+        values = dict(values, heartbeat_at=datetime.utcnow())
+        updated = cls.query.filter(cls.id == batch_id, cls.owner == owner).update(values, synchronize_session=False)
+        return updated == 1
 
     def __repr__(self):
-        return f"<Coupon(id={self.id}, code='{self.code}', name='{self.name}', discount_percentage={self.discount_percentage}, valid_until='{self.valid_until}')>"
\ No newline at end of file
+        return f"<CouponBatch(id={self.id}, prefix='{self.prefix}', count={self.count}, status='{self.status}')>"
+
+class UserLoyalty(db.Model):
+    """Running count of a user's successful payments, maintained from payment events"""
+    __tablename__ = 'user_loyalty'
+
+    user_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    successful_payments = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @classmethod
+    def get_count(cls, user_id):
+        loyalty = cls.query.get(user_id)
+        return loyalty.successful_payments if loyalty else 0
+
+    @classmethod
+    def record_payment_success(cls, payment_id, user_id):
+        """Count one successful payment and issue a loyalty coupon when a threshold is reached.
+
+        Each payment is counted once: redelivered events hit the primary key of
+        loyalty_payment_events and are ignored. Does not commit; returns
+        (counted, successful_payments, coupon or None).
+        """
+        event_insert = mysql_insert(LoyaltyPaymentEvent.__table__).prefix_with('IGNORE').values(
+            payment_id=payment_id, user_id=user_id, recorded_at=datetime.utcnow()
+        )
+        if db.session.execute(event_insert).rowcount != 1:
+            return False, cls.get_count(user_id), None
+
+        # Atomic increment; the upsert also locks the row for the read below
+        counter_upsert = mysql_insert(cls.__table__).values(
+            user_id=user_id, successful_payments=1, updated_at=datetime.utcnow()
+        )
+        counter_upsert = counter_upsert.on_duplicate_key_update(
+            successful_payments=cls.__table__.c.successful_payments + 1,
+            updated_at=counter_upsert.inserted.updated_at
+        )
+        db.session.execute(counter_upsert)
+        successful_payments = db.session.query(cls.successful_payments).filter(cls.user_id == user_id).scalar()
+
+        coupon = None
+        if successful_payments >= LOYALTY_COUPON_EVERY and successful_payments % LOYALTY_COUPON_EVERY == 0:
+            coupon = Coupon.generate_loyalty_coupon(user_id, successful_payments)
+            coupon.issued_to_user_id = user_id
+            db.session.add(coupon)
+        return True, successful_payments, coupon
+
+class LoyaltyPaymentEvent(db.Model):
+    """Payments already counted in user_loyalty (deduplicates redelivered events)"""
+    __tablename__ = 'loyalty_payment_events'
+
+    payment_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    recorded_at = db.Column(db.DateTime, default=datetime.utcnow)
\ No newline at end of file
@@ -1,11 +1,22 @@
-from graphene import ObjectType, String, Float, Int, List, Field, Mutation, Schema, Boolean
-from models import Coupon, db
+from graphene import ObjectType, InputObjectType, String, Float, Int, List, Field, Mutation, Schema, Boolean
+from models import Coupon, CouponBatch, UserLoyalty, LOYALTY_COUPON_EVERY, db
+from shared.resolvers import keyset_page, page_limit
+from shared.cache import CacheStatsType
+from shared.jwks import KeySetCache, verify_token
+from shared.metrics import DownstreamCall
+from batches import create_batch, start_batch, CouponBatchError
+from flask import current_app
+from cache import coupon_cache, available_coupons_cache
 from datetime import datetime, timedelta
 import requests
-import os
-import traceback
+import logging
 import uuid 
 
+logger = logging.getLogger(__name__)
+
+# user-service's public keys, for verifying tokens without calling it
+key_set = KeySetCache(DownstreamCall)
+
 # Add missing imports for HTTP requests and error handling
 try:
     import urllib3
@@ -20,6 +31,8 @@ class CouponType(ObjectType):
     discountPercentage = Float()
     validUntil = String()
     isActive = Boolean()
+    maxUses = Int()
+    remainingUses = Int()
     createdAt = String()
     updatedAt = String()
 
@@ -33,6 +46,12 @@ class CouponType(ObjectType):
     
     def resolve_isActive(self, info):
         return self.is_active
+
+    def resolve_maxUses(self, info):
+        return self.max_uses
+
+    def resolve_remainingUses(self, info):
+        return self.remaining_uses
     
     def resolve_createdAt(self, info):
         if hasattr(self, 'created_at') and self.created_at:
@@ -44,6 +63,63 @@ class CouponType(ObjectType):
             return self.updated_at.strftime('%Y-%m-%d %H:%M:%S')
         return None
     
+class CouponBatchType(ObjectType):
+    id = Int()
+    prefix = String()
+    name = String()
+    discountPercentage = Float()
+    validUntil = String()
+    count = Int()
+    generatedCount = Int()
+    skippedCount = Int()
+    progress = Float()  # 0.0 - 1.0
+    status = String()  # RUNNING, COMPLETED, FAILED
+    error = String()
+    createdAt = String()
+    finishedAt = String()
+
+    def resolve_discountPercentage(self, info):
+        return self.discount_percentage
+
+    def resolve_validUntil(self, info):
+        return self.valid_until.strftime('%Y-%m-%d %H:%M:%S') if self.valid_until else None
+
+    def resolve_generatedCount(self, info):
+        return self.generated_count
+
+    def resolve_skippedCount(self, info):
+        return self.skipped_count
+
+    def resolve_progress(self, info):
+        return (self.generated_count + self.skipped_count) / self.count if self.count else 1.0
+
+    def resolve_createdAt(self, info):
+        return self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None
+
+    def resolve_finishedAt(self, info):
+        return self.finished_at.strftime('%Y-%m-%d %H:%M:%S') if self.finished_at else None
+
+class UserLoyaltyType(ObjectType):
+    userId = Int()
+    successfulPayments = Int()
+    paymentsUntilNextCoupon = Int()
+    coupons = List(CouponType)
+
+class PaymentSuccessEventInput(InputObjectType):
+    paymentId = Int(required=True)
+    userId = Int(required=True)
+
+class RecordPaymentSuccessesResponse(ObjectType):
+    success = Boolean()
+    message = String()
+    recordedCount = Int()
+    issuedCoupons = List(CouponType)
+
+class GenerateCouponBatchResponse(ObjectType):
+    batch = Field(CouponBatchType)
+    success = Boolean()
+    message = String()
+
 class CreateCouponResponse(ObjectType):
     coupon = Field(CouponType)
     success = Boolean()
@@ -61,57 +137,89 @@ class TokenVerificationResponse(ObjectType):
     error = String()
 
 class Query(ObjectType):
-    coupons = List(CouponType)
-    availableCoupons = List(CouponType)  # ← This should match gateway expectation
+    coupons = List(CouponType, first=Int(), after=Int())
+    availableCoupons = List(CouponType, first=Int(), after=Int())  # ← This should match gateway expectation
     coupon = Field(CouponType, id=Int(required=True))
-    validate_coupon = Field(Boolean, code=String(required=True))
+    validate_coupon = Field(Boolean, code=String(required=True), user_id=Int())
+    couponCacheStats = List(CacheStatsType)
+    couponBatch = Field(CouponBatchType, id=Int(required=True))
+    couponBatches = List(CouponBatchType, first=Int(), after=Int())
+    userLoyalty = Field(UserLoyaltyType, userId=Int(required=True))
 
-    def resolve_coupons(self, info):
+    def resolve_coupons(self, info, first=None, after=None):
         try:
-            return Coupon.query.all()
+            return keyset_page(Coupon.query, Coupon.id, first, after).all()
         except Exception as e:
-            print(f"Error in resolve_coupons: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error in resolve_coupons: %s", e)
             return []
 
-    def resolve_availableCoupons(self, info):  # ← This should match the field name
+    def resolve_availableCoupons(self, info, first=None, after=None):  # ← This should match the field name
         try:
-            return Coupon.query.filter(
-                Coupon.is_active == True,
-                Coupon.valid_until >= datetime.utcnow()
-            ).all()
+            # Same keyset contract as the database-backed lists, applied to the cached list (ordered by id)
+            coupons = Coupon.get_cached_available()
+            if after is not None:
+                coupons = [coupon for coupon in coupons if coupon.id > after]
+            return coupons[:page_limit(first)]
         except Exception as e:
-            print(f"Error in resolve_available_coupons: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error in resolve_available_coupons: %s", e)
             return []
 
     def resolve_coupon(self, info, id):
         try:
             return Coupon.query.get(id)
         except Exception as e:
-            print(f"Error in resolve_coupon: {str(e)}")
+            logger.error("Error in resolve_coupon: %s", e)
             return None
 
-    def resolve_validate_coupon(self, info, code):
+    def resolve_validate_coupon(self, info, code, user_id=None):
         try:
-            coupon = Coupon.query.filter_by(code=code).first()
-            if not coupon:
-                return False
-            return coupon.is_active and coupon.valid_until >= datetime.utcnow()
+            return Coupon.is_usable(Coupon.get_cached_by_code(code), user_id)
         except Exception as e:
-            print(f"Error in resolve_validate_coupon: {str(e)}")
+            logger.error("Error in resolve_validate_coupon: %s", e)
             return False
 
+    def resolve_couponCacheStats(self, info):
+        return [coupon_cache.stats(), available_coupons_cache.stats()]
+
+    def resolve_userLoyalty(self, info, userId):
+        try:
+            successful_payments = UserLoyalty.get_count(userId)
+            coupons = Coupon.query.filter(Coupon.issued_to_user_id == userId).order_by(Coupon.id.desc()).all()
+            return UserLoyaltyType(
+                userId=userId,
+                successfulPayments=successful_payments,
+                paymentsUntilNextCoupon=LOYALTY_COUPON_EVERY - (successful_payments % LOYALTY_COUPON_EVERY),
+                coupons=coupons
+            )
+        except Exception as e:
+            logger.exception("Error in resolve_userLoyalty: %s", e)
+            return None
+
+    def resolve_couponBatch(self, info, id):
+        try:
+            return CouponBatch.query.get(id)
+        except Exception as e:
+            logger.error("Error in resolve_couponBatch: %s", e)
+            return None
+
+    def resolve_couponBatches(self, info, first=None, after=None):
+        try:
+            return keyset_page(CouponBatch.query, CouponBatch.id, first, after, descending=True).all()
+        except Exception as e:
+            logger.exception("Error in resolve_couponBatches: %s", e)
+            return []
+
 class CreateCoupon(Mutation):
     class Arguments:
         code = String(required=True)
         name = String(required=True)
         discount_percentage = Float(required=True)
         valid_until = String(required=True)
+        max_uses = Int()  # Omit for a single-use coupon
 
     Output = CreateCouponResponse
 
-    def mutate(self, info, code, name, discount_percentage, valid_until):
+    def mutate(self, info, code, name, discount_percentage, valid_until, max_uses=None):
         try:
             # Check if coupon code already exists
             existing_coupon = Coupon.query.filter_by(code=code).first()
@@ -135,13 +243,22 @@ class CreateCoupon(Mutation):
                         message="Invalid date format. Use YYYY-MM-DD or YYYY-MM-DD HH:MM:SS"
                     )
 
+            if max_uses is not None and max_uses < 1:
+                return CreateCouponResponse(
+                    coupon=None,
+                    success=False,
+                    message="max_uses must be at least 1"
+                )
+
             # Create coupon
             coupon = Coupon(
                 code=code,
                 name=name,
                 discount_percentage=discount_percentage,
                 valid_until=valid_until_date,
-                is_active=True
+                is_active=True,
+                max_uses=max_uses,
+                remaining_uses=max_uses
             )
             coupon.save()
 
@@ -152,7 +269,7 @@ class CreateCoupon(Mutation):
             )
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in CreateCoupon.mutate")
             return CreateCouponResponse(
                 coupon=None,
                 success=False,
@@ -163,12 +280,13 @@ class UseCoupon(Mutation):
     class Arguments:
         code = String(required=True)
         booking_amount = Float(required=True)
+        user_id = Int()  # Required to preview a personal coupon
 
     Output = UseCouponResponse
 
-    def mutate(self, info, code, booking_amount):
+    def mutate(self, info, code, booking_amount, user_id=None):
         try:
-            coupon = Coupon.query.filter_by(code=code).first()
+            coupon = Coupon.get_cached_by_code(code)
             
             if not coupon:
                 return UseCouponResponse(
@@ -191,6 +309,20 @@ class UseCoupon(Mutation):
                     discount_amount=0.0
                 )
 
+            if coupon.issued_to_user_id is not None and coupon.issued_to_user_id != user_id:
+                return UseCouponResponse(
+                    success=False,
+                    message="Coupon belongs to another user",
+                    discount_amount=0.0
+                )
+
+            if coupon.max_uses is not None and (coupon.remaining_uses or 0) <= 0:
+                return UseCouponResponse(
+                    success=False,
+                    message="Coupon has no uses left",
+                    discount_amount=0.0
+                )
+
             # Calculate discount
             discount_amount = booking_amount * (coupon.discount_percentage / 100)
 
@@ -200,22 +332,142 @@ class UseCoupon(Mutation):
                 discount_amount=discount_amount
             )
         except Exception as e:
-            traceback.print_exc()
+            logger.exception("Error in UseCoupon.mutate")
             return UseCouponResponse(
                 success=False,
                 message=f"Error applying coupon: {str(e)}",
                 discount_amount=0.0
             )
 
+class GenerateCouponBatch(Mutation):
+    """Issue `count` single-use promo codes as a background job; poll couponBatch(id) for progress"""
+    class Arguments:
+        prefix = String(required=True)
+        count = Int(required=True)
+        discount = Float(required=True)
+        validUntil = String(required=True)
+        name = String()
+
+    Output = GenerateCouponBatchResponse
+
+    def mutate(self, info, prefix, count, discount, validUntil, name=None):
+        try:
+            try:
+                valid_until_date = datetime.strptime(validUntil, '%Y-%m-%d %H:%M:%S')
+            except ValueError:
+                try:
+                    valid_until_date = datetime.strptime(validUntil, '%Y-%m-%d')
+                except ValueError:
+                    return GenerateCouponBatchResponse(
+                        batch=None,
+                        success=False,
+                        message="Invalid date format. Use YYYY-MM-DD or YYYY-MM-DD HH:MM:SS"
+                    )
+
+            batch = create_batch(prefix, count, discount, valid_until_date, name)
+            start_batch(current_app._get_current_object(), batch.id)
+
+            return GenerateCouponBatchResponse(
+                batch=batch,
+                success=True,
+                message=f"Coupon batch {batch.id} started: generating {count} codes with prefix {batch.prefix}"
+            )
+        except CouponBatchError as e:
+            db.session.rollback()
+            return GenerateCouponBatchResponse(batch=None, success=False, message=str(e))
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Error in GenerateCouponBatch.mutate")
+            return GenerateCouponBatchResponse(
+                batch=None,
+                success=False,
+                message=f"Error starting coupon batch: {str(e)}"
+            )
+
+class RedeemCoupon(Mutation):
+    """Redeem a coupon for a user. Unlike useCoupon this consumes the coupon."""
+    class Arguments:
+        code = String(required=True)
+        user_id = Int(required=True)
+        booking_amount = Float(required=True)
+
+    Output = UseCouponResponse
+
+    def mutate(self, info, code, user_id, booking_amount):
+        try:
+            success, message = Coupon.redeem(code, user_id)
+            if not success:
+                return UseCouponResponse(success=False, message=message, discount_amount=0.0)
+
+            coupon = Coupon.get_cached_by_code(code)
+            discount_amount = booking_amount * (coupon.discount_percentage / 100)
+            return UseCouponResponse(
+                success=True,
+                message=f"Coupon redeemed successfully. {coupon.discount_percentage}% discount",
+                discount_amount=discount_amount
+            )
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Error in RedeemCoupon.mutate")
+            return UseCouponResponse(
+                success=False,
+                message=f"Error redeeming coupon: {str(e)}",
+                discount_amount=0.0
+            )
+
+class RecordPaymentSuccesses(Mutation):
+    """Consume payment-succeeded events: bump per-user counters and issue loyalty coupons.
+
+    Safe to call again with the same events; each payment is only counted once.
+    """
+    class Arguments:
+        events = List(PaymentSuccessEventInput, required=True)
+
+    Output = RecordPaymentSuccessesResponse
+
+    def mutate(self, info, events):
+        try:
+            recorded_count = 0
+            issued_coupons = []
+            for event in events:
+                counted, successful_payments, coupon = UserLoyalty.record_payment_success(event.paymentId, event.userId)
+                if counted:
+                    recorded_count += 1
+                if coupon is not None:
+                    issued_coupons.append(coupon)
+            db.session.commit()
+
+            for coupon in issued_coupons:
+                Coupon.invalidate_cache(coupon.code)
+
+            return RecordPaymentSuccessesResponse(
+                success=True,
+                message=f"Recorded {recorded_count} of {len(events)} payment events, issued {len(issued_coupons)} loyalty coupons",
+                recordedCount=recorded_count,
+                issuedCoupons=issued_coupons
+            )
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Error in RecordPaymentSuccesses.mutate")
+            return RecordPaymentSuccessesResponse(
+                success=False,
+                message=f"Error recording payment events: {str(e)}",
+                recordedCount=0,
+                issuedCoupons=[]
+            )
+
 class GenerateLoyaltyCoupon(Mutation):
     class Arguments:
         user_id = Int(required=True)
-        booking_count = Int(required=True)
+        booking_count = Int()  # Defaults to the user's counted successful payments
 
     Output = CreateCouponResponse
 
-    def mutate(self, info, user_id, booking_count):
+    def mutate(self, info, user_id, booking_count=None):
         try:
+            if booking_count is None:
+                booking_count = UserLoyalty.get_count(user_id)
+
             # Generate loyalty coupon based on booking count
             if booking_count >= 10:
                 discount = 20.0
@@ -255,7 +507,7 @@ class GenerateLoyaltyCoupon(Mutation):
             )
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in GenerateLoyaltyCoupon.mutate")
             return CreateCouponResponse(
                 coupon=None,
                 success=False,
@@ -294,7 +546,7 @@ class UpdateCoupon(Mutation):
             return UpdateCoupon(coupon=coupon)
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in UpdateCoupon.mutate")
             raise Exception(f"Error updating coupon: {str(e)}")
 
 class DeleteCouponResponse(ObjectType):
@@ -323,7 +575,7 @@ class DeleteCoupon(Mutation):
             )
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in DeleteCoupon.mutate")
             return DeleteCouponResponse(
                 success=False,
                 message=f"Error deleting coupon: {str(e)}"
@@ -337,25 +589,24 @@ class VerifyToken(Mutation):
 
     def mutate(self, info, token):
         try:
-            print(f"Verifying token: {token[:20]}...")  # Debug log (show only first 20 chars)
+            logger.debug("Verifying token: %.20s...", token)
             
-            result = verify_token(token)
+            result = verify_token(token, key_set)
             if result['valid']:
-                print(f"Token valid for user_id: {result['user_id']}, role: {result['role']}")  # Debug log
+                logger.debug("Token valid for user_id: %s, role: %s", result['user_id'], result['role'])
                 return TokenVerificationResponse(
                     valid=True,
                     userId=result['user_id'],  # Changed to userId
                     role=result['role']
                 )
             else:
-                print(f"Token invalid: {result.get('error', 'Unknown error')}")  # Debug log
+                logger.debug("Token invalid: %s", result.get('error', 'Unknown error'))
                 return TokenVerificationResponse(
                     valid=False,
                     error=result.get('error', 'Invalid token')
                 )
         except Exception as e:
-            print(f"Token verification error: {str(e)}")  # Debug log
-            traceback.print_exc()
+            logger.exception("Token verification error: %s", e)
             return TokenVerificationResponse(
                 valid=False,
                 error=f"Token verification failed: {str(e)}"
@@ -363,8 +614,8 @@ class VerifyToken(Mutation):
 
     def resolve_verify_token(self, info, token):
         try:
-            print(f"Resolving verify_token query")  # Debug log
-            result = verify_token(token)
+            logger.debug("Resolving verify_token query")
+            result = verify_token(token, key_set)
             if result['valid']:
                 return TokenVerificationResponse(
                     valid=True,
@@ -377,8 +628,7 @@ class VerifyToken(Mutation):
                     error=result.get('error', 'Invalid token')
                 )
         except Exception as e:
-            print(f"Error in resolve_verify_token: {str(e)}")  # Debug log
-            traceback.print_exc()
+            logger.exception("Error in resolve_verify_token: %s", e)
             return TokenVerificationResponse(
                 valid=False,
                 error=f"Token verification failed: {str(e)}"
@@ -387,6 +637,9 @@ class VerifyToken(Mutation):
 class Mutation(ObjectType):
     create_coupon = CreateCoupon.Field()
     use_coupon = UseCoupon.Field()
+    redeem_coupon = RedeemCoupon.Field()
+    generateCouponBatch = GenerateCouponBatch.Field()
+    recordPaymentSuccesses = RecordPaymentSuccesses.Field()
     generate_loyalty_coupon = GenerateLoyaltyCoupon.Field()
     update_coupon = UpdateCoupon.Field()
     delete_coupon = DeleteCoupon.Field()
@@ -9,4 +9,10 @@ CREATE TABLE IF NOT EXISTS movies (
     description TEXT,
     poster_url VARCHAR(500) NULL,
     release_date DATE
+);
+
+-- Write counters for the in-process entity caches
+CREATE TABLE IF NOT EXISTS cache_versions (
+    name VARCHAR(50) PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT 0
 );
\ No newline at end of file
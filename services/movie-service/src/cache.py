@@ -0,0 +1,12 @@
+from collections import namedtuple
+from shared.cache import EntityCache
+
+# Detached, read-only copies of rows. Field names match the models so the
+# GraphQL types resolve them the same way.
+MovieSnapshot = namedtuple('MovieSnapshot', [
+    'id', 'title', 'genre', 'duration', 'description', 'release_date', 'poster_url', 'rating'
+])
+
+movie_cache = EntityCache('movies')
+
+entity_caches = {cache.name: cache for cache in (movie_cache,)}
\ No newline at end of file
@@ -1,8 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
 from datetime import date
+from search import movie_index
+from cache import movie_cache, MovieSnapshot
+from shared.cache import cache_version_model, snapshot
 
 db = SQLAlchemy()
 
+CacheVersion = cache_version_model(db)
+
 class Movie(db.Model):
     __tablename__ = 'movies'
 
@@ -17,11 +22,36 @@ class Movie(db.Model):
 
     def save(self):
         db.session.add(self)
+        CacheVersion.bump(movie_cache.name)
         db.session.commit()
+        movie_cache.invalidate(self.id)
+        movie_index.upsert(self)
 
     def delete(self):
+        movie_id = self.id
         db.session.delete(self)
+        CacheVersion.bump(movie_cache.name)
         db.session.commit()
+        movie_cache.invalidate(movie_id)
+        movie_index.remove(movie_id)
+
+    @classmethod
+    def get_cached(cls, movie_id):
+        """Read-only snapshot of a movie, from memory when possible"""
+        return movie_cache.get(movie_id, lambda key: snapshot(MovieSnapshot, cls.query.get(key)))
+
+    @classmethod
+    def get_cached_many(cls, movie_ids):
+        """{id: snapshot} for the given ids; misses are loaded with one IN query"""
+        def load_many(missing_ids):
+            return {movie.id: snapshot(MovieSnapshot, movie)
+                    for movie in cls.query.filter(cls.id.in_(missing_ids)).all()}
+        return movie_cache.get_many(movie_ids, load_many)
+
+    @classmethod
+    def search_rows(cls):
+        """(id, title, genre, description, rating) for every movie, for building the search index"""
+        return db.session.query(cls.id, cls.title, cls.genre, cls.description, cls.rating).yield_per(5000)
 
     def __repr__(self):
         return f"<Movie(id={self.id}, title='{self.title}', genre='{self.genre}', duration={self.duration}, rating={self.rating})>"
\ No newline at end of file
@@ -1,7 +1,14 @@
 from graphene import ObjectType, String, Int, List, Field, Mutation, Schema, Boolean, Float
 from models import Movie, db
+from shared.resolvers import keyset_page
+from search import movie_index, SEARCH_MAX_PAGE_SIZE
+from shared.cache import CacheStatsType
+from cache import entity_caches
 from datetime import datetime
-import traceback
+import logging
+import base64
+
+logger = logging.getLogger(__name__)
 
 class MovieType(ObjectType):
     id = Int()
@@ -23,6 +30,28 @@ class MovieType(ObjectType):
         # Convert snake_case to camelCase
         return getattr(self, 'poster_url', None)
 
+class GenreFacetType(ObjectType):
+    genre = String()
+    count = Int()
+
+class MovieSearchResultType(ObjectType):
+    movies = List(MovieType)
+    totalCount = Int()
+    genreFacets = List(GenreFacetType)
+    endCursor = String()
+    hasNextPage = Boolean()
+
+def encode_search_cursor(offset):
+    return base64.urlsafe_b64encode(f"search:{offset}".encode()).decode()
+
+def decode_search_cursor(cursor):
+    """Offset encoded in a cursor from searchMovies; 0 for a missing or malformed cursor"""
+    try:
+        kind, offset = base64.urlsafe_b64decode(cursor.encode()).decode().split(':')
+        return max(int(offset), 0) if kind == 'search' else 0
+    except (AttributeError, ValueError):
+        return 0
+
 class CreateMovieResponse(ObjectType):
     movie = Field(MovieType)
     success = Boolean()
@@ -42,7 +71,7 @@ class CreateMovie(Mutation):
 
     def mutate(self, info, title, genre, duration, description=None, releaseDate=None, posterUrl=None, rating=None):
         try:
-            print(f"Creating movie: {title}, {genre}, {duration}")
+            logger.debug("Creating movie: %s, %s, %s", title, genre, duration)
             
             movie = Movie(
                 title=title, 
@@ -72,7 +101,7 @@ class CreateMovie(Mutation):
                 )
             
             movie.save()
-            print(f"Movie saved successfully: {movie}")
+            logger.debug("Movie saved successfully: %s", movie)
             
             return CreateMovieResponse(
                 movie=movie, 
@@ -80,8 +109,7 @@ class CreateMovie(Mutation):
                 message="Movie created successfully"
             )
         except Exception as e:
-            print(f"Error creating movie: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error creating movie: %s", e)
             db.session.rollback()
             return CreateMovieResponse(
                 movie=None, 
@@ -149,7 +177,7 @@ class UpdateMovie(Mutation):
             )
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in UpdateMovie.mutate")
             return CreateMovieResponse(
                 movie=None,
                 success=False,
@@ -176,26 +204,60 @@ class DeleteMovie(Mutation):
             return DeleteMovieResponse(success=True, message="Movie deleted successfully")
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in DeleteMovie.mutate")
             return DeleteMovieResponse(success=False, message=f"Error deleting movie: {str(e)}")
 
 class Query(ObjectType):
-    movies = List(MovieType)
+    movies = List(MovieType, first=Int(), after=Int())
     movie = Field(MovieType, id=Int(required=True))
+    searchMovies = Field(
+        MovieSearchResultType,
+        text=String(),
+        genre=String(),
+        minRating=Float(),
+        first=Int(default_value=20),
+        after=String()
+    )
+    entityCacheStats = List(CacheStatsType)
 
-    def resolve_movies(self, info):
+    def resolve_movies(self, info, first=None, after=None):
         try:
-            return Movie.query.all()
+            return keyset_page(Movie.query, Movie.id, first, after).all()
         except Exception as e:
-            print(f"Error in resolve_movies: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error in resolve_movies: %s", e)
             return []
 
+    def resolve_searchMovies(self, info, text=None, genre=None, minRating=None, first=20, after=None):
+        try:
+            offset = decode_search_cursor(after) if after else 0
+            limit = min(max(first, 0), SEARCH_MAX_PAGE_SIZE)
+            result = movie_index.search(text=text, genre=genre, min_rating=minRating, offset=offset, limit=limit)
+
+            # Page rows come from the entity cache; misses are loaded in one query
+            movies_by_id = Movie.get_cached_many(result.ids)
+            movies = [movies_by_id[movie_id] for movie_id in result.ids if movie_id in movies_by_id]
+
+            end_offset = offset + len(result.ids)
+            return MovieSearchResultType(
+                movies=movies,
+                totalCount=result.total_count,
+                genreFacets=[GenreFacetType(genre=genre_name, count=count)
+                             for genre_name, count in sorted(result.genre_counts.items(), key=lambda item: (-item[1], item[0]))],
+                endCursor=encode_search_cursor(end_offset),
+                hasNextPage=end_offset < result.total_count
+            )
+        except Exception as e:
+            logger.exception("Error in resolve_searchMovies: %s", e)
+            return None
+
+    def resolve_entityCacheStats(self, info):
+        return [cache.stats() for cache in entity_caches.values()]
+
     def resolve_movie(self, info, id):
         try:
-            return Movie.query.get(id)
+            return Movie.get_cached(id)
         except Exception as e:
-            print(f"Error in resolve_movie: {str(e)}")
+            logger.error("Error in resolve_movie: %s", e)
             return None
 
 class Mutation(ObjectType):
@@ -0,0 +1,354 @@
+from collections import namedtuple
+from bisect import bisect_left, bisect_right, insort
+import unicodedata
+import threading
+import logging
+import time
+import re
+import os
+
+logger = logging.getLogger(__name__)
+
+# In-process inverted index over movie title, genre and description. Mutations
+# update it incrementally. With several replicas, set SEARCH_INDEX_REFRESH_SECONDS so a
+# periodic full rebuild picks up writes made through the others.
+SEARCH_INDEX_REFRESH_SECONDS = int(os.getenv('SEARCH_INDEX_REFRESH_SECONDS', '0'))
+SEARCH_MAX_PAGE_SIZE = int(os.getenv('SEARCH_MAX_PAGE_SIZE', '100'))
+# Bitmaps kept for terms, prefixes and genres used by recent queries; writes update them in place
+SEARCH_BITMAP_CACHE_SIZE = int(os.getenv('SEARCH_BITMAP_CACHE_SIZE', '4096'))
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+EMPTY = frozenset()
+
+MovieDocument = namedtuple('MovieDocument', ['id', 'title_key', 'genre', 'genre_key', 'rating', 'title_terms', 'terms'])
+SearchResult = namedtuple('SearchResult', ['ids', 'total_count', 'genre_counts'])
+
+if hasattr(int, 'bit_count'):
+    def popcount(bitmap):
+        return bitmap.bit_count()
+else:
+    def popcount(bitmap):
+        return bin(bitmap).count('1')
+
+def normalize(text):
+    """Lowercase and strip accents so 'Amélie' matches 'amelie'"""
+    if not text:
+        return ''
+    if text.isascii():
+        return text.lower()
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(char for char in decomposed if not unicodedata.combining(char)).lower()
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(normalize(text))
+
+def make_document(movie_id, title, genre, description, rating):
+    title_terms = frozenset(tokenize(title))
+    return MovieDocument(
+        id=movie_id,
+        title_key=normalize(title),
+        genre=genre or '',
+        genre_key=normalize(genre),
+        rating=rating,
+        title_terms=title_terms,
+        terms=title_terms | frozenset(tokenize(genre)) | frozenset(tokenize(description))
+    )
+
+def _browse_key(document):
+    # Highest rated first, unrated last, then by title
+    return (document.rating is None, -(document.rating or 0), document.title_key, document.id)
+
+def _contains(document, kind, key):
+    """Whether a document belongs in the bitmap for (kind, key), see _IndexData.bitmap()"""
+    if kind == 'term':
+        return key in document.terms
+    if kind == 'title':
+        return key in document.title_terms
+    if kind == 'genre':
+        return key == document.genre_key
+    terms = document.title_terms if kind == 'title_prefix' else document.terms
+    return any(term.startswith(key) for term in terms)
+
+class _IndexData:
+    """The index structures; only used while holding MovieSearchIndex's lock.
+
+    Postings are sets of movie ids, cheap to update one movie at a time. Queries
+    run on bitmaps (Python ints) over slots numbered in browse order, so AND/OR,
+    counting and reading off the first page cost microseconds at any result size.
+    Slots and bitmaps are derived from the sets on demand.
+
+    A write moves one movie: it takes the movie out of its slot and puts it in at
+    its new place in browse order, shifting the later slots by one in the slot
+    lists and in every cached bitmap. That is a bisect, a list insert and one
+    shift per bitmap, all linear memory moves, so the write path can do it under
+    the lock. Dropping the layout instead would make the next search re-sort
+    every movie and rebuild each bitmap it uses from the sets.
+    """
+
+    def __init__(self):
+        self.documents = {}       # movie id -> MovieDocument
+        self.postings = {}        # term -> set of movie ids (any field)
+        self.title_postings = {}  # term -> set of movie ids (title only, for ranking)
+        self.genre_ids = {}       # normalized genre -> set of movie ids
+        self.genre_names = {}     # normalized genre -> genre as displayed
+        self.sorted_terms = []    # every term in postings, sorted, for prefix lookups
+        self._clear_derived()
+
+    def _clear_derived(self):
+        self._keys = None         # slot -> browse key, sorted
+        self._slot_ids = None     # slot -> movie id, in browse order
+        self._slot_of = None      # movie id -> slot, rebuilt from _slot_ids after writes
+        self._rated = None        # negated ratings of rated movies, in slot order
+        self._bitmaps = {}
+
+    def add(self, document, bulk=False):
+        """Index a document. bulk=True is for loading new ids into an index that is
+        not searched yet; call finish_bulk() after the last one."""
+        movie_id = document.id
+        if not bulk:
+            self.remove(movie_id)
+        self.documents[movie_id] = document
+
+        postings = self.postings
+        for term in document.terms:
+            ids = postings.get(term)
+            if ids is None:
+                ids = postings[term] = set()
+                if not bulk:
+                    insort(self.sorted_terms, term)
+            ids.add(movie_id)
+        title_postings = self.title_postings
+        for term in document.title_terms:
+            ids = title_postings.get(term)
+            if ids is None:
+                ids = title_postings[term] = set()
+            ids.add(movie_id)
+        self.genre_ids.setdefault(document.genre_key, set()).add(movie_id)
+        self.genre_names[document.genre_key] = document.genre
+        if not bulk:
+            self._insert_slot(document)
+
+    def finish_bulk(self):
+        self.sorted_terms = sorted(self.postings)
+
+    def remove(self, movie_id):
+        document = self.documents.pop(movie_id, None)
+        if document is None:
+            return
+        for term in document.terms:
+            ids = self.postings[term]
+            ids.discard(movie_id)
+            if not ids:
+                del self.postings[term]
+                del self.sorted_terms[bisect_left(self.sorted_terms, term)]
+        for term in document.title_terms:
+            ids = self.title_postings[term]
+            ids.discard(movie_id)
+            if not ids:
+                del self.title_postings[term]
+        ids = self.genre_ids[document.genre_key]
+        ids.discard(movie_id)
+        if not ids:
+            del self.genre_ids[document.genre_key]
+            del self.genre_names[document.genre_key]
+        self._remove_slot(document)
+
+    def _insert_slot(self, document):
+        if self._slot_ids is None:
+            return
+        key = _browse_key(document)
+        slot = bisect_left(self._keys, key)
+        self._keys.insert(slot, key)
+        self._slot_ids.insert(slot, document.id)
+        if document.rating is not None:
+            insort(self._rated, -document.rating)
+        self._slot_of = None
+        below = (1 << slot) - 1
+        for bitmap_key, bitmap in self._bitmaps.items():
+            bit = 1 << slot if _contains(document, *bitmap_key) else 0
+            self._bitmaps[bitmap_key] = (bitmap & below) | ((bitmap >> slot) << (slot + 1)) | bit
+
+    def _remove_slot(self, document):
+        if self._slot_ids is None:
+            return
+        slot = bisect_left(self._keys, _browse_key(document))
+        del self._keys[slot]
+        del self._slot_ids[slot]
+        if document.rating is not None:
+            del self._rated[bisect_left(self._rated, -document.rating)]
+        self._slot_of = None
+        below = (1 << slot) - 1
+        for bitmap_key, bitmap in self._bitmaps.items():
+            self._bitmaps[bitmap_key] = (bitmap & below) | ((bitmap >> (slot + 1)) << slot)
+
+    def layout(self):
+        """Number the movies in browse order; slot order is the order results are returned in"""
+        if self._slot_ids is None:
+            ordered = sorted(self.documents.values(), key=_browse_key)
+            self._keys = [_browse_key(document) for document in ordered]
+            self._slot_ids = [document.id for document in ordered]
+            self._rated = [-document.rating for document in ordered if document.rating is not None]
+
+    def everything(self):
+        return (1 << len(self.documents)) - 1
+
+    def rated_at_least(self, min_rating):
+        # Rated movies take the lowest slots, highest rating first, so this is a run of low slots
+        return (1 << bisect_right(self._rated, -min_rating)) - 1
+
+    def bitmap(self, kind, key):
+        """Bitmap of movies for a term, title term, genre, or prefix (any field or title only)"""
+        bitmap = self._bitmaps.get((kind, key))
+        if bitmap is None:
+            if kind == 'term':
+                ids = self.postings.get(key, EMPTY)
+            elif kind == 'title':
+                ids = self.title_postings.get(key, EMPTY)
+            elif kind == 'genre':
+                ids = self.genre_ids.get(key, EMPTY)
+            else:
+                postings = self.title_postings if kind == 'title_prefix' else self.postings
+                ids = set()
+                position = bisect_left(self.sorted_terms, key)
+                while position < len(self.sorted_terms) and self.sorted_terms[position].startswith(key):
+                    ids |= postings.get(self.sorted_terms[position], EMPTY)
+                    position += 1
+
+            if self._slot_of is None:
+                self._slot_of = {movie_id: slot for slot, movie_id in enumerate(self._slot_ids)}
+            bits = bytearray(len(self.documents) // 8 + 1)
+            slot_of = self._slot_of
+            for movie_id in ids:
+                slot = slot_of[movie_id]
+                bits[slot >> 3] |= 1 << (slot & 7)
+            bitmap = int.from_bytes(bits, 'little')
+
+            if len(self._bitmaps) >= SEARCH_BITMAP_CACHE_SIZE:
+                self._bitmaps.clear()
+            self._bitmaps[(kind, key)] = bitmap
+        return bitmap
+
+    def first_ids(self, bitmap, count):
+        """Ids of the `count` lowest set slots, i.e. the first results in browse order"""
+        ids = []
+        while bitmap and len(ids) < count:
+            lowest = bitmap & -bitmap
+            ids.append(self._slot_ids[lowest.bit_length() - 1])
+            bitmap ^= lowest
+        return ids
+
+class MovieSearchIndex:
+    def __init__(self):
+        self._data = _IndexData()
+        self._lock = threading.Lock()
+        self._pending = None  # writes made while a rebuild is reading the database
+
+    def __len__(self):
+        return len(self._data.documents)
+
+    def upsert(self, movie):
+        document = make_document(movie.id, movie.title, movie.genre, movie.description, movie.rating)
+        with self._lock:
+            self._data.add(document)
+            if self._pending is not None:
+                self._pending.append(('add', document))
+
+    def remove(self, movie_id):
+        with self._lock:
+            self._data.remove(movie_id)
+            if self._pending is not None:
+                self._pending.append(('remove', movie_id))
+
+    def rebuild(self, load_rows):
+        """Build a fresh index from `load_rows()` (id, title, genre, description, rating tuples) and swap it in"""
+        with self._lock:
+            self._pending = []
+        try:
+            data = _IndexData()
+            for movie_id, title, genre, description, rating in load_rows():
+                data.add(make_document(movie_id, title, genre, description, rating), bulk=True)
+            data.finish_bulk()
+            with self._lock:
+                # Replay writes that committed after the rows were read
+                for operation, value in self._pending:
+                    if operation == 'add':
+                        data.add(value)
+                    else:
+                        data.remove(value)
+                data.layout()
+                self._data = data
+        finally:
+            with self._lock:
+                self._pending = None
+        return len(data.documents)
+
+    def search(self, text=None, genre=None, min_rating=None, offset=0, limit=20):
+        """Movie ids matching every word of `text`, best matches first.
+
+        The last word also matches as a prefix unless the text ends with a space,
+        so partial input works for autocomplete. Movies with every word in the
+        title rank above the rest, then by rating. Genre counts are computed
+        before the genre filter, so they show how many results each genre would give.
+        """
+        terms = tokenize(text)
+        prefix = terms.pop() if terms and text == text.rstrip() else None
+        genre_key = normalize(genre) if genre else None
+
+        with self._lock:
+            data = self._data
+            data.layout()
+
+            matches = data.everything()
+            for term in terms:
+                matches &= data.bitmap('term', term)
+            if prefix:
+                matches &= data.bitmap('prefix', prefix)
+            if min_rating is not None:
+                matches &= data.rated_at_least(min_rating)
+
+            genre_counts = {}
+            for key in data.genre_ids:
+                count = popcount(matches & data.bitmap('genre', key))
+                if count:
+                    genre_counts[data.genre_names[key]] = count
+            if genre_key is not None:
+                matches &= data.bitmap('genre', genre_key)
+
+            wanted = offset + limit
+            if terms or prefix:
+                in_title = matches
+                for term in terms:
+                    in_title &= data.bitmap('title', term)
+                if prefix:
+                    in_title &= data.bitmap('title_prefix', prefix)
+                ids = data.first_ids(in_title, wanted)
+                if len(ids) < wanted:
+                    ids += data.first_ids(matches & ~in_title, wanted - len(ids))
+            else:
+                ids = data.first_ids(matches, wanted)
+
+            return SearchResult(ids=ids[offset:], total_count=popcount(matches), genre_counts=genre_counts)
+
+movie_index = MovieSearchIndex()
+
+def start_index_refresh(app, load_rows, interval=SEARCH_INDEX_REFRESH_SECONDS):
+    """Build the index now, then rebuild it periodically in a daemon thread"""
+    with app.app_context():
+        started = time.monotonic()
+        count = movie_index.rebuild(load_rows)
+        logger.info("Movie search index built with %s movies in %.2fs", count, time.monotonic() - started)
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    movie_index.rebuild(load_rows)
+            except Exception as e:
+                logger.exception("Error rebuilding movie search index: %s", e)
+
+    if interval > 0:
+        thread = threading.Thread(target=run, name='movie-search-index-refresh', daemon=True)
+        thread.start()
+        return thread
+    return None
\ No newline at end of file
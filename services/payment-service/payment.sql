@@ -10,11 +10,25 @@ CREATE TABLE IF NOT EXISTS payments (
     amount DECIMAL(10, 2) NOT NULL,
     payment_method VARCHAR(50) DEFAULT 'CREDIT_CARD',
     status ENUM('pending', 'success', 'failed') NOT NULL DEFAULT 'pending',  -- Only 3 statuses
-    payment_proof_image TEXT,
+    payment_proof_image TEXT,  -- Legacy base64 payload, emptied by the backfill
+    payment_proof_hash CHAR(64) NULL,  -- SHA-256 of the proof file in the gateway blob store
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    expires_at DATETIME NULL,  -- Deadline while pending
     INDEX idx_user_id (user_id),
     INDEX idx_booking_id (booking_id),
     INDEX idx_status (status),
-    INDEX idx_created_at (created_at)
+    INDEX idx_created_at (created_at),
+    INDEX idx_payments_status_expires_at (status, expires_at)
+);
+
+-- Outbox of payment events, delivered by the relay thread in events.py
+CREATE TABLE IF NOT EXISTS payment_events (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    payment_id INT NOT NULL,
+    user_id INT NOT NULL,
+    event_type VARCHAR(50) NOT NULL,
+    created_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+    delivered_at DATETIME NULL,
+    INDEX ix_payment_events_delivered_at (delivered_at)
 );
\ No newline at end of file
@@ -0,0 +1,91 @@
+from models import PaymentEvent, db
+from shared.metrics import post_graphql
+import threading
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Service URLs
+COUPON_SERVICE_URL = os.getenv('COUPON_SERVICE_URL', 'http://coupon-service:3009')
+
+# Relay settings
+EVENT_RELAY_INTERVAL_SECONDS = int(os.getenv('EVENT_RELAY_INTERVAL_SECONDS', '5'))
+EVENT_RELAY_BATCH_SIZE = int(os.getenv('EVENT_RELAY_BATCH_SIZE', '200'))
+
+def deliver_payment_successes(events):
+    """Send payment.succeeded events to coupon-service's loyalty counters in one call"""
+    record_query = {
+        'query': '''
+        mutation($events: [PaymentSuccessEventInput]!) {
+            recordPaymentSuccesses(events: $events) {
+                success
+                message
+                recordedCount
+            }
+        }
+        ''',
+        'variables': {
+            'events': [{'paymentId': event.payment_id, 'userId': event.user_id} for event in events]
+        }
+    }
+
+    try:
+        response = post_graphql('coupon', f"{COUPON_SERVICE_URL}/graphql", record_query)
+        if not response.ok:
+            logger.warning("Failed to deliver %s payment events: HTTP %s", len(events), response.status_code)
+            return False
+
+        response_data = response.json()
+        record_result = (response_data.get('data') or {}).get('recordPaymentSuccesses') or {}
+        if response_data.get('errors') or not record_result.get('success'):
+            logger.warning("Failed to deliver %s payment events: %s", len(events), response_data.get('errors') or record_result.get('message'))
+            return False
+
+        return True
+    except Exception as e:
+        logger.error("Error delivering payment events: %s", e)
+        return False
+
+def relay_payment_events(batch_size=EVENT_RELAY_BATCH_SIZE):
+    """Deliver undelivered outbox events batch by batch (at least once).
+
+    Returns the number of events delivered. Stops at the first failed batch;
+    it is retried on the next run.
+    """
+    delivered_count = 0
+    while True:
+        events = PaymentEvent.claim_undelivered(batch_size)
+        if not events:
+            db.session.rollback()
+            break
+
+        success_events = [event for event in events if event.event_type == 'payment.succeeded']
+        if success_events and not deliver_payment_successes(success_events):
+            db.session.rollback()
+            break
+
+        PaymentEvent.mark_delivered([event.id for event in events])
+        delivered_count += len(events)
+        if len(events) < batch_size:
+            break
+
+    if delivered_count:
+        logger.info("Event relay delivered %s payment events", delivered_count)
+    return delivered_count
+
+def start_event_relay(app, interval=EVENT_RELAY_INTERVAL_SECONDS):
+    """Run relay_payment_events periodically in a daemon thread"""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    relay_payment_events()
+            except Exception as e:
+                logger.exception("Error in payment event relay: %s", e)
+
+    thread = threading.Thread(target=run, name='payment-event-relay', daemon=True)
+    thread.start()
+    return thread
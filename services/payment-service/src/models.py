@@ -1,8 +1,19 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy.orm import deferred
 from datetime import datetime, timedelta
+import logging
+import os
+
+logger = logging.getLogger(__name__)
 
 db = SQLAlchemy()
 
+# How long a payment may stay pending before the sweeper marks it failed
+PAYMENT_EXPIRY_MINUTES = int(os.getenv('PAYMENT_EXPIRY_MINUTES', '1440'))
+
+def default_payment_expiry():
+    return datetime.utcnow() + timedelta(minutes=PAYMENT_EXPIRY_MINUTES)
+
 class Payment(db.Model):
     __tablename__ = 'payments'
 
@@ -13,9 +24,17 @@ class Payment(db.Model):
     payment_method = db.Column(db.String(50), default='CREDIT_CARD')
     status = db.Column(db.Enum('pending', 'success', 'failed', name='payment_status_enum'), 
                       nullable=False, default='pending')  # Only 3 statuses
-    payment_proof_image = db.Column(db.Text, nullable=True)
+    # Legacy base64 payload, emptied by the backfill. Deferred so row loads skip it unless asked for
+    payment_proof_image = deferred(db.Column(db.Text, nullable=True))
+    payment_proof_hash = db.Column(db.String(64), nullable=True)  # SHA-256 of the proof file in the gateway blob store
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=True, default=default_payment_expiry)  # Deadline while pending
+
+    # Expiry lookups range-scan (status, expires_at) instead of filtering every pending payment in Python
+    __table_args__ = (
+        db.Index('idx_payments_status_expires_at', 'status', 'expires_at'),
+    )
 
     @classmethod
     def get_by_booking(cls, booking_id):
@@ -26,6 +45,12 @@ class Payment(db.Model):
     def get_by_user(cls, user_id):
         return cls.query.filter_by(user_id=user_id).all()
     
+    def set_status(self, status):
+        """Change status; a transition to success queues a payment.succeeded event in the same transaction"""
+        if status == 'success' and self.status != 'success':
+            db.session.add(PaymentEvent(payment_id=self.id, user_id=self.user_id, event_type='payment.succeeded'))
+        self.status = status
+
     def save(self):
         try:
             db.session.add(self)
@@ -33,10 +58,118 @@ class Payment(db.Model):
             return True
         except Exception as e:
             db.session.rollback()
-            print(f"Error saving payment: {e}")
+            logger.error("Error saving payment: %s", e)
             return False
 
+    def is_expired(self):
+        """Check if a pending payment is past its deadline"""
+        return self.status == 'pending' and self.expires_at is not None and self.expires_at <= datetime.utcnow()
+
+    @classmethod
+    def get_expired(cls, limit=None, options=()):
+        """Get pending payments past their deadline, oldest deadline first"""
+        query = cls.query.options(*options).filter(
+            cls.status == 'pending',
+            cls.expires_at <= datetime.utcnow()
+        ).order_by(cls.expires_at)
+        if limit:
+            query = query.limit(limit)
+        return query.all()
+
+    @classmethod
+    def fail_expired(cls, limit):
+        """Mark up to `limit` expired pending payments as failed and return their IDs"""
+        rows = (db.session.query(cls.id)
+                .filter(cls.status == 'pending', cls.expires_at <= datetime.utcnow())
+                .order_by(cls.expires_at)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all())
+        payment_ids = [row.id for row in rows]
+        if payment_ids:
+            cls.query.filter(cls.id.in_(payment_ids)).update(
+                {'status': 'failed'}, synchronize_session=False
+            )
+        db.session.commit()
+        return payment_ids
+
+    @classmethod
+    def update_statuses(cls, payment_ids, status, from_status=None, queue_events=True):
+        """Set the status of many payments with one UPDATE and return the IDs that changed.
+
+        With `from_status`, only payments currently in that status are touched, so
+        concurrent or repeated approvals do not update a payment twice. With
+        `queue_events=False` no payment.succeeded events are queued; the caller queues
+        them with queue_succeeded_events once the change is final.
+        """
+        query = db.session.query(cls.id, cls.user_id).filter(cls.id.in_(payment_ids), cls.status != status)
+        if from_status:
+            query = query.filter(cls.status == from_status)
+        rows = query.with_for_update().all()
+        changed_ids = [row.id for row in rows]
+        if changed_ids:
+            cls.query.filter(cls.id.in_(changed_ids)).update(
+                {'status': status, 'updated_at': datetime.utcnow()}, synchronize_session=False
+            )
+            if status == 'success' and queue_events:
+                db.session.bulk_insert_mappings(PaymentEvent, [
+                    {'payment_id': row.id, 'user_id': row.user_id, 'event_type': 'payment.succeeded'}
+                    for row in rows
+                ])
+        db.session.commit()
+        return changed_ids
+
+    @classmethod
+    def queue_succeeded_events(cls, payment_ids):
+        """Queue payment.succeeded for the successful payments among `payment_ids` that have
+        none yet, and return their IDs"""
+        queued = db.session.query(PaymentEvent.payment_id).filter(
+            PaymentEvent.payment_id.in_(payment_ids),
+            PaymentEvent.event_type == 'payment.succeeded'
+        )
+        rows = (db.session.query(cls.id, cls.user_id)
+                .filter(cls.id.in_(payment_ids), cls.status == 'success', ~cls.id.in_(queued))
+                .all())
+        if rows:
+            db.session.bulk_insert_mappings(PaymentEvent, [
+                {'payment_id': row.id, 'user_id': row.user_id, 'event_type': 'payment.succeeded'}
+                for row in rows
+            ])
+        db.session.commit()
+        return [row.id for row in rows]
+
     def can_be_deleted_by_user(self):
         """Check if payment can be deleted (only failed payments within 2 hours)"""
         time_diff = datetime.utcnow() - self.created_at
-        return self.status == 'failed' and time_diff <= timedelta(hours=2)
\ No newline at end of file
+        return self.status == 'failed' and time_diff <= timedelta(hours=2)
+
+class PaymentEvent(db.Model):
+    """Outbox of payment events, written in the same transaction as the status change.
+
+    The relay in events.py delivers undelivered rows to their consumers.
+    """
+    __tablename__ = 'payment_events'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    payment_id = db.Column(db.Integer, nullable=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    event_type = db.Column(db.String(50), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    delivered_at = db.Column(db.DateTime, nullable=True, index=True)
+
+    @classmethod
+    def claim_undelivered(cls, limit):
+        """Lock up to `limit` undelivered events, oldest first, skipping rows another relay holds"""
+        return (cls.query
+                .filter(cls.delivered_at.is_(None))
+                .order_by(cls.id)
+                .limit(limit)
+                .with_for_update(skip_locked=True)
+                .all())
+
+    @classmethod
+    def mark_delivered(cls, event_ids):
+        cls.query.filter(cls.id.in_(event_ids)).update(
+            {'delivered_at': datetime.utcnow()}, synchronize_session=False
+        )
+        db.session.commit()
\ No newline at end of file
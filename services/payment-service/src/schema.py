@@ -1,7 +1,12 @@
 from graphene import ObjectType, String, Int, Float, List, Field, Mutation, Schema, Boolean
 from models import Payment, db
+from shared.resolvers import keyset_page, selected_fields
+from sqlalchemy.orm import load_only, undefer
+from sweeper import sweep_expired_payments, PAYMENT_SWEEP_BATCH_SIZE
 from datetime import datetime
-import traceback
+import logging
+
+logger = logging.getLogger(__name__)
 
 class PaymentType(ObjectType):
     id = Int()
@@ -11,8 +16,10 @@ class PaymentType(ObjectType):
     paymentMethod = String()
     status = String()  # pending, success, failed
     paymentProofImage = String()
+    paymentProofHash = String()
     createdAt = String()
     updatedAt = String()
+    expiresAt = String()
     canBeDeleted = Boolean()
     
     def resolve_userId(self, info):
@@ -27,6 +34,9 @@ class PaymentType(ObjectType):
     def resolve_paymentProofImage(self, info):
         return self.payment_proof_image if hasattr(self, 'payment_proof_image') else getattr(self, 'paymentProofImage', None)
         
+    def resolve_paymentProofHash(self, info):
+        return self.payment_proof_hash if hasattr(self, 'payment_proof_hash') else getattr(self, 'paymentProofHash', None)
+
     def resolve_createdAt(self, info):
         if hasattr(self, 'created_at') and self.created_at:
             return self.created_at.isoformat()
@@ -37,6 +47,11 @@ class PaymentType(ObjectType):
             return self.updated_at.isoformat()
         return getattr(self, 'updatedAt', None)
     
+    def resolve_expiresAt(self, info):
+        if hasattr(self, 'expires_at') and self.expires_at:
+            return self.expires_at.isoformat()
+        return getattr(self, 'expiresAt', None)
+
     def resolve_canBeDeleted(self, info):
         if hasattr(self, 'can_be_deleted_by_user'):
             return self.can_be_deleted_by_user()
@@ -74,7 +89,7 @@ class UpdatePaymentStatus(Mutation):
                 )
 
             old_status = payment.status
-            payment.status = status
+            payment.set_status(status)
             payment.save()
 
             return UpdatePaymentStatusResponse(
@@ -83,7 +98,7 @@ class UpdatePaymentStatus(Mutation):
                 message=f"Payment status updated from '{old_status}' to '{status}'"
             )
         except Exception as e:
-            traceback.print_exc()
+            logger.exception("Error in UpdatePaymentStatus.mutate")
             db.session.rollback()
             return UpdatePaymentStatusResponse(
                 payment=None,
@@ -91,6 +106,86 @@ class UpdatePaymentStatus(Mutation):
                 message=f"Error updating payment status: {str(e)}"
             )
             
+class UpdatePaymentStatusesResponse(ObjectType):
+    payments = List(PaymentType)
+    success = Boolean()
+    message = String()
+    updatedCount = Int()
+
+class UpdatePaymentStatuses(Mutation):
+    """Set the status of many payments in one statement instead of one updatePaymentStatus call each"""
+    class Arguments:
+        ids = List(Int, required=True)
+        status = String(required=True)  # pending, success, failed
+        fromStatus = String()  # Only update payments currently in this status
+        queueEvents = Boolean()  # False: leave payment.succeeded to queuePaymentEvents
+
+    Output = UpdatePaymentStatusesResponse
+
+    def mutate(self, info, ids, status, fromStatus=None, queueEvents=True):
+        try:
+            valid_statuses = ['pending', 'success', 'failed']
+            for value in (status, fromStatus):
+                if value is not None and value not in valid_statuses:
+                    return UpdatePaymentStatusesResponse(
+                        payments=[],
+                        success=False,
+                        message=f"Invalid status '{value}'. Valid statuses are: {', '.join(valid_statuses)}",
+                        updatedCount=0
+                    )
+
+            if not ids:
+                return UpdatePaymentStatusesResponse(payments=[], success=True, message="No payments given", updatedCount=0)
+
+            changed_ids = Payment.update_statuses(ids, status, fromStatus, queue_events=queueEvents is not False)
+            payments = Payment.query.filter(Payment.id.in_(changed_ids)).order_by(Payment.id).all() if changed_ids else []
+
+            return UpdatePaymentStatusesResponse(
+                payments=payments,
+                success=True,
+                message=f"Updated {len(changed_ids)} of {len(ids)} payments to '{status}'",
+                updatedCount=len(changed_ids)
+            )
+        except Exception as e:
+            logger.exception("Error in UpdatePaymentStatuses.mutate")
+            db.session.rollback()
+            return UpdatePaymentStatusesResponse(
+                payments=[],
+                success=False,
+                message=f"Error updating payment statuses: {str(e)}",
+                updatedCount=0
+            )
+
+class QueuePaymentEventsResponse(ObjectType):
+    success = Boolean()
+    message = String()
+    queuedPaymentIds = List(Int)
+
+class QueuePaymentEvents(Mutation):
+    """Queue payment.succeeded for successful payments that have no event yet (after updatePaymentStatuses
+    with queueEvents: false, once the caller's own step succeeded). Repeating the call queues nothing new."""
+    class Arguments:
+        ids = List(Int, required=True)
+
+    Output = QueuePaymentEventsResponse
+
+    def mutate(self, info, ids):
+        try:
+            queued_ids = Payment.queue_succeeded_events(ids) if ids else []
+            return QueuePaymentEventsResponse(
+                success=True,
+                message=f"Queued events for {len(queued_ids)} of {len(ids)} payments",
+                queuedPaymentIds=queued_ids
+            )
+        except Exception as e:
+            logger.exception("Error in QueuePaymentEvents.mutate")
+            db.session.rollback()
+            return QueuePaymentEventsResponse(
+                success=False,
+                message=f"Error queueing payment events: {str(e)}",
+                queuedPaymentIds=[]
+            )
+
 class CreatePaymentResponse(ObjectType):
     payment = Field(PaymentType)
     success = Boolean()
@@ -103,10 +198,11 @@ class CreatePayment(Mutation):
         amount = Float(required=True)
         paymentMethod = String()
         paymentProofImage = String()
+        paymentProofHash = String()
 
     Output = CreatePaymentResponse
 
-    def mutate(self, info, userId, bookingId, amount, paymentMethod='CREDIT_CARD', paymentProofImage=None):
+    def mutate(self, info, userId, bookingId, amount, paymentMethod='CREDIT_CARD', paymentProofImage=None, paymentProofHash=None):
         try:
             # Check if payment already exists for this booking
             existing_payment = Payment.get_by_booking(bookingId)
@@ -123,13 +219,14 @@ class CreatePayment(Mutation):
                 booking_id=bookingId,     # Map camelCase to snake_case
                 amount=amount,
                 payment_method=paymentMethod,     # Map camelCase to snake_case
-                payment_proof_image=paymentProofImage  # Map camelCase to snake_case
+                payment_proof_image=paymentProofImage,  # Map camelCase to snake_case
+                payment_proof_hash=paymentProofHash
             )
             
             if payment.save():
                 # Debug: Print payment data before returning
-                print(f"Created payment: id={payment.id}, user_id={payment.user_id}, booking_id={payment.booking_id}")
-                print(f"Payment object attributes: {vars(payment)}")
+                logger.debug("Created payment: id=%s, user_id=%s, booking_id=%s", payment.id, payment.user_id, payment.booking_id)
+                logger.debug("Payment object attributes: %s", vars(payment))
                 
                 return CreatePaymentResponse(
                     payment=payment,
@@ -145,8 +242,7 @@ class CreatePayment(Mutation):
                 
         except Exception as e:
             db.session.rollback()
-            print(f"Error creating payment: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error creating payment: %s", e)
             return CreatePaymentResponse(
                 payment=None,
                 success=False,
@@ -163,10 +259,11 @@ class UpdatePayment(Mutation):
         id = Int(required=True)
         status = String()
         payment_proof_image = String()
+        payment_proof_hash = String()
 
     Output = UpdatePaymentResponse
 
-    def mutate(self, info, id, status=None, payment_proof_image=None):
+    def mutate(self, info, id, status=None, payment_proof_image=None, payment_proof_hash=None):
         try:
             payment = Payment.query.get(id)
             if not payment:
@@ -177,9 +274,12 @@ class UpdatePayment(Mutation):
                 )
             
             if status:
-                payment.status = status
+                payment.set_status(status)
             if payment_proof_image:
                 payment.payment_proof_image = payment_proof_image
+            if payment_proof_hash:
+                payment.payment_proof_hash = payment_proof_hash
+                payment.payment_proof_image = None  # The blob store now holds the file
                 
             payment.save()
             
@@ -189,7 +289,7 @@ class UpdatePayment(Mutation):
                 message="Payment updated successfully"
             )
         except Exception as e:
-            traceback.print_exc()
+            logger.exception("Error in UpdatePayment.mutate")
             db.session.rollback()
             return UpdatePaymentResponse(
                 payment=None,
@@ -228,69 +328,133 @@ class DeletePayment(Mutation):
                 message="Payment deleted successfully"
             )
         except Exception as e:
-            traceback.print_exc()
+            logger.exception("Error in DeletePayment.mutate")
             db.session.rollback()
             return DeletePaymentResponse(
                 success=False,
                 message=f"Error deleting payment: {str(e)}"
             )
 
+class ExpirePaymentsResponse(ObjectType):
+    success = Boolean()
+    message = String()
+    expiredCount = Int()
+
+class ExpirePayments(Mutation):
+    """Run the payment expiry sweep now instead of waiting for the next interval"""
+    class Arguments:
+        batchSize = Int()
+
+    Output = ExpirePaymentsResponse
+
+    def mutate(self, info, batchSize=None):
+        try:
+            expired_count = sweep_expired_payments(batchSize or PAYMENT_SWEEP_BATCH_SIZE)
+            return ExpirePaymentsResponse(
+                success=True,
+                message=f"Marked {expired_count} expired payments as failed",
+                expiredCount=expired_count
+            )
+        except Exception as e:
+            logger.exception("Error in ExpirePayments.mutate")
+            db.session.rollback()
+            return ExpirePaymentsResponse(
+                success=False,
+                message=f"Error expiring payments: {str(e)}",
+                expiredCount=0
+            )
+
+def parse_date_filter(value):
+    """Parse an ISO date/datetime filter argument (YYYY-MM-DD or YYYY-MM-DDTHH:MM:SS)"""
+    return datetime.fromisoformat(value.replace('Z', '+00:00')).replace(tzinfo=None)
+
+# Model columns read by each PaymentType field
+PAYMENT_FIELD_COLUMNS = {
+    'id': ['id'],
+    'userId': ['user_id'],
+    'bookingId': ['booking_id'],
+    'amount': ['amount'],
+    'paymentMethod': ['payment_method'],
+    'status': ['status'],
+    'paymentProofImage': ['payment_proof_image'],
+    'paymentProofHash': ['payment_proof_hash'],
+    'createdAt': ['created_at'],
+    'updatedAt': ['updated_at'],
+    'expiresAt': ['expires_at'],
+    'canBeDeleted': ['status', 'created_at']
+}
+
+def payment_load_options(info):
+    """Loader options that fetch only the columns the GraphQL selection needs"""
+    columns = {'id'}
+    for field_name in selected_fields(info):
+        columns.update(PAYMENT_FIELD_COLUMNS.get(field_name, []))
+
+    options = [load_only(*[getattr(Payment, column) for column in sorted(columns)])]
+    if 'payment_proof_image' in columns:
+        options.append(undefer(Payment.payment_proof_image))
+    return options
+
 class Query(ObjectType):
-    payments = List(PaymentType)
+    payments = List(PaymentType, first=Int(), after=Int(), status=String(), fromDate=String(), toDate=String())
     payment = Field(PaymentType, id=Int(required=True))
-    user_payments = List(PaymentType, userId=Int(required=True))  # ← Changed from user_id to userId
-    pending_payments = List(PaymentType)
-    expired_payments = List(PaymentType)
+    user_payments = List(PaymentType, userId=Int(required=True), first=Int(), after=Int())  # ← Changed from user_id to userId
+    pending_payments = List(PaymentType, first=Int(), after=Int())
+    expired_payments = List(PaymentType, limit=Int())
 
-    def resolve_payments(self, info):
+    def resolve_payments(self, info, first=None, after=None, status=None, fromDate=None, toDate=None):
         try:
-            return Payment.query.all()
+            query = Payment.query.options(*payment_load_options(info))
+            if status:
+                query = query.filter(Payment.status == status)
+            if fromDate:
+                query = query.filter(Payment.created_at >= parse_date_filter(fromDate))
+            if toDate:
+                query = query.filter(Payment.created_at < parse_date_filter(toDate))
+            return keyset_page(query, Payment.id, first, after).all()
         except Exception as e:
-            print(f"Error in resolve_payments: {str(e)}")
-            traceback.print_exc()
-            return []
+            logger.exception("Error in resolve_payments: %s", e)
+            raise Exception(f"Error fetching payments: {str(e)}")  # An empty page would read as the end of an export
         
     def resolve_payment(self, info, id):
         try:
-            return Payment.query.get(id)
+            return Payment.query.options(*payment_load_options(info)).get(id)
         except Exception as e:
-            print(f"Error in resolve_payment: {str(e)}")
+            logger.error("Error in resolve_payment: %s", e)
             return None
     
-    def resolve_user_payments(self, info, userId):
+    def resolve_user_payments(self, info, userId, first=None, after=None):
         try:
-            payments = Payment.query.filter(Payment.user_id == userId).all()
-            print(f"Found {len(payments)} payments for user {userId}")
-            for payment in payments:
-                print(f"Payment {payment.id}: booking_id={payment.booking_id}, user_id={payment.user_id}")
+            query = Payment.query.options(*payment_load_options(info)).filter(Payment.user_id == userId)
+            payments = keyset_page(query, Payment.id, first, after).all()
+            logger.debug("Found %s payments for user %s", len(payments), userId)
             return payments
         except Exception as e:
-            print(f"Error in resolve_user_payments: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error in resolve_user_payments: %s", e)
             return []
     
-    def resolve_pending_payments(self, info):
+    def resolve_pending_payments(self, info, first=None, after=None):
         try:
-            return Payment.query.filter_by(status='pending').all()
+            query = Payment.query.options(*payment_load_options(info)).filter_by(status='pending')
+            return keyset_page(query, Payment.id, first, after).all()
         except Exception as e:
-            print(f"Error in resolve_pending_payments: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error in resolve_pending_payments: %s", e)
             return []
     
-    def resolve_expired_payments(self, info):
+    def resolve_expired_payments(self, info, limit=None):
         try:
-            all_pending = Payment.query.filter_by(status='pending').all()
-            expired = [p for p in all_pending if hasattr(p, 'is_expired') and p.is_expired()]
-            return expired
+            return Payment.get_expired(limit, options=payment_load_options(info))
         except Exception as e:
-            print(f"Error in resolve_expired_payments: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error in resolve_expired_payments: %s", e)
             return []
 
 class Mutation(ObjectType):
     create_payment = CreatePayment.Field()
     updatePaymentStatus = UpdatePaymentStatus.Field()
+    updatePaymentStatuses = UpdatePaymentStatuses.Field()
+    queuePaymentEvents = QueuePaymentEvents.Field()
     update_payment = UpdatePayment.Field()
     delete_payment = DeletePayment.Field()
+    expirePayments = ExpirePayments.Field()
 
 schema = Schema(query=Query, mutation=Mutation)
\ No newline at end of file
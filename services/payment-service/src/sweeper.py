@@ -0,0 +1,42 @@
+from models import Payment
+import threading
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Sweeper settings
+PAYMENT_SWEEP_INTERVAL_SECONDS = int(os.getenv('PAYMENT_SWEEP_INTERVAL_SECONDS', '60'))
+PAYMENT_SWEEP_BATCH_SIZE = int(os.getenv('PAYMENT_SWEEP_BATCH_SIZE', '500'))
+
+def sweep_expired_payments(batch_size=PAYMENT_SWEEP_BATCH_SIZE):
+    """Mark expired pending payments as failed batch by batch.
+
+    Returns the number of payments expired in this sweep.
+    """
+    expired_count = 0
+    while True:
+        payment_ids = Payment.fail_expired(batch_size)
+        expired_count += len(payment_ids)
+        if len(payment_ids) < batch_size:
+            break
+
+    if expired_count:
+        logger.info("Payment sweeper marked %s expired payments as failed", expired_count)
+    return expired_count
+
+def start_payment_sweeper(app, interval=PAYMENT_SWEEP_INTERVAL_SECONDS):
+    """Run sweep_expired_payments periodically in a daemon thread"""
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                with app.app_context():
+                    sweep_expired_payments()
+            except Exception as e:
+                logger.exception("Error in payment sweeper: %s", e)
+
+    thread = threading.Thread(target=run, name='payment-sweeper', daemon=True)
+    thread.start()
+    return thread
@@ -1,14 +1,17 @@
 from datetime import datetime, timedelta
+import logging
 import jwt
 from flask import request, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
 from models import User
+from cache import get_cached_role
+from keys import key_ring, JWT_ALGORITHM
 from functools import wraps
 import os
 
-# JWT Secret Key
-JWT_SECRET = os.getenv('JWT_SECRET', 'your-secret-key-here-change-in-production')
-JWT_ALGORITHM = 'HS256'
+logger = logging.getLogger(__name__)
+
+# Tokens are signed with the key ring's active Ed25519 key (see keys.py)
 JWT_EXPIRATION_DELTA = timedelta(days=1)
 
 def create_token(user_id):
@@ -25,10 +28,12 @@ def create_token(user_id):
             'iat': datetime.utcnow()
         }
         
-        token = jwt.encode(payload, JWT_SECRET, algorithm=JWT_ALGORITHM)
+        signing_key = key_ring.signing_key()
+        token = jwt.encode(payload, signing_key.private_key, algorithm=JWT_ALGORITHM,
+                           headers={'kid': signing_key.kid})
         return token
     except Exception as e:
-        print(f"Error creating token: {str(e)}")
+        logger.error("Error creating token: %s", e)
         return None
 
 def verify_token(token):
@@ -41,11 +46,19 @@ def verify_token(token):
         if token.startswith('Bearer '):
             token = token[7:]
             
-        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        kid = jwt.get_unverified_header(token).get('kid')
+        public_key = key_ring.public_key(kid)
+        if public_key is None:
+            # Possibly generated by another replica since our last reload
+            key_ring.reload()
+            public_key = key_ring.public_key(kid)
+        if public_key is None:
+            return {'valid': False, 'error': 'Invalid token'}
         
-        # Check if user still exists
-        user = User.get_by_id(payload['user_id'])
-        if not user:
+        payload = jwt.decode(token, public_key, algorithms=[JWT_ALGORITHM])
+        
+        # Check if user still exists (cached, invalidated on update/delete)
+        if get_cached_role(payload['user_id'], User.get_role) is None:
             return {'valid': False, 'error': 'User not found'}
             
         return {
@@ -58,7 +71,7 @@ def verify_token(token):
     except jwt.InvalidTokenError:
         return {'valid': False, 'error': 'Invalid token'}
     except Exception as e:
-        print(f"Error verifying token: {str(e)}")
+        logger.warning("Error verifying token: %s", e)
         return {'valid': False, 'error': f'Token verification failed: {str(e)}'}
 
 def require_role(required_role):
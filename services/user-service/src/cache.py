@@ -0,0 +1,14 @@
+from shared.cache import BoundedCache
+import os
+
+# Token verification looks users up on every request; cache existence and role briefly.
+# UpdateUser/DeleteUser invalidate entries, the TTL bounds staleness across workers.
+USER_CACHE_TTL_SECONDS = float(os.getenv('USER_CACHE_TTL_SECONDS', '60'))
+USER_CACHE_MAX_SIZE = int(os.getenv('USER_CACHE_MAX_SIZE', '10000'))
+
+# user_id -> role, or None for a user that does not exist
+user_role_cache = BoundedCache('user_roles', USER_CACHE_MAX_SIZE, USER_CACHE_TTL_SECONDS)
+
+def get_cached_role(user_id, loader):
+    """Role of a user from cache, calling `loader(user_id)` on a miss. None if the user does not exist."""
+    return user_role_cache.get(user_id, loader)
\ No newline at end of file
@@ -0,0 +1,148 @@
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey
+from cryptography.hazmat.primitives import serialization
+import threading
+import secrets
+import logging
+import base64
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Ed25519 signing keys live as <kid>.pem files in a directory shared by all user-service
+# replicas. Consumers verify tokens locally against the public keys from /.well-known/jwks.json.
+JWT_KEYS_DIR = os.getenv('JWT_KEYS_DIR', '/app/keys')
+JWT_KEY_ROTATION_DAYS = float(os.getenv('JWT_KEY_ROTATION_DAYS', '30'))
+# A new key is published this long before it signs anything, so consumers' cached key sets pick it up first
+JWT_KEY_ACTIVATION_DELAY_SECONDS = int(os.getenv('JWT_KEY_ACTIVATION_DELAY_SECONDS', '600'))
+# A replaced key stays published this long after its successor took over; must exceed the token lifetime
+JWT_KEY_OVERLAP_SECONDS = int(os.getenv('JWT_KEY_OVERLAP_SECONDS', str(2 * 24 * 3600)))
+JWT_KEY_CHECK_INTERVAL_SECONDS = int(os.getenv('JWT_KEY_CHECK_INTERVAL_SECONDS', '3600'))
+
+JWT_ALGORITHM = 'EdDSA'
+
+def _b64url(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+class SigningKey:
+    def __init__(self, kid, created_at, private_key):
+        self.kid = kid
+        self.created_at = created_at
+        self.private_key = private_key
+        self.public_key = private_key.public_key()
+
+    def to_jwk(self):
+        raw = self.public_key.public_bytes(serialization.Encoding.Raw, serialization.PublicFormat.Raw)
+        return {'kty': 'OKP', 'crv': 'Ed25519', 'x': _b64url(raw), 'kid': self.kid, 'alg': JWT_ALGORITHM, 'use': 'sig'}
+
+class KeyRing:
+    """Signing keys from a directory, newest active key first, with time-based rotation"""
+
+    def __init__(self, keys_dir):
+        self.keys_dir = keys_dir
+        self._keys = []  # sorted by created_at, oldest first
+        self._lock = threading.Lock()
+
+    def reload(self):
+        """Pick up keys added or removed by other replicas"""
+        loaded = {key.kid: key for key in self._keys}
+        keys = []
+        for filename in sorted(os.listdir(self.keys_dir)):
+            if not filename.endswith('.pem'):
+                continue
+            kid = filename[:-len('.pem')]
+            if kid in loaded:
+                keys.append(loaded[kid])
+                continue
+            try:
+                with open(os.path.join(self.keys_dir, filename), 'rb') as key_file:
+                    private_key = serialization.load_pem_private_key(key_file.read(), password=None)
+                keys.append(SigningKey(kid, int(kid.split('-')[0]), private_key))
+            except Exception as e:
+                logger.warning("Skipping unreadable signing key %s: %s", filename, e)
+        keys.sort(key=lambda key: key.created_at)
+        with self._lock:
+            self._keys = keys
+
+    def generate(self, now=None):
+        """Create a new key file; it starts signing after the activation delay"""
+        now = int(now or time.time())
+        kid = f"{now}-{secrets.token_hex(4)}"
+        pem = Ed25519PrivateKey.generate().private_bytes(
+            serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+        )
+        os.makedirs(self.keys_dir, exist_ok=True)
+        path = os.path.join(self.keys_dir, f"{kid}.pem")
+        tmp_path = f"{path}.tmp"
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as key_file:
+            key_file.write(pem)
+        os.replace(tmp_path, path)
+        logger.info("Generated JWT signing key %s", kid)
+        return kid
+
+    def signing_key(self, now=None):
+        """Newest key past its activation delay (the newest key at all on a fresh install)"""
+        now = now or time.time()
+        with self._lock:
+            keys = list(self._keys)
+        if not keys:
+            raise RuntimeError("No JWT signing keys available")
+        active = [key for key in keys if key.created_at + JWT_KEY_ACTIVATION_DELAY_SECONDS <= now]
+        return active[-1] if active else keys[-1]
+
+    def public_key(self, kid):
+        with self._lock:
+            for key in self._keys:
+                if key.kid == kid:
+                    return key.public_key
+        return None
+
+    def jwks(self):
+        with self._lock:
+            return {'keys': [key.to_jwk() for key in self._keys]}
+
+    def rotate_if_due(self, now=None):
+        """Generate a key when the newest is older than the rotation period and delete keys
+        whose successor has been signing for longer than the overlap window"""
+        now = now or time.time()
+        os.makedirs(self.keys_dir, exist_ok=True)
+        self.reload()
+        with self._lock:
+            keys = list(self._keys)
+
+        if not keys or keys[-1].created_at + JWT_KEY_ROTATION_DAYS * 86400 <= now:
+            self.generate(now)
+            self.reload()
+            with self._lock:
+                keys = list(self._keys)
+
+        removed = False
+        for key, successor in zip(keys, keys[1:]):
+            if successor.created_at + JWT_KEY_ACTIVATION_DELAY_SECONDS + JWT_KEY_OVERLAP_SECONDS <= now:
+                try:
+                    os.remove(os.path.join(self.keys_dir, f"{key.kid}.pem"))
+                    logger.info("Retired JWT signing key %s", key.kid)
+                except FileNotFoundError:
+                    pass  # Another replica retired it first
+                removed = True
+        if removed:
+            self.reload()
+
+key_ring = KeyRing(JWT_KEYS_DIR)
+
+def start_key_rotation(interval=JWT_KEY_CHECK_INTERVAL_SECONDS):
+    """Make sure a signing key exists, then check for rotation periodically in a daemon thread"""
+    key_ring.rotate_if_due()
+
+    def run():
+        while True:
+            time.sleep(interval)
+            try:
+                key_ring.rotate_if_due()
+            except Exception as e:
+                logger.exception("Error rotating JWT signing keys: %s", e)
+
+    thread = threading.Thread(target=run, name='jwt-key-rotation', daemon=True)
+    thread.start()
+    return thread
\ No newline at end of file
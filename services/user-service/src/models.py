@@ -1,5 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
+from passwords import hash_password, verify_password, needs_rehash
+from cache import user_role_cache
 from datetime import datetime
 
 db = SQLAlchemy()
@@ -16,23 +17,46 @@ class User(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # Added missing column
     
     def set_password(self, password):
-        self.hashed_password = generate_password_hash(password)  # Changed to hashed_password
+        self.hashed_password = hash_password(password)  # Hashed in the password worker pool
     
     def check_password(self, password):
-        return check_password_hash(self.hashed_password, password)  # Changed to hashed_password
+        return verify_password(self.hashed_password, password)  # Verified in the password worker pool
+
+    def password_needs_rehash(self):
+        return needs_rehash(self.hashed_password)
     
     def save(self):
         db.session.add(self)
         db.session.commit()
+        user_role_cache.invalidate(self.id)
     
     def delete(self):
+        user_id = self.id
         db.session.delete(self)
         db.session.commit()
+        user_role_cache.invalidate(user_id)
     
     @classmethod
     def get_by_id(cls, user_id):
         return cls.query.get(user_id)
     
+    @classmethod
+    def get_by_ids(cls, user_ids):
+        """Load many users with one IN query, returned in the order of `user_ids` (unknown IDs skipped)"""
+        unique_ids = list(dict.fromkeys(user_ids))
+        if not unique_ids:
+            return []
+        users_by_id = {user.id: user for user in cls.query.filter(cls.id.in_(unique_ids)).all()}
+        return [users_by_id[user_id] for user_id in unique_ids if user_id in users_by_id]
+
+    @classmethod
+    def get_role(cls, user_id):
+        """Role of a user, or None if the user does not exist (reads only the role column)"""
+        row = db.session.query(cls.role).filter(cls.id == user_id).first()
+        if row is None:
+            return None
+        return row.role or 'USER'
+
     @classmethod
     def get_by_email(cls, email):
         return cls.query.filter_by(email=email).first()
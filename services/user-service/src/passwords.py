@@ -0,0 +1,79 @@
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from werkzeug.security import generate_password_hash, check_password_hash
+import threading
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# Hash parameters. Changing them takes effect for new passwords immediately and
+# for existing users on their next successful login (rehash-on-login).
+PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+PASSWORD_SALT_LENGTH = int(os.getenv('PASSWORD_SALT_LENGTH', '16'))
+
+# Pool settings. 0 workers hashes inline on the request thread.
+PASSWORD_POOL_WORKERS = int(os.getenv('PASSWORD_POOL_WORKERS', str(os.cpu_count() or 1)))
+PASSWORD_POOL_MAX_PENDING = int(os.getenv('PASSWORD_POOL_MAX_PENDING', str(max(PASSWORD_POOL_WORKERS, 1) * 4)))
+PASSWORD_POOL_TIMEOUT_SECONDS = float(os.getenv('PASSWORD_POOL_TIMEOUT_SECONDS', '10'))
+
+class PasswordHasherBusy(Exception):
+    """Raised instead of queueing when too many hash operations are already pending"""
+    pass
+
+_pool = None
+_pool_lock = threading.Lock()
+_pending = threading.BoundedSemaphore(max(PASSWORD_POOL_MAX_PENDING, 1))
+
+def _hash(password, method, salt_length):
+    return generate_password_hash(password, method=method, salt_length=salt_length)
+
+def _verify(hashed_password, password):
+    return check_password_hash(hashed_password, password)
+
+def start_password_pool():
+    """Start the worker processes.
+
+    Call this at startup, before the server starts its request threads, so the
+    workers are forked from a single-threaded process.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None and PASSWORD_POOL_WORKERS > 0:
+            _pool = ProcessPoolExecutor(max_workers=PASSWORD_POOL_WORKERS)
+            _pool.submit(int).result()  # Forks all workers now instead of on the first login
+            logger.info("Password hashing pool started with %s workers", PASSWORD_POOL_WORKERS)
+    return _pool
+
+def _run(fn, *args):
+    pool = _pool or start_password_pool()
+    if pool is None:
+        return fn(*args)
+
+    # Reject immediately rather than letting a login storm queue up unbounded work
+    if not _pending.acquire(blocking=False):
+        raise PasswordHasherBusy("Too many concurrent password operations, please retry shortly")
+    try:
+        future = pool.submit(fn, *args)
+    except Exception:
+        _pending.release()
+        raise
+    future.add_done_callback(lambda _: _pending.release())
+
+    try:
+        return future.result(timeout=PASSWORD_POOL_TIMEOUT_SECONDS)
+    except FutureTimeoutError:
+        raise PasswordHasherBusy("Password operation timed out, please retry shortly")
+
+def hash_password(password):
+    return _run(_hash, password, PASSWORD_HASH_METHOD, PASSWORD_SALT_LENGTH)
+
+def verify_password(hashed_password, password):
+    return _run(_verify, hashed_password, password)
+
+def needs_rehash(hashed_password):
+    """True if a stored hash was made with parameters other than the current ones"""
+    try:
+        method, salt, _ = hashed_password.split('$', 2)
+    except ValueError:
+        return True
+    return method != PASSWORD_HASH_METHOD or len(salt) != PASSWORD_SALT_LENGTH
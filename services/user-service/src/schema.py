@@ -1,7 +1,12 @@
 from graphene import ObjectType, String, Int, Field, List, Mutation, Schema, Boolean
 from models import User, db
-import traceback
+from shared.resolvers import keyset_page
+from passwords import PasswordHasherBusy
+from cache import user_role_cache
 from auth import verify_token, create_token
+import logging
+
+logger = logging.getLogger(__name__)
 
 class UserType(ObjectType):
     id = Int()
@@ -37,7 +42,7 @@ class CreateUser(Mutation):
 
     def mutate(self, info, username, email, password, role="USER"):
         try:
-            print(f"Creating user: {username}, {email}, {role}")  # Debug log
+            logger.debug("Creating user: %s, %s, %s", username, email, role)
             
             # Check if user with this username or email already exists
             existing_user = User.query.filter((User.username == username) | (User.email == email)).first()
@@ -52,12 +57,14 @@ class CreateUser(Mutation):
             user.set_password(password)
             user.save()
             
-            print(f"User created successfully: {user}")  # Debug log
+            logger.debug("User created successfully: %s", user)
             
             return CreateUserResponse(success=True, message="User created successfully", user=user)
+        except PasswordHasherBusy as e:
+            db.session.rollback()
+            return CreateUserResponse(success=False, message=str(e), user=None)
         except Exception as e:
-            print(f"Error creating user: {str(e)}")  # Debug log
-            traceback.print_exc()
+            logger.exception("Error creating user: %s", e)
             db.session.rollback()
             return CreateUserResponse(success=False, message=f"Error creating user: {str(e)}", user=None)
 
@@ -70,19 +77,30 @@ class LoginUser(Mutation):
 
     def mutate(self, info, email, password):
         try:
-            print(f"Login attempt for: {email}")  # Debug log
+            logger.debug("Login attempt for: %s", email)
             
             user = User.get_by_email(email)
             if user and user.check_password(password):
+                if user.password_needs_rehash():
+                    # Hash parameters changed since this password was stored; upgrade it now
+                    # that the plaintext is known. Best effort, the login succeeds either way.
+                    try:
+                        user.set_password(password)
+                        user.save()
+                    except Exception as e:
+                        db.session.rollback()
+                        logger.warning("Password rehash skipped for %s: %s", email, e)
+
                 token = create_token(user.id)
-                print(f"Login successful for user: {user.username}")  # Debug log
+                logger.debug("Login successful for user: %s", user.username)
                 return LoginResponse(success=True, token=token, message="Login successful", user=user)
             
-            print(f"Invalid credentials for: {email}")  # Debug log
+            logger.debug("Invalid credentials for: %s", email)
             return LoginResponse(success=False, token=None, message="Invalid credentials", user=None)
+        except PasswordHasherBusy as e:
+            return LoginResponse(success=False, token=None, message=str(e), user=None)
         except Exception as e:
-            print(f"Login error: {str(e)}")  # Debug log
-            traceback.print_exc()
+            logger.exception("Login error: %s", e)
             return LoginResponse(success=False, token=None, message=f"Login error: {str(e)}", user=None)
 
 class VerifyToken(Mutation):
@@ -93,25 +111,24 @@ class VerifyToken(Mutation):
 
     def mutate(self, info, token):
         try:
-            print(f"Verifying token: {token[:20]}...")
+            logger.debug("Verifying token: %.20s...", token)
             
             result = verify_token(token)
             if result['valid']:
-                print(f"Token valid for user_id: {result['user_id']}, role: {result['role']}")
+                logger.debug("Token valid for user_id: %s, role: %s", result['user_id'], result['role'])
                 return TokenVerificationResponse(
                     valid=True,
                     userId=result['user_id'],  # ← Changed to userId
                     role=result['role']
                 )
             else:
-                print(f"Token invalid: {result.get('error', 'Unknown error')}")
+                logger.warning("Token invalid: %s", result.get('error', 'Unknown error'))
                 return TokenVerificationResponse(
                     valid=False,
                     error=result.get('error', 'Invalid token')
                 )
         except Exception as e:
-            print(f"Token verification error: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Token verification error: %s", e)
             return TokenVerificationResponse(
                 valid=False,
                 error=f"Token verification failed: {str(e)}"
@@ -141,10 +158,11 @@ class UpdateUser(Mutation):
                 user.set_password(password)
                 
             db.session.commit()
+            user_role_cache.invalidate(user.id)
             return UpdateUser(user=user)  # ← Return wrapped in UpdateUser() class
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in UpdateUser.mutate")
             raise Exception(f"Error updating user: {str(e)}")
 
 class DeleteUserResponse(ObjectType):
@@ -165,45 +183,52 @@ class DeleteUser(Mutation):
                 
             db.session.delete(user)
             db.session.commit()
+            user_role_cache.invalidate(id)
             return DeleteUserResponse(success=True, message=f"User with ID {id} deleted successfully")
         except Exception as e:
             db.session.rollback()
-            traceback.print_exc()
+            logger.exception("Error in DeleteUser.mutate")
             return DeleteUserResponse(success=False, message=f"Error deleting user: {str(e)}")
 
 class Query(ObjectType):
-    users = List(UserType)
+    users = List(UserType, first=Int(), after=Int())
     user = Field(UserType, id=Int(required=True))
+    usersByIds = List(UserType, ids=List(Int, required=True))
     verify_token = Field(TokenVerificationResponse, token=String(required=True))
 
-    def resolve_users(self, info):
+    def resolve_users(self, info, first=None, after=None):
         try:
-            print("Resolving users query")  # Debug log
-            users = User.query.all()
-            print(f"Found {len(users)} users")  # Debug log
+            logger.debug("Resolving users query")
+            users = keyset_page(User.query, User.id, first, after).all()
+            logger.debug("Found %s users", len(users))
             return users
         except Exception as e:
-            print(f"Error in resolve_users: {str(e)}")  # Debug log
-            traceback.print_exc()
+            logger.exception("Error in resolve_users: %s", e)
             return []
 
     def resolve_user(self, info, id):
         try:
-            print(f"Resolving user query for ID: {id}")  # Debug log
+            logger.debug("Resolving user query for ID: %s", id)
             user = User.get_by_id(id)
             if user:
-                print(f"Found user: {user.username}")  # Debug log
+                logger.debug("Found user: %s", user.username)
             else:
-                print(f"User with ID {id} not found")  # Debug log
+                logger.debug("User with ID %s not found", id)
             return user
         except Exception as e:
-            print(f"Error in resolve_user: {str(e)}")  # Debug log
-            traceback.print_exc()
+            logger.exception("Error in resolve_user: %s", e)
             return None
     
+    def resolve_usersByIds(self, info, ids):
+        try:
+            return User.get_by_ids(ids)
+        except Exception as e:
+            logger.exception("Error in resolve_usersByIds: %s", e)
+            return []
+    
     def resolve_verify_token(self, info, token):
         try:
-            print(f"Resolving verify_token query")
+            logger.debug("Resolving verify_token query")
             result = verify_token(token)
             if result['valid']:
                 return TokenVerificationResponse(
@@ -217,8 +242,7 @@ class Query(ObjectType):
                     error=result.get('error', 'Invalid token')
                 )
         except Exception as e:
-            print(f"Error in resolve_verify_token: {str(e)}")
-            traceback.print_exc()
+            logger.exception("Error in resolve_verify_token: %s", e)
             return TokenVerificationResponse(
                 valid=False,
                 error=f"Token verification failed: {str(e)}"
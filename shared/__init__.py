@@ -0,0 +1,3 @@
+"""Modules used by the gateway and every service (logging, metrics, tracing, SQL stats,
+profiling, list resolver helpers, caches, token verification). Each Docker image copies
+this package next to its own code, see the Dockerfiles."""
\ No newline at end of file
@@ -0,0 +1,217 @@
+from collections import OrderedDict
+from graphene import ObjectType, String, Int, Float
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+import threading
+import logging
+import time
+import os
+
+logger = logging.getLogger(__name__)
+
+# Entity caches (EntityCache). Each process polls its cache_versions table and drops an
+# entity type's entries when another process has written to it; the TTL is a backstop.
+ENTITY_CACHE_SIZE = int(os.getenv('ENTITY_CACHE_SIZE', '10000'))
+ENTITY_CACHE_TTL_SECONDS = float(os.getenv('ENTITY_CACHE_TTL_SECONDS', '300'))
+ENTITY_NEGATIVE_TTL_SECONDS = float(os.getenv('ENTITY_NEGATIVE_TTL_SECONDS', '5'))
+CACHE_VERSION_POLL_SECONDS = float(os.getenv('CACHE_VERSION_POLL_SECONDS', '2'))
+
+def snapshot(snapshot_type, row):
+    """Detached, read-only copy of a row as a namedtuple whose fields match the model's"""
+    if row is None:
+        return None
+    return snapshot_type(**{field: getattr(row, field) for field in snapshot_type._fields})
+
+class BoundedCache:
+    """Bounded, thread-safe LRU with per-entry expiry and hit/miss/eviction counters.
+
+    `generation` is bumped on every invalidation: a value loaded before then may
+    already be stale, so set() drops it when given the generation read before the load.
+    Misses are cached for `negative_ttl` (None values).
+    """
+
+    def __init__(self, name, max_size, ttl, negative_ttl=None):
+        self.name = name
+        self.max_size = max_size
+        self.ttl = ttl
+        self.negative_ttl = ttl if negative_ttl is None else negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.generation = 0
+        self._entries = OrderedDict()  # key -> (expires_at monotonic, value)
+        self._lock = threading.Lock()
+
+    def lookup(self, key):
+        """Return (found, value). Counts a hit or a miss."""
+        with self._lock:
+            return self._lookup(key, time.monotonic())
+
+    def _lookup(self, key, now):
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > now:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[1]
+        if entry is not None:
+            del self._entries[key]
+        self.misses += 1
+        return False, None
+
+    def get(self, key, load):
+        """Value for `key`, calling `load(key)` on a miss"""
+        with self._lock:
+            found, value = self._lookup(key, time.monotonic())
+            generation = self.generation
+        if found:
+            return value
+        value = load(key)
+        self.set(key, value, generation=generation)
+        return value
+
+    def get_many(self, keys, load_many):
+        """{key: value} for the keys whose value is not None, loading all misses with one
+        `load_many(keys)` call (returns {key: value}, absent keys are cached as None)"""
+        found, missing = {}, []
+        with self._lock:
+            now = time.monotonic()
+            for key in dict.fromkeys(keys):
+                hit, value = self._lookup(key, now)
+                if not hit:
+                    missing.append(key)
+                elif value is not None:
+                    found[key] = value
+            generation = self.generation
+        if missing:
+            loaded = load_many(missing)
+            for key in missing:
+                value = loaded.get(key)
+                self.set(key, value, generation=generation)
+                if value is not None:
+                    found[key] = value
+        return found
+
+    def set(self, key, value, ttl=None, generation=None):
+        """Store a value, loaded while the cache was at `generation` if given"""
+        if ttl is None:
+            ttl = self.ttl if value is not None else self.negative_ttl
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'name': self.name,
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions
+            }
+
+class EntityCache(BoundedCache):
+    """Snapshots by id, dropped when another process writes the entity type.
+
+    `version` is the entity type's write counter from cache_versions as last seen
+    by this process; peers compare it to tell whether their copy is current.
+    """
+
+    def __init__(self, name, max_size=ENTITY_CACHE_SIZE, ttl=ENTITY_CACHE_TTL_SECONDS,
+                 negative_ttl=ENTITY_NEGATIVE_TTL_SECONDS):
+        super().__init__(name, max_size, ttl, negative_ttl)
+        self.version = None
+
+    def sync(self, version):
+        """Drop everything if the shared write counter moved since we last looked"""
+        if version != self.version:
+            self.clear()
+            self.version = version
+
+    def stats(self):
+        return dict(super().stats(), version=self.version or 0)
+
+def cache_version_model(db):
+    """The CacheVersion model for a service's `db`: a write counter per cached entity type,
+    bumped in the same transaction as the write"""
+    class CacheVersion(db.Model):
+        __tablename__ = 'cache_versions'
+
+        name = db.Column(db.String(50), primary_key=True)
+        version = db.Column(db.BigInteger, nullable=False, default=0)
+
+        @classmethod
+        def bump(cls, *names):
+            table = cls.__table__
+            mysql = db.session.get_bind().dialect.name == 'mysql'
+            for name in names:
+                if mysql:
+                    db.session.execute(
+                        mysql_insert(table).values(name=name, version=1)
+                        .on_duplicate_key_update(version=table.c.version + 1)
+                    )
+                    continue
+                # Other databases (SQLite in tests and benchmarks): update, insert the first time
+                updated = db.session.execute(
+                    table.update().where(table.c.name == name).values(version=table.c.version + 1)
+                )
+                if not updated.rowcount:
+                    db.session.execute(table.insert().values(name=name, version=1))
+
+        @classmethod
+        def load_all(cls):
+            return {row.name: row.version for row in cls.query.all()}
+
+    return CacheVersion
+
+def sync_caches(caches, versions):
+    """Apply {cache name: version} read from cache_versions to {cache name: EntityCache}"""
+    for name, cache in caches.items():
+        cache.sync(versions.get(name, 0))
+
+def start_cache_sync(app, caches, load_versions, interval=CACHE_VERSION_POLL_SECONDS):
+    """Poll `load_versions()` and sync `caches` in a daemon thread"""
+    def run():
+        while True:
+            try:
+                with app.app_context():
+                    sync_caches(caches, load_versions())
+            except Exception as e:
+                logger.exception("Error syncing entity cache versions: %s", e)
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name='entity-cache-sync', daemon=True)
+    thread.start()
+    return thread
+
+class CacheStatsType(ObjectType):
+    """GraphQL view of a cache's stats() dict"""
+    name = String()
+    version = Int()  # Entity caches only, see EntityCache
+    size = Int()
+    maxSize = Int()
+    hits = Int()
+    misses = Int()
+    evictions = Int()
+    hitRatio = Float()
+
+    def resolve_maxSize(self, info):
+        return self['max_size']
+
+    def resolve_hitRatio(self, info):
+        lookups = self['hits'] + self['misses']
+        return self['hits'] / lookups if lookups else 0.0
\ No newline at end of file
@@ -0,0 +1,93 @@
+import threading
+import requests
+import logging
+import time
+import jwt
+import os
+
+logger = logging.getLogger(__name__)
+
+# Tokens are verified locally against user-service's published key set, so
+# authentication costs no network call once the keys are cached.
+JWKS_URL = os.getenv('JWKS_URL', 'http://user-service:3012/.well-known/jwks.json')
+JWKS_CACHE_SECONDS = int(os.getenv('JWKS_CACHE_SECONDS', '300'))
+# Lower bound between fetches triggered by an unknown kid, so forged tokens cannot hammer user-service
+JWKS_MIN_REFRESH_SECONDS = int(os.getenv('JWKS_MIN_REFRESH_SECONDS', '10'))
+
+JWT_ALGORITHMS = ['EdDSA']
+
+class KeySetCache:
+    """Public keys by kid, refreshed after a TTL or when a token names an unknown key.
+
+    `downstream_call(target, operation)` times the fetch: the caller's DownstreamCall.
+    The gateway and the services register different metrics, so this module imports neither.
+    """
+
+    def __init__(self, downstream_call, url=JWKS_URL, ttl=JWKS_CACHE_SECONDS,
+                 min_refresh_interval=JWKS_MIN_REFRESH_SECONDS):
+        self.downstream_call = downstream_call
+        self.url = url
+        self.ttl = ttl
+        self.min_refresh_interval = min_refresh_interval
+        self._keys = {}
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    def get_key(self, kid):
+        if self._needs_refresh(kid):
+            with self._lock:
+                # Another thread may have refreshed while we waited for the lock
+                if self._needs_refresh(kid):
+                    self._refresh()
+        return self._keys.get(kid)
+
+    def _needs_refresh(self, kid):
+        if self._fetched_at is None:
+            return True
+        age = time.monotonic() - self._fetched_at
+        return age >= self.ttl or (kid not in self._keys and age >= self.min_refresh_interval)
+
+    def _refresh(self):
+        try:
+            with self.downstream_call('user', 'jwks'):
+                response = requests.get(self.url, timeout=5)
+                response.raise_for_status()
+            keys = {}
+            for jwk in response.json().get('keys', []):
+                try:
+                    keys[jwk['kid']] = jwt.PyJWK(jwk).key
+                except Exception as e:
+                    logger.warning("Skipping unusable key %s: %s", jwk.get('kid'), e)
+            self._keys = keys
+        except Exception as e:
+            # Keep verifying with the keys we have; user-service being down must not log everyone out
+            logger.error("Error fetching key set from %s: %s", self.url, e)
+        self._fetched_at = time.monotonic()
+
+def verify_token(token, key_set):
+    """Verify a JWT locally against a KeySetCache and return user info (same shape as user-service's verifyToken)"""
+    try:
+        if not token:
+            return {'valid': False, 'error': 'Token is missing'}
+
+        # Remove 'Bearer ' prefix if present
+        if token.startswith('Bearer '):
+            token = token[7:]
+
+        public_key = key_set.get_key(jwt.get_unverified_header(token).get('kid'))
+        if public_key is None:
+            return {'valid': False, 'error': 'Invalid token'}
+
+        payload = jwt.decode(token, public_key, algorithms=JWT_ALGORITHMS)
+        return {
+            'valid': True,
+            'user_id': payload['user_id'],
+            'role': payload.get('role', 'USER')
+        }
+    except jwt.ExpiredSignatureError:
+        return {'valid': False, 'error': 'Token has expired'}
+    except jwt.InvalidTokenError:
+        return {'valid': False, 'error': 'Invalid token'}
+    except Exception as e:
+        logger.warning("Error verifying token: %s", e)
+        return {'valid': False, 'error': f'Token verification failed: {str(e)}'}
\ No newline at end of file
@@ -0,0 +1,160 @@
+from logging.handlers import QueueHandler, QueueListener
+from flask import g, request, has_request_context
+from .tracing import current_span
+import threading
+import logging
+import secrets
+import atexit
+import queue
+import json
+import time
+import sys
+import os
+
+# Every module logs through logging.getLogger(__name__); init_logging writes the records to
+# stdout as JSON lines carrying the service, module, request id and trace id. The request id
+# comes from REQUEST_ID_HEADER (or is made up), is returned in the response and is passed on
+# to the services a request calls, so one id finds a request's lines in every service.
+#
+# LOG_LEVEL sets the level of every module and LOG_LEVELS overrides it per module, e.g.
+# "schema=DEBUG,werkzeug=WARNING". Pass values as arguments (logger.debug("Response: %s",
+# result)), not in an f-string: a call below its logger's level returns before anything is
+# formatted. A call site logs at most LOG_RATE_LIMIT records a second (bursts of
+# LOG_RATE_BURST); its next record counts the ones dropped. Lines are written by a background
+# thread, so a slow stdout never holds up a request; beyond LOG_QUEUE_SIZE waiting lines new
+# ones are dropped and counted the same way.
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_LEVELS = os.getenv('LOG_LEVELS', '')
+LOG_RATE_LIMIT = float(os.getenv('LOG_RATE_LIMIT', '50'))
+LOG_RATE_BURST = float(os.getenv('LOG_RATE_BURST', '200'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+REQUEST_ID_HEADER = 'X-Request-Id'
+
+def parse_levels(text):
+    """"schema=DEBUG,werkzeug=WARNING" -> {'schema': 'DEBUG', 'werkzeug': 'WARNING'}"""
+    levels = {}
+    for item in text.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record; JsonQueueHandler runs it on the thread that logged, inside
+    the request context"""
+
+    def __init__(self, service_name):
+        super().__init__()
+        self.service_name = service_name
+
+    def format(self, record):
+        entry = {
+            'ts': time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            'level': record.levelname,
+            'service': self.service_name,
+            'logger': record.name,
+            'msg': record.getMessage()
+        }
+        if has_request_context():
+            entry['requestId'] = g.get('request_id')
+        span = current_span()
+        if span is not None:
+            entry['traceId'] = span.trace_id
+        if getattr(record, 'dropped', 0):
+            entry['dropped'] = record.dropped
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+class RateLimitFilter(logging.Filter):
+    """Token bucket per call site (file and line)"""
+
+    def __init__(self, rate, burst):
+        super().__init__()
+        self.rate = rate
+        self.burst = max(burst, 1)
+        self._buckets = {}  # (pathname, lineno) -> [tokens, updated, dropped]
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if self.rate <= 0:
+            return True
+        key = (record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if bucket[0] < 1:
+                bucket[2] += 1
+                return False
+            bucket[0] -= 1
+            dropped, bucket[2] = bucket[2], 0
+        if dropped:
+            record.dropped = getattr(record, 'dropped', 0) + dropped
+        return True
+
+class JsonQueueHandler(QueueHandler):
+    """Formats on the calling thread (which has the request context) and queues the line,
+    dropping it if the queue is full"""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record):
+        if self.dropped:
+            record.dropped, self.dropped = getattr(record, 'dropped', 0) + self.dropped, 0
+        return super().prepare(record)
+
+_listener = None
+
+def configure_logging(service_name, level=LOG_LEVEL, levels=LOG_LEVELS):
+    """Send every logger's records through the JSON queue handler (once per process)"""
+    global _listener
+    root = logging.getLogger()
+    if _listener is None:
+        log_queue = queue.Queue(LOG_QUEUE_SIZE)
+        handler = JsonQueueHandler(log_queue)
+        handler.setFormatter(JsonFormatter(service_name))
+        handler.addFilter(RateLimitFilter(LOG_RATE_LIMIT, LOG_RATE_BURST))
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(logging.Formatter('%(message)s'))
+        for existing in list(root.handlers):
+            root.removeHandler(existing)
+        root.addHandler(handler)
+        _listener = QueueListener(log_queue, output)
+        _listener.start()
+        atexit.register(_listener.stop)
+    root.setLevel(level)
+    for name, module_level in parse_levels(levels).items():
+        logging.getLogger(name).setLevel(module_level)
+
+def request_id_headers():
+    """Header passing this request's id on to another service"""
+    request_id = g.get('request_id') if has_request_context() else None
+    return {REQUEST_ID_HEADER: request_id} if request_id else {}
+
+def init_logging(app, service_name):
+    """JSON logs on stdout and a request id for every request"""
+    configure_logging(service_name)
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get(REQUEST_ID_HEADER, '')[:64] or secrets.token_hex(8)
+
+    @app.after_request
+    def add_request_id(response):
+        if g.get('request_id'):
+            response.headers[REQUEST_ID_HEADER] = g.request_id
+        return response
\ No newline at end of file
@@ -0,0 +1,257 @@
+from collections import Counter
+from flask import g, request, has_request_context
+import threading
+import cProfile
+import secrets
+import logging
+import pstats
+import hmac
+import json
+import time
+import sys
+import os
+
+logger = logging.getLogger(__name__)
+
+# A /graphql request sending PROFILE_HEADER ("sample", the default, or "cprofile") is profiled
+# when PROFILE_SECRET_HEADER matches PROFILE_SECRET, or when the app's `authorize` callback
+# accepts it (the gateway lets admin tokens through). "sample" records the request thread's
+# stack every PROFILE_SAMPLE_INTERVAL_MS into a collapsed-stack file (flamegraph.pl, speedscope);
+# "cprofile" records every call into a .prof file (snakeviz, `python -m pstats`). Files go to
+# PROFILE_DIR and are named in the response's `extensions.profile`. A profiled request passes the
+# header and PROFILE_SECRET on to the services it calls, so set the same secret everywhere.
+#
+# PROFILE_CONTINUOUS_INTERVAL_MS > 0 also samples every thread handling a request at that
+# interval, all the time, into <PROFILE_DIR>/continuous/<service>-<time>.collapsed files,
+# written every PROFILE_CONTINUOUS_FLUSH_SECONDS.
+PROFILE_HEADER = 'X-Profile'
+PROFILE_SECRET_HEADER = 'X-Profile-Secret'
+PROFILE_SECRET = os.getenv('PROFILE_SECRET', '')
+PROFILE_DIR = os.getenv('PROFILE_DIR', '/app/profiles')
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv('PROFILE_SAMPLE_INTERVAL_MS', '1'))
+PROFILE_CONTINUOUS_INTERVAL_MS = float(os.getenv('PROFILE_CONTINUOUS_INTERVAL_MS', '0'))
+PROFILE_CONTINUOUS_FLUSH_SECONDS = float(os.getenv('PROFILE_CONTINUOUS_FLUSH_SECONDS', '60'))
+PROFILE_TOP_ENTRIES = 15
+
+_frame_labels = {}
+_active_threads = set()  # Threads handling a request, for the continuous sampler
+_active_threads_lock = threading.Lock()
+
+def _frame_label(code):
+    label = _frame_labels.get(code)
+    if label is None:
+        path = code.co_filename
+        path = path.split('site-packages/', 1)[1] if 'site-packages/' in path else os.path.basename(path)
+        label = _frame_labels[code] = f"{code.co_name} ({path}:{code.co_firstlineno})".replace(';', ':')
+    return label
+
+def collapse(frame):
+    """Stack of a frame as "outermost;...;innermost" """
+    labels = []
+    while frame is not None:
+        labels.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ';'.join(reversed(labels))
+
+def collapsed_text(counts):
+    return ''.join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+def write_profile(name, write):
+    """Write a profile under PROFILE_DIR with write(path) and return its relative name, or None"""
+    if not PROFILE_DIR:
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        write(path)
+        return name
+    except OSError as e:
+        logger.error("Error writing profile %s: %s", path, e)
+        return None
+
+def _write_text(text):
+    def write(path):
+        with open(path, 'w') as profile_file:
+            profile_file.write(text)
+    return write
+
+class SamplingProfiler:
+    """Samples one thread's stack from a background thread until stopped"""
+
+    mode = 'sample'
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='request-profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                self.counts[collapse(frame)] += 1
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def save(self, name):
+        return write_profile(f"{name}.collapsed", _write_text(collapsed_text(self.counts)))
+
+    def summary(self):
+        leaves = Counter()
+        for stack, count in self.counts.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return {
+            'samples': sum(self.counts.values()),
+            'intervalMs': self.interval * 1000,
+            'top': [{'function': function, 'samples': count} for function, count in leaves.most_common(PROFILE_TOP_ENTRIES)]
+        }
+
+class DeterministicProfiler:
+    """cProfile on the request's own thread"""
+
+    mode = 'cprofile'
+
+    def __init__(self):
+        self.profile = cProfile.Profile()
+
+    def start(self):
+        self.profile.enable()
+
+    def stop(self):
+        self.profile.disable()
+
+    def save(self, name):
+        return write_profile(f"{name}.prof", self.profile.dump_stats)
+
+    def summary(self):
+        stats = pstats.Stats(self.profile).stats
+        ranked = sorted(stats.items(), key=lambda item: item[1][3], reverse=True)[:PROFILE_TOP_ENTRIES]
+        return {
+            'calls': sum(entry[1] for entry in stats.values()),
+            'top': [{
+                'function': f"{function} ({os.path.basename(filename)}:{line})",
+                'calls': entry[1],
+                'cumulativeMs': round(entry[3] * 1000, 3),
+                'ownMs': round(entry[2] * 1000, 3)
+            } for (filename, line, function), entry in ranked]
+        }
+
+def profile_headers():
+    """Headers asking a service to profile its part of the request we are profiling"""
+    profile = g.get('profile') if has_request_context() else None
+    if profile is None or not PROFILE_SECRET:
+        return {}
+    return {PROFILE_HEADER: profile['profiler'].mode, PROFILE_SECRET_HEADER: PROFILE_SECRET}
+
+def record_service_profile(service_name, result):
+    """Note the profile file a service wrote for its part of this request"""
+    if not has_request_context() or g.get('profile') is None or not isinstance(result, dict):
+        return
+    profile = (result.get('extensions') or {}).get('profile')
+    if profile and profile.get('file'):
+        g.profile['services'].setdefault(service_name, []).append(profile['file'])
+
+def _allowed(authorize):
+    secret = request.headers.get(PROFILE_SECRET_HEADER)
+    if PROFILE_SECRET and secret and hmac.compare_digest(secret, PROFILE_SECRET):
+        return True
+    return authorize is not None and authorize()
+
+def _finish_profile(service_name):
+    profile = g.pop('profile', None)
+    if profile is None:
+        return None
+    profiler = profile['profiler']
+    profiler.stop()
+    span = g.get('trace_span')
+    trace_id = span.trace_id if span is not None else secrets.token_hex(16)
+    name = f"{time.strftime('%Y%m%d-%H%M%S')}-{trace_id[:16]}-{service_name}"
+    result = {
+        'mode': profiler.mode,
+        'durationMs': round((time.perf_counter() - profile['started']) * 1000, 3),
+        'file': profiler.save(name),
+        **profiler.summary()
+    }
+    if profile['services']:
+        result['services'] = profile['services']
+    return result
+
+def start_continuous_sampler(service_name, interval, flush_seconds):
+    """Sample the threads handling requests forever, writing a collapsed-stack file per flush"""
+    def run():
+        counts = Counter()
+        next_flush = time.monotonic() + flush_seconds
+        while True:
+            time.sleep(interval)
+            try:
+                frames = sys._current_frames()
+                with _active_threads_lock:
+                    thread_ids = list(_active_threads)
+                for thread_id in thread_ids:
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counts[collapse(frame)] += 1
+                del frames
+                if time.monotonic() >= next_flush:
+                    next_flush = time.monotonic() + flush_seconds
+                    if counts:
+                        write_profile(f"continuous/{service_name}-{time.strftime('%Y%m%d-%H%M%S')}.collapsed",
+                                      _write_text(collapsed_text(counts)))
+                        counts = Counter()
+            except Exception as e:
+                logger.error("Continuous profiler error: %s", e)
+
+    thread = threading.Thread(target=run, name='continuous-profiler', daemon=True)
+    thread.start()
+    return thread
+
+def init_profiling(app, service_name, authorize=None):
+    """Profile /graphql requests that ask for it, and sample all requests if PROFILE_CONTINUOUS_INTERVAL_MS is set"""
+    continuous = PROFILE_CONTINUOUS_INTERVAL_MS > 0
+
+    @app.before_request
+    def start_profile():
+        if request.path != '/graphql':
+            return
+        if continuous:
+            with _active_threads_lock:
+                _active_threads.add(threading.get_ident())
+        mode = request.headers.get(PROFILE_HEADER)
+        if not mode or not _allowed(authorize):
+            return
+        if mode.lower() == 'cprofile':
+            profiler = DeterministicProfiler()
+        else:
+            profiler = SamplingProfiler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        g.profile = {'profiler': profiler, 'started': time.perf_counter(), 'services': {}}
+        profiler.start()
+
+    @app.after_request
+    def add_profile(response):
+        if g.get('profile') is None:
+            return response
+        profile = _finish_profile(service_name)
+        body = response.get_json(silent=True) if response.is_json else None
+        if isinstance(body, dict):
+            body.setdefault('extensions', {})['profile'] = profile
+            response.set_data(json.dumps(body))
+        elif profile['file']:
+            response.headers['X-Profile-File'] = profile['file']
+        return response
+
+    @app.teardown_request
+    def finish_profile(error=None):
+        _finish_profile(service_name)  # Requests that failed before after_request
+        if continuous:
+            with _active_threads_lock:
+                _active_threads.discard(threading.get_ident())
+
+    if continuous:
+        start_continuous_sampler(service_name, PROFILE_CONTINUOUS_INTERVAL_MS / 1000, PROFILE_CONTINUOUS_FLUSH_SECONDS)
\ No newline at end of file
@@ -0,0 +1,149 @@
+from contextlib import contextmanager
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+import contextvars
+import threading
+import logging
+import json
+import time
+import re
+import os
+
+logger = logging.getLogger(__name__)
+
+# Per-request SQL statement counts, reported in the GraphQL response's `extensions`
+# when the request carries DEBUG_QUERIES_HEADER, and a slow-query log with the
+# statement's EXPLAIN plan.
+DEBUG_QUERIES_HEADER = 'X-Debug-Queries'
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+# Each distinct slow statement is EXPLAINed at most once per interval; the plan rarely changes
+SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS = float(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS', '300'))
+
+EXPLAINABLE_PATTERN = re.compile(r'^\s*(SELECT|UPDATE|DELETE|INSERT|REPLACE)\b', re.IGNORECASE)
+
+_current_stats = contextvars.ContextVar('query_stats', default=None)
+_last_explained = {}  # statement -> time.monotonic() of its last EXPLAIN
+_last_explained_lock = threading.Lock()
+
+class QueryStats:
+    """SQL statements run while this is the current stats (see count_queries())"""
+
+    def __init__(self, record_statements=False):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = [] if record_statements else None
+
+    def add(self, statement, seconds):
+        self.count += 1
+        self.seconds += seconds
+        if self.statements is not None:
+            self.statements.append(statement)
+
+    def to_dict(self):
+        return {'count': self.count, 'timeMs': round(self.seconds * 1000, 3)}
+
+@contextmanager
+def count_queries(record_statements=False):
+    """Count the SQL statements run in this block (in this thread)"""
+    stats = QueryStats(record_statements)
+    token = _current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        _current_stats.reset(token)
+
+@contextmanager
+def assert_max_queries(limit, operation='block'):
+    """Fail when the block runs more than `limit` SQL statements, e.g. to pin an
+    operation's query count so an N+1 regression is caught:
+
+        with app.app_context(), assert_max_queries(3, 'bookings'):
+            result = schema.execute('{ bookings(first: 50) { id tickets { seatNumber } } }')
+
+    benchmarks/query_counts.py pins the optimized resolvers this way.
+    """
+    with count_queries(record_statements=True) as stats:
+        yield stats
+    if stats.count > limit:
+        statements = '\n'.join(f"  {statement}" for statement in stats.statements)
+        raise AssertionError(f"{operation} ran {stats.count} SQL statements, expected at most {limit}:\n{statements}")
+
+def _should_explain(statement):
+    now = time.monotonic()
+    with _last_explained_lock:
+        last = _last_explained.get(statement)
+        if last is not None and now - last < SLOW_QUERY_EXPLAIN_INTERVAL_SECONDS:
+            return False
+        if len(_last_explained) >= 1000:
+            _last_explained.clear()
+        _last_explained[statement] = now
+        return True
+
+def explain(conn, statement, parameters):
+    """EXPLAIN plan rows for a statement, run on the same connection with the same parameters.
+
+    Uses a raw DBAPI cursor so the EXPLAIN is not counted or traced itself. PyMySQL
+    buffers results, so the original statement's rows are already read.
+    """
+    try:
+        cursor = conn.connection.cursor()
+        try:
+            cursor.execute(f"EXPLAIN {statement}", parameters)
+            columns = [column[0] for column in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+        finally:
+            cursor.close()
+    except Exception as e:
+        return f"EXPLAIN failed: {str(e)}"
+
+def log_slow_query(conn, statement, parameters, executemany, seconds):
+    # Parameters are left out of the log; they can hold credentials and personal data
+    plan = None
+    if not executemany and EXPLAINABLE_PATTERN.match(statement) and _should_explain(statement):
+        plan = explain(conn, statement, parameters)
+    logger.warning("Slow query (%.1f ms): %s", seconds * 1000, json.dumps({'statement': statement, 'plan': plan}, default=str))
+
+def instrument_queries():
+    """Count and time every SQL statement; log the ones slower than SLOW_QUERY_MS"""
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def start_query_timer(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def record_query(conn, cursor, statement, parameters, context, executemany):
+        timers = conn.info.get('query_started')
+        if not timers:
+            return
+        seconds = time.perf_counter() - timers.pop()
+        stats = _current_stats.get()
+        if stats is not None:
+            stats.add(statement, seconds)
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            log_slow_query(conn, statement, parameters, executemany, seconds)
+
+    @event.listens_for(Engine, 'handle_error')
+    def drop_query_timer(context):
+        timers = context.connection.info.get('query_started') if context.connection is not None else None
+        if timers:
+            timers.pop()
+
+def init_query_stats(app):
+    """Count SQL statements per /graphql request"""
+    @app.before_request
+    def start_query_stats():
+        if request.path == '/graphql':
+            g.query_stats_token = _current_stats.set(QueryStats())
+
+    @app.teardown_request
+    def finish_query_stats(error=None):
+        token = g.pop('query_stats_token', None)
+        if token is not None:
+            _current_stats.reset(token)
+
+def with_query_stats(body):
+    """Add this request's SQL stats to a GraphQL response body if the client asked for them"""
+    stats = _current_stats.get()
+    if stats is not None and request.headers.get(DEBUG_QUERIES_HEADER):
+        body.setdefault('extensions', {})['sql'] = stats.to_dict()
+    return body
\ No newline at end of file
@@ -0,0 +1,40 @@
+from graphql.language.ast import FragmentSpread, InlineFragment
+import os
+
+# Page size of list queries that don't pass `first`, and the upper bound for `first`.
+# No list query returns more than one page; callers page on with `after`.
+LIST_DEFAULT_PAGE_SIZE = int(os.getenv('LIST_DEFAULT_PAGE_SIZE', '100'))
+LIST_MAX_PAGE_SIZE = int(os.getenv('LIST_MAX_PAGE_SIZE', '1000'))
+
+def page_limit(first):
+    """Rows in a page: `first` bounded to LIST_MAX_PAGE_SIZE, LIST_DEFAULT_PAGE_SIZE when not given"""
+    if first is None:
+        first = LIST_DEFAULT_PAGE_SIZE
+    return max(0, min(first, LIST_MAX_PAGE_SIZE))
+
+def keyset_page(query, id_column, first=None, after=None, descending=False):
+    """Keyset pagination: ordered by primary key, `after` is the last ID of the previous page.
+    With descending=True pages run newest first."""
+    if after is not None:
+        query = query.filter(id_column < after if descending else id_column > after)
+    query = query.order_by(id_column.desc() if descending else id_column)
+    return query.limit(page_limit(first))
+
+def selected_fields(info):
+    """Names of the fields selected under the field being resolved, fragments included"""
+    def collect(selection_set, names):
+        if not selection_set:
+            return names
+        for selection in selection_set.selections:
+            if isinstance(selection, FragmentSpread):
+                collect(info.fragments[selection.name.value].selection_set, names)
+            elif isinstance(selection, InlineFragment):
+                collect(selection.selection_set, names)
+            else:
+                names.add(selection.name.value)
+        return names
+
+    names = set()
+    for field_ast in info.field_asts:
+        collect(field_ast.selection_set, names)
+    return names
\ No newline at end of file
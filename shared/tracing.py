@@ -0,0 +1,226 @@
+from collections import deque
+from flask import g, request
+import contextvars
+import threading
+import secrets
+import logging
+import random
+import json
+import time
+import re
+import os
+
+logger = logging.getLogger(__name__)
+
+# Trace context travels in W3C `traceparent` headers ("00-<trace id>-<parent span id>-<flags>")
+# from the gateway through every service a request reaches. Finished spans are appended
+# to <TRACE_DIR>/<service>.jsonl (read by gateway/trace_viewer.py) and kept in memory;
+# an empty TRACE_DIR keeps them in memory only.
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '1.0'))
+TRACE_DIR = os.getenv('TRACE_DIR', '/app/traces')
+TRACE_BUFFER_SIZE = int(os.getenv('TRACE_BUFFER_SIZE', '10000'))
+TRACE_SQL_MAX_LENGTH = int(os.getenv('TRACE_SQL_MAX_LENGTH', '1000'))
+
+TRACEPARENT_PATTERN = re.compile(r'^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$')
+UNTRACED_PATHS = ('/metrics', '/.well-known/jwks.json')
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+
+class Span:
+    """One timed operation. Used as a context manager it becomes the parent of spans
+    started inside it; begin(activate=False) times it without that."""
+
+    def __init__(self, name, trace_id, parent_id, sampled, kind='internal', attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.error = None
+        self.start = None
+        self.duration = None
+        self._started = None
+        self._token = None
+
+    def set_attribute(self, key, value):
+        self.attributes[key] = value
+
+    def traceparent(self):
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def begin(self, activate=True):
+        self.start = time.time()
+        self._started = time.perf_counter()
+        if activate:
+            self._token = _current_span.set(self)
+        return self
+
+    def finish(self, error=None):
+        if self._started is None or self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._started
+        if self._token is not None:
+            _current_span.reset(self._token)
+            self._token = None
+        if error is not None and self.error is None:
+            self.error = str(error) or type(error).__name__
+        if self.sampled:
+            exporter.export(self)
+
+    def __enter__(self):
+        return self.begin()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.finish(exc)
+        return False
+
+    def to_dict(self, service):
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'service': service,
+            'name': self.name,
+            'kind': self.kind,
+            'start': self.start,
+            'duration_ms': round(self.duration * 1000, 3),
+            'attributes': self.attributes,
+            'error': self.error
+        }
+
+class SpanExporter:
+    """Appends finished spans to <directory>/<service>.jsonl and keeps the latest in memory"""
+
+    def __init__(self, buffer_size):
+        self.service = 'unknown'
+        self.path = None
+        self.spans = deque(maxlen=buffer_size)
+        self._file = None
+        self._lock = threading.Lock()
+
+    def configure(self, service, directory):
+        self.service = service
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self.path = os.path.join(directory, f"{service}.jsonl")
+
+    def export(self, span):
+        record = span.to_dict(self.service)
+        line = json.dumps(record, default=str)
+        with self._lock:
+            self.spans.append(record)
+            if self.path is None:
+                return
+            try:
+                if self._file is None:
+                    self._file = open(self.path, 'a', buffering=1)
+                self._file.write(line + '\n')
+            except OSError as e:
+                logger.error("Error writing span to %s, keeping spans in memory only: %s", self.path, e)
+                self.path = None
+
+    def trace(self, trace_id):
+        with self._lock:
+            return [record for record in self.spans if record['trace_id'] == trace_id]
+
+exporter = SpanExporter(TRACE_BUFFER_SIZE)
+
+def current_span():
+    return _current_span.get()
+
+def start_span(name, kind='internal', attributes=None, traceparent=None):
+    """Span continuing an incoming `traceparent`, else under the current span, else starting a trace"""
+    match = TRACEPARENT_PATTERN.match(traceparent) if traceparent else None
+    parent = _current_span.get()
+    if match:
+        trace_id, parent_id, sampled = match.group(1), match.group(2), int(match.group(3), 16) & 1 == 1
+    elif parent is not None:
+        trace_id, parent_id, sampled = parent.trace_id, parent.span_id, parent.sampled
+    else:
+        trace_id, parent_id, sampled = secrets.token_hex(16), None, random.random() < TRACE_SAMPLE_RATE
+    return Span(name, trace_id, parent_id, sampled, kind, attributes)
+
+def start_child_span(name, kind='internal', attributes=None):
+    """Span under the current one, or None outside a sampled trace (nothing to attach it to)"""
+    parent = _current_span.get()
+    if parent is None or not parent.sampled:
+        return None
+    return Span(name, parent.trace_id, parent.span_id, True, kind, attributes)
+
+def trace_headers():
+    """Headers that continue the current trace in a call to another service"""
+    span = _current_span.get()
+    return {'traceparent': span.traceparent()} if span is not None else {}
+
+class TracingMiddleware:
+    """Graphene middleware giving each root query or mutation field its own span"""
+
+    def resolve(self, next, root, info, **args):
+        if len(info.path) != 1:
+            return next(root, info, **args)
+        span = start_child_span(f"{info.parent_type.name}.{info.field_name}")
+        if span is None:
+            return next(root, info, **args)
+        request_span = g.get('trace_span')
+        if request_span is not None:
+            request_span.attributes.setdefault('graphql.fields', []).append(info.field_name)
+        with span:
+            return next(root, info, **args)
+
+def instrument_sql():
+    """Record a span for every SQL statement run inside a sampled trace"""
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    @event.listens_for(Engine, 'before_cursor_execute')
+    def start_sql_span(conn, cursor, statement, parameters, context, executemany):
+        words = statement.split(None, 1)
+        span = start_child_span(f"SQL {words[0].upper() if words else ''}".strip(), 'client',
+                                {'db.statement': statement[:TRACE_SQL_MAX_LENGTH]})
+        if span is not None:
+            # Not made current: nothing runs inside a statement, and a failed one never reaches after_cursor_execute
+            conn.info.setdefault('trace_sql_spans', []).append(span.begin(activate=False))
+
+    @event.listens_for(Engine, 'after_cursor_execute')
+    def finish_sql_span(conn, cursor, statement, parameters, context, executemany):
+        spans = conn.info.get('trace_sql_spans')
+        if spans:
+            span = spans.pop()
+            if cursor.rowcount is not None and cursor.rowcount >= 0:
+                span.set_attribute('db.rows', cursor.rowcount)
+            span.finish()
+
+    @event.listens_for(Engine, 'handle_error')
+    def fail_sql_span(context):
+        spans = context.connection.info.get('trace_sql_spans') if context.connection is not None else None
+        if spans:
+            spans.pop().finish(context.original_exception)
+
+def init_tracing(app, service_name, directory=TRACE_DIR):
+    """Give each incoming request a server span continuing the caller's trace"""
+    exporter.configure(service_name, directory)
+
+    @app.before_request
+    def start_request_span():
+        if request.path in UNTRACED_PATHS or request.path.startswith('/static/'):
+            return
+        if request.method == 'GET' and 'query' not in request.args:
+            return  # GraphiQL page, health checks
+        span = start_span(f"{request.method} {request.path}", kind='server',
+                          traceparent=request.headers.get('traceparent'))
+        g.trace_span = span.begin()
+
+    @app.after_request
+    def add_trace_id_header(response):
+        span = g.get('trace_span')
+        if span is not None and span.sampled:
+            response.headers['X-Trace-Id'] = span.trace_id  # Look it up with trace_viewer.py
+        return response
+
+    @app.teardown_request
+    def finish_request_span(error=None):
+        span = g.pop('trace_span', None)
+        if span is not None:
+            span.finish(error)
\ No newline at end of file